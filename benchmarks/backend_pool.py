@@ -0,0 +1,84 @@
+"""Throughput of the backend pool with several API keys and fallback models.
+
+Runs text requests through server.call_gemini against a local stub Gemini
+server that allows each API key only --quota requests per second per model
+and answers 429 with Retry-After beyond that. The same load is sent with one
+key and with --keys keys, and once more with the requested model out of quota
+on every key so requests fail over to a fallback model. Requests served per key and model
+come from the stub's own counters, so the routing is checked end to end.
+
+Usage:
+    python benchmarks/backend_pool.py --requests 60 --quota 5 --keys 3
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from gemini_image_mcp import client as gemini_client
+from gemini_image_mcp import pool, resilience, server
+from stub_gemini import start_stub_server
+
+MODEL = "gemini-2.0-flash"
+FALLBACK = "gemini-2.0-flash-lite"
+
+
+async def _scenario(label: str, httpd, keys, requests: int, concurrency: int) -> None:
+    os.environ["GEMINI_API_KEYS"] = ",".join(keys)
+    httpd.RequestHandlerClass.served.clear()
+    resilience._breakers.clear()
+    limit = asyncio.Semaphore(concurrency)
+    failures = 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with limit:
+            try:
+                await server.call_gemini(["hello"], model=MODEL, text_only=True)
+            except Exception:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - start
+    served = ", ".join(
+        f"{model}@{key}={count}"
+        for (key, model), count in sorted(httpd.RequestHandlerClass.served.items())
+    )
+    print(f"{label:>14}: {requests - failures}/{requests} ok in {elapsed:5.2f}s "
+          f"({(requests - failures) / elapsed:5.1f} req/s)  served: {served}")
+
+
+async def run(args: argparse.Namespace) -> None:
+    httpd, base_url = start_stub_server(latency=0.02, key_quota=args.quota, retry_after=1)
+    os.environ["GEMINI_BASE_URL"] = base_url
+    pool.GEMINI_TEXT_MODEL_FALLBACKS = FALLBACK
+    resilience.GEMINI_MAX_RETRIES = 20
+    resilience.GEMINI_CIRCUIT_FAILURE_THRESHOLD = args.requests
+    keys = [f"key-{i}" for i in range(args.keys)]
+    try:
+        await _scenario("1 key", httpd, keys[:1], args.requests, args.concurrency)
+        await _scenario(f"{args.keys} keys", httpd, keys, args.requests, args.concurrency)
+        httpd.RequestHandlerClass.exhausted_models = (MODEL,)
+        await _scenario("model fallback", httpd, [f"fallback-{i}" for i in range(args.keys)],
+                        args.requests, args.concurrency)
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=60)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--quota", type=int, default=5)
+    parser.add_argument("--keys", type=int, default=3)
+    args = parser.parse_args()
+    # Quota errors and evictions are logged for every request
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Peak memory of decoding large base64 data URLs.
+
+Compares the previous approach (split the data URL, then b64decode the whole
+payload) with imaging.decode_base64_chunked. Each run happens in a fresh
+subprocess. Peak memory is measured with tracemalloc from just before the
+decode, since building the test input itself would otherwise dominate the
+process's peak RSS.
+
+Usage:
+    python benchmarks/base64_decode.py --megabytes 10 20 30
+"""
+import argparse
+import base64
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from gemini_image_mcp.imaging import decode_base64_chunked
+
+
+def _legacy(encoded: str) -> bytes:
+    _, image_data = encoded.split(";base64,")
+    return base64.b64decode(image_data)
+
+
+def _chunked(encoded: str) -> bytes:
+    return decode_base64_chunked(encoded, encoded.find(";base64,") + len(";base64,"), max_bytes=1 << 40)
+
+
+def _run_one(mode: str, megabytes: float) -> None:
+    raw = os.urandom(int(megabytes * 1024 * 1024))
+    encoded = "data:image/jpeg;base64," + base64.b64encode(raw).decode()
+    del raw
+    tracemalloc.start()
+    start = time.perf_counter()
+    decoded = (_legacy if mode == "legacy" else _chunked)(encoded)
+    elapsed = (time.perf_counter() - start) * 1000
+    _, peak = tracemalloc.get_traced_memory()
+    print(f"{mode:>8}: {elapsed:7.1f}ms  peak=+{peak / 1e6:6.1f}MB  decoded={len(decoded) / 1e6:.1f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megabytes", type=float, nargs="+", default=[10, 20, 30])
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "MB"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run_one(args.run[0], float(args.run[1]))
+        return
+
+    for megabytes in args.megabytes:
+        print(f"{megabytes:g} MB payload")
+        for mode in ("legacy", "chunked"):
+            subprocess.run([sys.executable, __file__, "--run", mode, str(megabytes)], check=True)
+
+
+if __name__ == "__main__":
+    main()
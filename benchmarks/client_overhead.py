@@ -0,0 +1,70 @@
+"""Per-request overhead of a fresh genai.Client versus the shared pooled client.
+
+Both variants send the same text request to a local stub Gemini server, so
+the measured time is client construction plus connection setup plus the
+request itself, without any model latency.
+
+Usage:
+    python benchmarks/client_overhead.py --requests 200
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from google import genai
+from google.genai import types
+
+from gemini_image_mcp import client as gemini_client
+from stub_gemini import start_stub_server
+
+MODEL = "gemini-2.0-flash"
+
+
+async def _fresh_client_call(base_url: str) -> None:
+    client = genai.Client(
+        api_key=os.environ["GEMINI_API_KEY"],
+        http_options=types.HttpOptions(base_url=base_url),
+    )
+    await client.aio.models.generate_content(model=MODEL, contents="hello")
+    await client.aio.aclose()
+
+
+async def _pooled_client_call(base_url: str) -> None:
+    await gemini_client.get_client().aio.models.generate_content(model=MODEL, contents="hello")
+
+
+async def _measure(label: str, call, base_url: str, requests: int) -> None:
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        await call(base_url)
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    p95 = samples[int(len(samples) * 0.95) - 1]
+    print(f"{label:>8}: mean={statistics.mean(samples):.2f}ms "
+          f"p50={statistics.median(samples):.2f}ms p95={p95:.2f}ms")
+
+
+async def run(requests: int) -> None:
+    httpd, base_url = start_stub_server()
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = base_url
+    try:
+        await _measure("fresh", _fresh_client_call, base_url, requests)
+        await _measure("pooled", _pooled_client_call, base_url, requests)
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests))
+
+
+if __name__ == "__main__":
+    main()
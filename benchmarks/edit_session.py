@@ -0,0 +1,99 @@
+"""Compare iterative edits through transform_image_from_encoded and edit sessions.
+
+Makes --edits successive edits to a random source image against a local stub
+Gemini server that returns --image-size images, three ways: re-sending the
+previous result to transform_image_from_encoded each time, an edit session
+sending the current image inline, and an edit session referring to the
+image uploaded to the Files API. Reports the mean latency per edit, the
+base64 bytes the client sends to the server, and the bytes sent upstream to
+generate calls and uploads.
+
+Usage:
+    python benchmarks/edit_session.py --latency 0.5 --edits 5 --image-size 1024
+"""
+import argparse
+import asyncio
+import base64
+import logging
+import os
+import statistics
+import time
+
+from fastmcp import Client
+
+from gemini_image_mcp import client as gemini_client
+from gemini_image_mcp import server
+from stub_gemini import noise_png, start_stub_server
+
+
+async def _transform(client: Client, source_url: str, edits: int) -> tuple:
+    samples, sent = [], 0
+    for i in range(edits):
+        start = time.perf_counter()
+        result = await client.call_tool("transform_image_from_encoded", {
+            "encoded_image": source_url,
+            "prompt": f"edit {i}: add one more red balloon",
+            "use_cache": False,
+        })
+        samples.append(time.perf_counter() - start)
+        sent += len(source_url)
+        image = next(c for c in result.content if c.type == "image")
+        source_url = f"data:{image.mimeType};base64,{image.data}"
+    return samples, sent
+
+
+async def _session(client: Client, source_url: str, edits: int) -> tuple:
+    result = await client.call_tool("start_edit_session", {"encoded_image": source_url})
+    session_id = result.structured_content["session_id"]
+    samples, sent = [], len(source_url)
+    for i in range(edits):
+        # Leave the background upload time to finish, as a user would
+        await asyncio.sleep(0.2)
+        start = time.perf_counter()
+        await client.call_tool("edit_in_session", {
+            "session_id": session_id,
+            "prompt": f"edit {i}: add one more red balloon",
+            "use_cache": False,
+        })
+        samples.append(time.perf_counter() - start)
+    await client.call_tool("end_edit_session", {"session_id": session_id})
+    return samples, sent
+
+
+async def run(args: argparse.Namespace) -> None:
+    httpd, base_url = start_stub_server(latency=args.latency, image_bytes=noise_png(args.image_size))
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = base_url
+    source_url = "data:image/png;base64," + base64.b64encode(noise_png(args.image_size)).decode()
+    scenarios = [
+        ("transform chain", _transform, False),
+        ("session inline", _session, False),
+        ("session files api", _session, True),
+    ]
+    try:
+        async with Client(server.mcp) as client:
+            for label, call, files_api in scenarios:
+                server.EDIT_SESSION_FILES_API = files_api
+                httpd.RequestHandlerClass.request_bytes.clear()
+                samples, sent = await call(client, source_url, args.edits)
+                upstream = httpd.RequestHandlerClass.request_bytes
+                print(f"{label:>18}: mean={statistics.mean(samples) * 1000:7.1f}ms per edit  "
+                      f"client_sent={sent / 1024:8.0f}KiB  upstream_generate={upstream['generate'] / 1024:8.0f}KiB  "
+                      f"upstream_upload={upstream['upload'] / 1024:8.0f}KiB")
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--edits", type=int, default=5)
+    parser.add_argument("--image-size", type=int, default=1024)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
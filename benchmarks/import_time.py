@@ -0,0 +1,132 @@
+"""Measure server import time and stdio cold start.
+
+import: imports gemini_image_mcp.server in fresh interpreters under
+    ``python -X importtime``, reports the median total and the slowest
+    top-level packages, and checks that google.genai and PIL are not
+    imported at startup. Exits with status 1 if the median exceeds --max-ms
+    or a deferred package was imported, so it can run as a CI check.
+
+stdio: starts the server over stdio the way an MCP client does for each
+    session (against the stub Gemini server from stub_gemini.py) and reports
+    the time until the session is initialized and until the first
+    generate_image_from_text call returns, with and without SERVER_WARMUP.
+
+Usage:
+    python benchmarks/import_time.py import --runs 5 --max-ms 2500
+    python benchmarks/import_time.py stdio --runs 3 --latency 0.2
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from fastmcp import Client
+from fastmcp.client.transports import StdioTransport
+
+from stub_gemini import start_stub_server
+
+# Packages the server must not import until they are needed
+DEFERRED = ("google.genai", "PIL")
+
+CHECK = "import sys, gemini_image_mcp.server; print(','.join(m for m in sys.modules if m.startswith({prefixes!r})))"
+
+
+def _import_once(env: Dict[str, str]) -> Tuple[float, Dict[str, float], List[str]]:
+    """Import the server under -X importtime; return total ms, ms per top-level package and deferred modules seen."""
+    code = CHECK.format(prefixes=DEFERRED)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], env=env, capture_output=True, text=True, check=True)
+    packages: Dict[str, float] = defaultdict(float)
+    total = 0.0
+    for line in proc.stderr.splitlines():
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line[len("import time:"):].split("|")
+        packages[name.strip().split(".")[0]] += int(self_us) / 1000
+        total += int(self_us) / 1000
+    loaded = [m for m in proc.stdout.strip().split(",") if m]
+    return total, packages, loaded
+
+
+def measure_import(args: argparse.Namespace) -> int:
+    env = {**os.environ, "OUTPUT_IMAGE_PATH": os.path.join(tempfile.gettempdir(), "import_time_out")}
+    runs = [_import_once(env) for _ in range(args.runs)]
+    totals = [total for total, _, _ in runs]
+    median = statistics.median(totals)
+    print(f"import gemini_image_mcp.server: median={median:7.1f}ms  min={min(totals):7.1f}ms  max={max(totals):7.1f}ms")
+    packages = runs[totals.index(min(totals))][1]
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {name:<28} {ms:7.1f}ms")
+
+    failed = False
+    loaded = sorted({m for _, _, seen in runs for m in seen})
+    if loaded:
+        print(f"FAIL: deferred modules imported at startup: {', '.join(loaded[:10])}")
+        failed = True
+    if args.max_ms and median > args.max_ms:
+        print(f"FAIL: median import time {median:.1f}ms exceeds --max-ms {args.max_ms}")
+        failed = True
+    return 1 if failed else 0
+
+
+async def _cold_start(base_url: str, warmup: str, think_time: float) -> Tuple[float, float]:
+    env = {
+        **os.environ,
+        "GEMINI_API_KEY": "stub",
+        "GEMINI_BASE_URL": base_url,
+        "MCP_TRANSPORT": "stdio",
+        "SERVER_WARMUP": warmup,
+        "OUTPUT_IMAGE_PATH": os.path.join(tempfile.gettempdir(), "import_time_out"),
+    }
+    transport = StdioTransport(sys.executable, ["-c", "import gemini_image_mcp; gemini_image_mcp.main()"], env=env,
+                               log_file=open(os.devnull, "w"))
+    start = time.perf_counter()
+    async with Client(transport) as client:
+        initialized = time.perf_counter() - start
+        # Think time between the session starting and the first call
+        await asyncio.sleep(think_time)
+        await client.call_tool("generate_image_from_text", {"prompt": "a red balloon", "use_cache": False})
+        first_call = time.perf_counter() - start - think_time
+    return initialized, first_call
+
+
+async def measure_stdio(args: argparse.Namespace) -> int:
+    httpd, base_url = start_stub_server(latency=args.latency)
+    try:
+        for warmup in ("off", "import"):
+            samples = [await _cold_start(base_url, warmup, args.think_time) for _ in range(args.runs)]
+            print(f"SERVER_WARMUP={warmup:<7} initialized={statistics.median(s[0] for s in samples) * 1000:7.1f}ms  "
+                  f"first_call={statistics.median(s[1] for s in samples) * 1000:7.1f}ms")
+    finally:
+        httpd.shutdown()
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("import")
+    p.add_argument("--runs", type=int, default=5)
+    p.add_argument("--top", type=int, default=8, help="Slowest top-level packages to list")
+    p.add_argument("--max-ms", type=float, default=0, help="Fail if the median import time is above this")
+    p = sub.add_parser("stdio")
+    p.add_argument("--runs", type=int, default=3)
+    p.add_argument("--latency", type=float, default=0.2, help="Stub Gemini latency in seconds")
+    p.add_argument("--think-time", type=float, default=1.0,
+                   help="Seconds between session start and the first call (not counted)")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    if args.command == "import":
+        sys.exit(measure_import(args))
+    sys.exit(asyncio.run(measure_stdio(args)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Memory and latency of source-image ingestion for the transform tools.
+
+Compares the old path (PIL decode, then the SDK re-encoding the PIL image
+for upload) with image_part_from_bytes, which forwards the original bytes or
+applies the UPLOAD_MAX_EDGE/UPLOAD_FORMAT pre-upload policy. Each mode runs
+in its own subprocess so peak RSS is measured independently.
+
+Usage:
+    python benchmarks/ingest.py --megapixels 12 24 48
+"""
+import argparse
+import io
+import resource
+import subprocess
+import sys
+import time
+
+import PIL.Image
+from google.genai import _transformers
+
+from gemini_image_mcp.imaging import image_part_from_bytes
+
+
+def _make_jpeg(megapixels: float) -> bytes:
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    noise = PIL.Image.effect_noise((width, height), 64).convert("RGB")
+    buffer = io.BytesIO()
+    noise.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _legacy(data: bytes) -> int:
+    image = PIL.Image.open(io.BytesIO(data))
+    return len(_transformers.t_part(image).inline_data.data)
+
+
+def _direct(data: bytes) -> int:
+    return len(image_part_from_bytes(data).inline_data.data)
+
+
+def _run_one(mode: str, path: str) -> None:
+    with open(path, "rb") as f:
+        data = f.read()
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    uploaded = (_legacy if mode == "legacy" else _direct)(data)
+    elapsed = (time.perf_counter() - start) * 1000
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+    print(f"{mode:>7}: {elapsed:8.1f}ms  peak_rss=+{peak / 1024:.1f}MB  "
+          f"input={len(data) / 1e6:.1f}MB upload={uploaded / 1e6:.1f}MB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 24])
+    parser.add_argument("--run", nargs=2, metavar=("MODE", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run:
+        _run_one(*args.run)
+        return
+
+    for megapixels in args.megapixels:
+        path = f"/tmp/ingest_{megapixels:g}mp.jpg"
+        with open(path, "wb") as f:
+            f.write(_make_jpeg(megapixels))
+        print(f"{megapixels:g} MP JPEG")
+        for mode in ("legacy", "direct"):
+            subprocess.run([sys.executable, __file__, "--run", mode, path], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Concurrency load test for generate_image_from_text.
+
+Runs N concurrent tool calls against the in-process FastMCP server with the
+Gemini client replaced by a stub that sleeps for a fixed latency. If calls
+overlap, total wall time stays close to a single call's latency (bounded by
+GEMINI_MAX_CONCURRENT_REQUESTS); if they serialize it grows linearly with N.
+
+Usage:
+    python benchmarks/load_test.py --requests 8 --latency 1.0
+"""
+import argparse
+import asyncio
+import os
+import time
+from types import SimpleNamespace
+
+from fastmcp import Client
+
+from gemini_image_mcp import server
+
+# 1x1 transparent PNG
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360606060000000050001a5f645400000000049454e44ae426082"
+)
+
+
+def _response(part):
+    return SimpleNamespace(candidates=[SimpleNamespace(index=0, content=SimpleNamespace(parts=[part]))])
+
+
+class StubModels:
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    async def generate_content(self, model, contents, config=None):
+        await asyncio.sleep(self.latency)
+        if config is None:
+            return _response(SimpleNamespace(text="a red balloon", inline_data=None))
+        inline = SimpleNamespace(data=PNG_BYTES, mime_type="image/png")
+        return _response(SimpleNamespace(text=None, inline_data=inline))
+
+    async def generate_content_stream(self, model, contents, config=None):
+        response = await self.generate_content(model, contents, config)
+
+        async def chunks():
+            yield response
+
+        return chunks()
+
+
+class StubClient:
+    def __init__(self, latency: float):
+        self.aio = SimpleNamespace(models=StubModels(latency))
+
+
+async def run(requests: int, latency: float) -> None:
+    stub = StubClient(latency)
+    server.get_client = lambda api_key=None: stub
+    # The backend pool still needs a key to route by
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+
+    async with Client(server.mcp) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(
+            client.call_tool("generate_image_from_text", {"prompt": f"balloon {i}"})
+            for i in range(requests)
+        ))
+        elapsed = time.perf_counter() - start
+
+    # English prompts skip translation, so each tool call is one upstream call
+    serial = requests * latency
+    print(f"requests={requests} latency={latency:.2f}s "
+          f"limit={server.GEMINI_MAX_CONCURRENT_REQUESTS}")
+    print(f"elapsed={elapsed:.2f}s serial_estimate={serial:.2f}s "
+          f"speedup={serial / elapsed:.1f}x")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.requests, args.latency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Payload size and latency of output post-processing options.
+
+Runs a model-sized PNG through postprocess_image with several format/size
+settings and reports the base64 payload that would be sent over MCP, plus
+the time spent transcoding and encoding the response.
+
+Usage:
+    python benchmarks/output_formats.py --size 1024 --runs 5
+"""
+import argparse
+import asyncio
+import io
+import statistics
+import time
+
+import PIL.Image
+import PIL.ImageFilter
+
+from gemini_image_mcp import server
+
+SETTINGS = [
+    {"output_format": "original"},
+    {"output_format": "webp"},
+    {"output_format": "jpeg"},
+    {"output_format": "avif"},
+    {"output_format": "webp", "max_size": 512},
+    {"output_format": "webp", "thumbnail_only": True},
+]
+
+
+def _make_png(size: int) -> bytes:
+    # Blurred noise compresses roughly like a photographic render
+    image = PIL.Image.effect_noise((size, size), 96).convert("RGB")
+    image = image.filter(PIL.ImageFilter.GaussianBlur(2))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+async def run(size: int, runs: int) -> None:
+    source = server.MCPImage(data=_make_png(size), format="png")
+    for settings in SETTINGS:
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            image = await server.postprocess_image(source, **settings)
+            payload = image.to_image_content().data
+            samples.append((time.perf_counter() - start) * 1000)
+        label = ", ".join(f"{k}={v}" for k, v in settings.items())
+        print(f"{label:<45} payload={len(payload) / 1024:8.1f}KB  "
+              f"latency={statistics.median(samples):7.1f}ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(run(args.size, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""End-to-end benchmark of the image tools over SSE against a stub Gemini backend.
+
+run: starts the real server in a subprocess, serving SSE on a free local port
+    with GEMINI_BASE_URL pointed at the stub Gemini server from
+    stub_gemini.py, and calls generate_image_from_text,
+    transform_image_from_encoded and transform_image_from_file at each
+    --concurrency level. Every concurrent caller has its own SSE session.
+    Reports p50/p95/p99 latency, throughput, errors and the server's peak
+    RSS for each tool and level. Nothing leaves the machine.
+
+replay: sends the tool calls recorded in a REQUEST_LOG_PATH log to the same
+    setup, keeping their original spacing (divided by --speed; 0 sends them
+    all at once), and reports latency per tool next to the recorded one.
+    Image arguments left out of the log are replaced by random images of the
+    same size, and image files that no longer exist by a random image.
+
+Usage:
+    python benchmarks/pipeline.py run --concurrency 1,4,16 --requests 32 --latency 0.5
+    python benchmarks/pipeline.py run --failure-rate 0.05 --image-size 1024
+    REQUEST_LOG_PATH=/tmp/requests.jsonl gemini-image-mcp   # record
+    python benchmarks/pipeline.py replay /tmp/requests.jsonl --speed 2
+"""
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import math
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastmcp import Client
+
+from stub_gemini import noise_png, start_stub_server
+
+TOOLS = ("generate_image_from_text", "transform_image_from_encoded", "transform_image_from_file")
+
+Call = Tuple[str, Dict[str, Any]]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))]
+
+
+class RSSSampler:
+    """Track the peak resident set size of a process from /proc."""
+
+    def __init__(self, pid: int, interval: float = 0.05):
+        self.path = f"/proc/{pid}/status"
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        threading.Thread(target=self._sample, daemon=True).start()
+
+    def read_kb(self) -> int:
+        try:
+            with open(self.path) as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        return 0
+
+    def reset(self) -> None:
+        self.peak_kb = self.read_kb()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _sample(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak_kb = max(self.peak_kb, self.read_kb())
+
+
+class ServerProcess:
+    """The MCP server running over SSE in a subprocess, talking to the stub."""
+
+    def __init__(self, base_url: str, workdir: str, log_path: Optional[str] = None):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}/sse"
+        env = {
+            **os.environ,
+            "GEMINI_API_KEY": "stub",
+            "GEMINI_BASE_URL": base_url,
+            "MCP_TRANSPORT": "sse",
+            "MCP_HOST": "127.0.0.1",
+            "MCP_PORT": str(self.port),
+            "OUTPUT_IMAGE_PATH": os.path.join(workdir, "out"),
+            "RESULT_CACHE_ENABLED": "false",
+        }
+        env.pop("REQUEST_LOG_PATH", None)
+        self._log = open(log_path or os.devnull, "w")
+        self.process = subprocess.Popen(
+            [sys.executable, "-c", "import gemini_image_mcp; gemini_image_mcp.main()"],
+            env=env, stdout=self._log, stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Server exited with code {self.process.returncode}")
+            try:
+                socket.create_connection(("127.0.0.1", self.port), timeout=0.5).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise RuntimeError(f"Server did not start listening on port {self.port} within {timeout}s")
+
+    def stop(self) -> None:
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+        self._log.close()
+
+
+def _source_image(workdir: str, size: int) -> Tuple[str, str]:
+    """Write a random source image; return its path and data URL."""
+    data = noise_png(size)
+    path = os.path.join(workdir, f"source_{size}.png")
+    with open(path, "wb") as f:
+        f.write(data)
+    return path, "data:image/png;base64," + base64.b64encode(data).decode()
+
+
+async def _call(client: Client, call: Call) -> Tuple[float, bool]:
+    start = time.perf_counter()
+    try:
+        result = await client.call_tool(call[0], call[1], raise_on_error=False)
+        ok = not result.is_error
+    except Exception:
+        ok = False
+    return time.perf_counter() - start, ok
+
+
+async def _drive(url: str, calls: List[Call], concurrency: int) -> Tuple[List[float], int, float]:
+    """Run ``calls`` over ``concurrency`` SSE sessions; return latencies, errors and wall time."""
+    pending = list(reversed(calls))
+    latencies: List[float] = []
+    errors = 0
+
+    async def session() -> None:
+        nonlocal errors
+        async with Client(url) as client:
+            while pending:
+                elapsed, ok = await _call(client, pending.pop())
+                latencies.append(elapsed)
+                errors += not ok
+
+    start = time.perf_counter()
+    await asyncio.gather(*(session() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - start
+
+
+def _tool_calls(tool: str, count: int, level: int, source_path: str, source_url: str) -> List[Call]:
+    calls = []
+    for i in range(count):
+        # Distinct prompts and no caching, so every call reaches the backend
+        arguments: Dict[str, Any] = {"prompt": f"benchmark {tool} c{level} #{i}: a red balloon", "use_cache": False}
+        if tool == "transform_image_from_encoded":
+            arguments["encoded_image"] = source_url
+        elif tool == "transform_image_from_file":
+            arguments["image_file_path"] = source_path
+        calls.append((tool, arguments))
+    return calls
+
+
+def _report(label: str, latencies: List[float], errors: int, wall: float, peak_kb: int) -> None:
+    ms = [latency * 1000 for latency in latencies]
+    print(f"{label:<44} n={len(ms):4d} err={errors:3d}  "
+          f"p50={_percentile(ms, 50):8.1f}ms p95={_percentile(ms, 95):8.1f}ms p99={_percentile(ms, 99):8.1f}ms  "
+          f"{len(ms) / wall:7.1f} req/s  peak_rss={peak_kb / 1024:6.1f}MiB")
+
+
+async def run(args: argparse.Namespace, server: ServerProcess, rss: RSSSampler, workdir: str) -> None:
+    source_path, source_url = _source_image(workdir, args.source_size)
+    levels = [int(level) for level in args.concurrency.split(",")]
+    tools = args.tools.split(",") if args.tools else TOOLS
+    # One call per tool to import and warm up everything before measuring
+    await _drive(server.url, [_tool_calls(tool, 1, 0, source_path, source_url)[0] for tool in tools], 1)
+    print(f"server rss after warm-up: {rss.read_kb() / 1024:.1f}MiB")
+    for tool in tools:
+        for level in levels:
+            rss.reset()
+            calls = _tool_calls(tool, max(args.requests, level), level, source_path, source_url)
+            latencies, errors, wall = await _drive(server.url, calls, level)
+            _report(f"{tool} c={level}", latencies, errors, wall, rss.peak_kb)
+
+
+def _materialize(arguments: Dict[str, Any], workdir: str, source_path: str) -> Dict[str, Any]:
+    """Fill in arguments that the request log left out."""
+    arguments = dict(arguments)
+    for name, value in arguments.items():
+        if isinstance(value, dict) and "$omitted_chars" in value:
+            chars = value["$omitted_chars"]
+            if name == "encoded_image":
+                # A noise PNG is about 3 * size**2 bytes, 4/3 larger in base64
+                size = max(1, int(math.sqrt(chars * 3 / 4 / 3)))
+                arguments[name] = "data:image/png;base64," + base64.b64encode(noise_png(size)).decode()
+            else:
+                arguments[name] = "x" * chars
+    path = arguments.get("image_file_path")
+    if isinstance(path, str) and not os.path.exists(path):
+        arguments["image_file_path"] = source_path
+    return arguments
+
+
+async def replay(args: argparse.Namespace, server: ServerProcess, rss: RSSSampler, workdir: str) -> None:
+    with open(args.log, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    entries = [entry for entry in entries if entry["tool"] in TOOLS or args.all_tools]
+    if not entries:
+        print(f"No replayable tool calls in {args.log}")
+        return
+    source_path, _ = _source_image(workdir, args.source_size)
+    calls = [(entry["tool"], _materialize(entry["arguments"], workdir, source_path)) for entry in entries]
+    first = entries[0]["ts"]
+    results: Dict[str, List[Tuple[float, bool]]] = {}
+
+    async with Client(server.url) as warm_up:
+        await warm_up.ping()
+    clients = [Client(server.url) for _ in range(args.sessions)]
+    for client in clients:
+        await client.__aenter__()
+    rss.reset()
+    start = time.perf_counter()
+
+    async def send(i: int) -> None:
+        if args.speed > 0:
+            await asyncio.sleep(max(0.0, (entries[i]["ts"] - first) / args.speed - (time.perf_counter() - start)))
+        results.setdefault(entries[i]["tool"], []).append(await _call(clients[i % len(clients)], calls[i]))
+
+    try:
+        await asyncio.gather(*(send(i) for i in range(len(calls))))
+    finally:
+        wall = time.perf_counter() - start
+        for client in clients:
+            await client.__aexit__(None, None, None)
+
+    print(f"replayed {len(calls)} calls from {args.log} in {wall:.1f}s over {args.sessions} sessions")
+    for tool, samples in sorted(results.items()):
+        recorded = [entry["duration"] * 1000 for entry in entries if entry["tool"] == tool]
+        _report(f"{tool} replay", [latency for latency, _ in samples],
+                sum(not ok for _, ok in samples), wall, rss.peak_kb)
+        print(f"{'':<44} recorded p50={_percentile(recorded, 50):8.1f}ms p95={_percentile(recorded, 95):8.1f}ms")
+
+
+async def _main(args: argparse.Namespace) -> None:
+    faults: Dict[str, Any] = {"failure_rate": args.failure_rate}
+    if args.image_size:
+        faults["image_bytes"] = noise_png(args.image_size)
+    httpd, base_url = start_stub_server(latency=args.latency, **faults)
+    with tempfile.TemporaryDirectory() as workdir:
+        server = ServerProcess(base_url, workdir, args.server_log)
+        rss = RSSSampler(server.process.pid)
+        try:
+            await asyncio.to_thread(server.wait_ready)
+            await (run if args.command == "run" else replay)(args, server, rss, workdir)
+        finally:
+            rss.stop()
+            server.stop()
+            httpd.shutdown()
+
+
+def main() -> None:
+    # Setup options shared by both commands, accepted after the command name
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--latency", type=float, default=0.5, help="Stub Gemini latency in seconds")
+    common.add_argument("--failure-rate", type=float, default=0.0, help="Fraction of stub requests answered with 503")
+    common.add_argument("--image-size", type=int, default=0,
+                        help="Edge of the random PNG the stub returns (default: 1x1 PNG)")
+    common.add_argument("--source-size", type=int, default=512, help="Edge of the random source image for transforms")
+    common.add_argument("--server-log", help="Write the server's log output to this file")
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("run", parents=[common])
+    p.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    p.add_argument("--requests", type=int, default=32, help="Calls per tool and concurrency level")
+    p.add_argument("--tools", help=f"Comma-separated subset of {', '.join(TOOLS)}")
+    p = sub.add_parser("replay", parents=[common])
+    p.add_argument("log", help="Request log written with REQUEST_LOG_PATH")
+    p.add_argument("--speed", type=float, default=1.0, help="Replay speed factor; 0 sends every call at once")
+    p.add_argument("--sessions", type=int, default=4, help="SSE sessions to spread the calls over")
+    p.add_argument("--all-tools", action="store_true", help="Also replay calls to tools other than the image tools")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Queue wait per priority lane under a client-side RPM budget.
+
+Sends a burst of batch-lane image requests followed by a few interactive-lane
+requests through server.call_gemini to a local stub Gemini server, with
+GEMINI_IMAGE_RPM set below the offered load. Reports how long each lane
+waited for quota, how many requests were rejected by the queue-depth limit,
+and the scheduler's own statistics.
+
+Usage:
+    python benchmarks/quota_scheduler.py --rpm 120 --batch 40 --interactive 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from google.genai import types
+
+from gemini_image_mcp import client as gemini_client
+from gemini_image_mcp import scheduler, server
+from stub_gemini import start_stub_server
+
+MODEL = "gemini-2.0-flash-preview-image-generation"
+CONFIG = types.GenerateContentConfig(response_modalities=["Text", "Image"])
+
+
+async def _request(lane: str, waits: dict, rejected: dict) -> None:
+    scheduler.current_lane.set(lane)
+    start = time.perf_counter()
+    try:
+        await server.call_gemini(["a red balloon"], model=MODEL, config=CONFIG)
+    except scheduler.QueueFullError:
+        rejected[lane] += 1
+        return
+    waits[lane].append(time.perf_counter() - start)
+
+
+async def run(args: argparse.Namespace) -> None:
+    httpd, base_url = start_stub_server(latency=0.01)
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = base_url
+    scheduler.GEMINI_IMAGE_RPM = args.rpm
+    scheduler.GEMINI_QUEUE_MAX_DEPTH = args.max_depth
+
+    waits = {"interactive": [], "batch": []}
+    rejected = {"interactive": 0, "batch": 0}
+    try:
+        batch = [asyncio.create_task(_request("batch", waits, rejected)) for _ in range(args.batch)]
+        await asyncio.sleep(0.05)
+        interactive = [_request("interactive", waits, rejected) for _ in range(args.interactive)]
+        await asyncio.gather(*batch, *interactive)
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+    for lane, samples in waits.items():
+        samples = samples or [0.0]
+        print(f"{lane:>12}: completed={len(waits[lane]):3d} rejected={rejected[lane]:3d} "
+              f"mean={statistics.mean(samples):6.2f}s max={max(samples):6.2f}s")
+    for name, stats in scheduler.get_scheduler_stats().items():
+        print(f"{name}: " + "  ".join(f"{k}={v:.2f}" if isinstance(v, float) else f"{k}={v}"
+                                      for k, v in stats.items()))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rpm", type=int, default=120)
+    parser.add_argument("--batch", type=int, default=40)
+    parser.add_argument("--interactive", type=int, default=5)
+    parser.add_argument("--max-depth", type=int, default=30)
+    args = parser.parse_args()
+    # Rejected requests are logged as errors; only the summary is of interest
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Success rate and tail latency of Gemini calls under injected faults.
+
+Sends text requests through server.call_gemini to a local stub Gemini server
+that fails a fraction of requests with 503 and delays a fraction by a slow
+tail latency. Each scenario toggles the resilience settings (retries, hedging)
+so their effect on success rate and p95/p99 latency can be compared.
+
+Usage:
+    python benchmarks/resilience.py --requests 200 --failure-rate 0.2
+"""
+import argparse
+import logging
+import asyncio
+import os
+import time
+
+from gemini_image_mcp import client as gemini_client
+from gemini_image_mcp import resilience, server
+from stub_gemini import start_stub_server
+
+SCENARIOS = [
+    ("no retries", {"GEMINI_MAX_RETRIES": 0, "GEMINI_HEDGE_ENABLED": False}),
+    ("retries", {"GEMINI_MAX_RETRIES": 3, "GEMINI_HEDGE_ENABLED": False}),
+    ("retries+hedge", {"GEMINI_MAX_RETRIES": 3, "GEMINI_HEDGE_ENABLED": True}),
+]
+
+
+def _percentile(samples, q: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+async def _scenario(label: str, settings: dict, requests: int, concurrency: int) -> None:
+    for name, value in settings.items():
+        setattr(resilience, name, value)
+    resilience._breakers.clear()
+    resilience._latencies.clear()
+
+    limit = asyncio.Semaphore(concurrency)
+    samples, failures = [], 0
+
+    async def one() -> None:
+        nonlocal failures
+        async with limit:
+            start = time.perf_counter()
+            try:
+                await server.call_gemini(["hello"], model="gemini-2.0-flash", text_only=True)
+            except Exception:
+                failures += 1
+                return
+            samples.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one() for _ in range(requests)))
+    samples.sort()
+    print(f"{label:>14}: success={100 * (requests - failures) / requests:5.1f}%  "
+          f"p50={_percentile(samples, 0.5):7.1f}ms  p95={_percentile(samples, 0.95):7.1f}ms  "
+          f"p99={_percentile(samples, 0.99):7.1f}ms")
+
+
+async def run(args: argparse.Namespace) -> None:
+    httpd, base_url = start_stub_server(
+        latency=args.latency,
+        failure_rate=args.failure_rate,
+        slow_rate=args.slow_rate,
+        slow_latency=args.slow_latency,
+    )
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = base_url
+    resilience.GEMINI_RETRY_BASE_DELAY = args.base_delay
+    resilience.GEMINI_HEDGE_MIN_SAMPLES = 10
+    # Keep the breaker out of the way; this measures retries and hedging
+    resilience.GEMINI_CIRCUIT_FAILURE_THRESHOLD = args.requests
+    try:
+        for label, settings in SCENARIOS:
+            await _scenario(label, settings, args.requests, args.concurrency)
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=1.0)
+    parser.add_argument("--base-delay", type=float, default=0.05)
+    args = parser.parse_args()
+    # Per-request and per-retry log lines would drown out the summary
+    logging.disable(logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Compare "translate" and "single_shot" translation modes.
+
+latency: runs generate_image_from_text for a fixed set of non-English prompts
+    against a local stub Gemini server in both modes and reports latency and
+    the number of upstream requests. Translation adds one sequential round
+    trip per uncached prompt, which single-shot mode removes. (Prompts whose
+    letters are all ASCII skip translation in both modes.)
+
+quality: runs the same prompt set against the real Gemini API (needs
+    GEMINI_API_KEY) in both modes, saves the images side by side and asks
+    DEFAULT_GEMINI_TEXT_MODEL to score how faithfully each image depicts the
+    original prompt (1-10).
+
+Usage:
+    python benchmarks/single_shot.py latency --latency 0.5
+    python benchmarks/single_shot.py quality --out /tmp/single_shot
+"""
+import argparse
+import asyncio
+import base64
+import logging
+import os
+import re
+import statistics
+import time
+
+from fastmcp import Client
+from google.genai import types
+
+from gemini_image_mcp import client as gemini_client
+from gemini_image_mcp import server
+from gemini_image_mcp.cache import TTLCache
+from stub_gemini import start_stub_server
+
+PROMPTS = [
+    "夕焼けの海辺を走る赤い自転車",
+    "눈 덮인 산속의 작은 오두막, 창문에서 따뜻한 불빛",
+    "Un gato naranja durmiendo sobre una pila de libros antiguos",
+    "Une tasse de café fumante sur une table en bois, lumière du matin",
+    "一只熊猫在竹林里吃竹子，水彩画风格",
+    "Ein alter Leuchtturm bei Sturm, dramatische Wolken",
+    "Кит, плывущий среди звёзд в ночном небе",
+    "Um barco de pesca colorido ancorado num porto tranquilo",
+]
+
+MODES = ("translate", "single_shot")
+
+JUDGE_PROMPT = """You are judging an AI-generated image against the request it was generated from.
+The request may be in any language.
+
+Request: {prompt}
+
+Score from 1 to 10 how faithfully the image depicts every subject, attribute and
+setting in the request (10 = everything present and correct). Reply with the
+number only."""
+
+
+async def _run_tool(client: Client, prompt: str, mode: str) -> float:
+    start = time.perf_counter()
+    await client.call_tool("generate_image_from_text", {
+        "prompt": prompt,
+        "use_cache": False,
+        "translation_mode": mode,
+    })
+    return time.perf_counter() - start
+
+
+async def latency(args: argparse.Namespace) -> None:
+    httpd, base_url = start_stub_server(latency=args.latency)
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = base_url
+    try:
+        async with Client(server.mcp) as client:
+            for mode in MODES:
+                # Start each mode with an empty translation cache
+                server.translation_cache = TTLCache(server.TRANSLATION_CACHE_SIZE, server.TRANSLATION_CACHE_TTL)
+                httpd.RequestHandlerClass.served.clear()
+                samples = [await _run_tool(client, prompt, mode) for prompt in PROMPTS]
+                upstream = sum(httpd.RequestHandlerClass.served.values())
+                print(f"{mode:>12}: mean={statistics.mean(samples) * 1000:7.1f}ms  "
+                      f"max={max(samples) * 1000:7.1f}ms  upstream_requests={upstream}")
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+
+async def _judge(prompt: str, image: bytes, mime_type: str) -> int:
+    reply = await server.call_gemini(
+        [JUDGE_PROMPT.format(prompt=prompt), types.Part.from_bytes(data=image, mime_type=mime_type)],
+        model=server.DEFAULT_GEMINI_TEXT_MODEL,
+        text_only=True,
+    )
+    match = re.search(r"\d+", reply)
+    return int(match.group()) if match else 0
+
+
+async def quality(args: argparse.Namespace) -> None:
+    os.makedirs(args.out, exist_ok=True)
+    scores = {mode: [] for mode in MODES}
+    try:
+        async with Client(server.mcp) as client:
+            for i, prompt in enumerate(PROMPTS):
+                row = []
+                for mode in MODES:
+                    result = await client.call_tool("generate_image_from_text", {
+                        "prompt": prompt,
+                        "use_cache": False,
+                        "translation_mode": mode,
+                    })
+                    image = next(c for c in result.content if c.type == "image")
+                    data = base64.b64decode(image.data)
+                    ext = image.mimeType.split("/")[-1]
+                    with open(os.path.join(args.out, f"{i:02d}_{mode}.{ext}"), "wb") as f:
+                        f.write(data)
+                    score = await _judge(prompt, data, image.mimeType)
+                    scores[mode].append(score)
+                    row.append(f"{mode}={score:2d}")
+                print(f"{i:02d} {'  '.join(row)}  {prompt}")
+    finally:
+        await gemini_client.close_clients()
+
+    for mode in MODES:
+        print(f"{mode:>12}: mean score {statistics.mean(scores[mode]):.2f}")
+    print(f"Images saved to {args.out}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("latency")
+    p.add_argument("--latency", type=float, default=0.5)
+    p = sub.add_parser("quality")
+    p.add_argument("--out", default="/tmp/single_shot")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+    asyncio.run(latency(args) if args.command == "latency" else quality(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Minimal local stand-in for the Gemini generateContent REST endpoint.
+
+Serves HTTP/1.1 with keep-alive so connection reuse by the client is visible
+in timings. Text requests get a short text reply; requests that ask for the
+IMAGE response modality get a small inline PNG. streamGenerateContent
+requests are answered as server-sent events, with the text part and the image
+split across separate chunks. GET model lookups return a minimal model.
+
+For resilience testing the server can inject faults and latency: a fraction
+of requests fail with an error status (optionally with a Retry-After header),
+and a fraction are delayed by an extra "slow tail" latency.
+
+For load-balancing tests it can enforce a per-API-key, per-model quota (requests per
+fixed window, answered with 429 and Retry-After once used up), mark models as
+permanently out of quota, and count the requests served per key and model.
+
+Requests with candidateCount get that many candidates, unless the server is
+started with candidate_count_supported=False, in which case they are
+rejected with 400 like models without multi-candidate support.
+
+The Files API upload endpoint (the two-step resumable protocol the SDK
+uses) accepts any file and returns a files/ URI; uploads are counted as
+model "files". request_bytes counts the request body bytes received for
+uploads and for generate calls.
+
+Images default to a 1x1 PNG; pass image_bytes (for example noise_png(1024))
+to return larger ones.
+"""
+import base64
+import io
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from collections import Counter
+from typing import Tuple
+
+# 1x1 transparent PNG
+PNG_BYTES = bytes.fromhex(
+    "89504e470d0a1a0a0000000d4948445200000001000000010806000000"
+    "1f15c4890000000d49444154789c6360606060000000050001a5f645400000000049454e44ae426082"
+)
+
+
+def noise_png(size: int) -> bytes:
+    """Return a ``size`` x ``size`` PNG of random pixels (about 3 * size**2 bytes)."""
+    from PIL import Image
+
+    image = Image.frombytes("RGB", (size, size), os.urandom(size * size * 3))
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+class StubGeminiHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.0
+    failure_rate = 0.0
+    failure_status = 503
+    retry_after = None
+    slow_rate = 0.0
+    slow_latency = 0.0
+    key_quota = 0
+    quota_window = 1.0
+    exhausted_models: Tuple[str, ...] = ()
+    candidate_count_supported = True
+    image_bytes = PNG_BYTES
+    # Shared per server; start_stub_server gives each server its own
+    served: Counter = Counter()
+    request_bytes: Counter = Counter()
+    _window_counts: Counter = Counter()
+    _lock = threading.Lock()
+
+    def _send_error(self, status: int, retry_after=None, message: str = "Injected failure") -> None:
+        body = json.dumps({"error": {
+            "code": status,
+            "message": message,
+            "status": {400: "INVALID_ARGUMENT", 429: "RESOURCE_EXHAUSTED"}.get(status, "UNAVAILABLE"),
+        }}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if retry_after is not None:
+            self.send_header("Retry-After", str(retry_after))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _over_quota(self, api_key: str, model: str) -> bool:
+        if model in self.exhausted_models:
+            return True
+        if not self.key_quota:
+            return False
+        window = int(time.monotonic() / self.quota_window)
+        with self._lock:
+            self._window_counts[(api_key, model, window)] += 1
+            return self._window_counts[(api_key, model, window)] > self.key_quota
+
+    def _upload(self, body: bytes) -> None:
+        api_key = self.headers.get("x-goog-api-key", "")
+        with self._lock:
+            self.request_bytes["upload"] += len(body)
+        if self.path.startswith("/upload-session/"):
+            with self._lock:
+                self.served[(api_key, "files")] += 1
+            name = self.path.rsplit("/", 1)[-1]
+            host = self.headers.get("Host")
+            reply = json.dumps({"file": {
+                "name": f"files/{name}",
+                "uri": f"http://{host}/v1beta/files/{name}",
+                "mimeType": self.headers.get("X-Goog-Upload-Header-Content-Type") or "application/octet-stream",
+                "sizeBytes": str(len(body)),
+                "state": "ACTIVE",
+            }}).encode()
+            self.send_response(200)
+            self.send_header("X-Goog-Upload-Status", "final")
+        else:
+            # Start of a resumable upload: hand out the URL to send the bytes to
+            reply = b"{}"
+            self.send_response(200)
+            self.send_header("X-Goog-Upload-URL", f"http://{self.headers.get('Host')}/upload-session/{random.getrandbits(64):016x}")
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(reply)))
+        self.end_headers()
+        self.wfile.write(reply)
+
+    def do_GET(self):
+        # Model lookups (models.get), as sent by the server's warm-up
+        model = self.path.split("/models/")[-1].split("?")[0]
+        body = json.dumps({"name": f"models/{model}", "displayName": model}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", "0"))
+        body = self.rfile.read(length)
+        if self.path.startswith(("/upload/", "/upload-session/")):
+            self._upload(body)
+            return
+        with self._lock:
+            self.request_bytes["generate"] += len(body)
+        request = json.loads(body or b"{}")
+        delay = self.latency
+        if self.slow_rate and random.random() < self.slow_rate:
+            delay += self.slow_latency
+        if delay:
+            time.sleep(delay)
+        if self.failure_rate and random.random() < self.failure_rate:
+            self._send_error(self.failure_status, self.retry_after)
+            return
+
+        api_key = self.headers.get("x-goog-api-key", "")
+        model = self.path.split("/models/")[-1].split(":")[0]
+        if self._over_quota(api_key, model):
+            self._send_error(429, self.retry_after)
+            return
+        with self._lock:
+            self.served[(api_key, model)] += 1
+
+        generation_config = request.get("generationConfig") or {}
+        candidate_count = generation_config.get("candidateCount") or 1
+        if candidate_count > 1 and not self.candidate_count_supported:
+            self._send_error(400, message="Multiple candidates is not enabled for this model")
+            return
+        modalities = generation_config.get("responseModalities") or []
+        if any(m.upper() == "IMAGE" for m in modalities):
+            parts = [
+                {"text": "Here is your image."},
+                {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(self.image_bytes).decode()}},
+            ]
+        else:
+            parts = [{"text": "a red balloon"}]
+
+        if "streamGenerateContent" in self.path:
+            chunks = [
+                {"candidates": [{"index": i, "content": {"role": "model", "parts": [part]}}]}
+                for part in parts for i in range(candidate_count)
+            ]
+            body = "".join(f"data: {json.dumps(chunk)}\r\n\r\n" for chunk in chunks).encode()
+            content_type = "text/event-stream"
+        else:
+            candidates = [{"index": i, "content": {"role": "model", "parts": parts}} for i in range(candidate_count)]
+            body = json.dumps({"candidates": candidates}).encode()
+            content_type = "application/json"
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(latency: float = 0.0, **faults) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the stub server on a free local port in a background thread.
+
+    Args:
+        latency: Seconds to wait before answering every request
+        **faults: Overrides for the fault injection settings on
+                  StubGeminiHandler (failure_rate, failure_status, retry_after,
+                  slow_rate, slow_latency, key_quota, quota_window,
+                  exhausted_models, candidate_count_supported,
+                  image_bytes)
+
+    Returns:
+        Tuple of the running server and its base URL
+    """
+    handler = type("Handler", (StubGeminiHandler,), {
+        "latency": latency,
+        "served": Counter(),
+        "request_bytes": Counter(),
+        "_window_counts": Counter(),
+        "_lock": threading.Lock(),
+        **faults,
+    })
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    host, port = httpd.server_address[:2]
+    return httpd, f"http://{host}:{port}"
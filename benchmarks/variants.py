@@ -0,0 +1,89 @@
+"""Compare asking for N variants in one call with calling the tool N times.
+
+Runs generate_image_from_text against a local stub Gemini server for a set of
+non-English prompts, once as --variants separate calls per prompt and once as
+a single call with variant_count, and reports latency and upstream requests.
+Separate calls translate each prompt once (later ones hit the translation
+cache) but generate sequentially; variant_count shares the translation and
+asks for all variants at once. The variant_count run is repeated with the
+stub rejecting candidate_count, so the variants are fanned out in parallel.
+
+Usage:
+    python benchmarks/variants.py --latency 0.5 --variants 3
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import time
+
+from fastmcp import Client
+
+from gemini_image_mcp import client as gemini_client
+from gemini_image_mcp import server
+from gemini_image_mcp.cache import TTLCache
+from stub_gemini import start_stub_server
+
+PROMPTS = [
+    "夕焼けの海辺を走る赤い自転車",
+    "Un gato naranja durmiendo sobre una pila de libros antiguos",
+    "Une tasse de café fumante sur une table en bois, lumière du matin",
+    "Кит, плывущий среди звёзд в ночном небе",
+]
+
+
+async def _repeated(client: Client, prompt: str, variants: int) -> float:
+    start = time.perf_counter()
+    for _ in range(variants):
+        await client.call_tool("generate_image_from_text", {"prompt": prompt, "use_cache": False})
+    return time.perf_counter() - start
+
+
+async def _variant_count(client: Client, prompt: str, variants: int) -> float:
+    start = time.perf_counter()
+    await client.call_tool("generate_image_from_text", {
+        "prompt": prompt,
+        "use_cache": False,
+        "variant_count": variants,
+    })
+    return time.perf_counter() - start
+
+
+async def run(args: argparse.Namespace) -> None:
+    httpd, base_url = start_stub_server(latency=args.latency)
+    os.environ.setdefault("GEMINI_API_KEY", "stub")
+    os.environ["GEMINI_BASE_URL"] = base_url
+    scenarios = [
+        ("repeated calls", _repeated, True),
+        ("candidate_count", _variant_count, True),
+        ("parallel seeds", _variant_count, False),
+    ]
+    try:
+        async with Client(server.mcp) as client:
+            for label, call, supported in scenarios:
+                httpd.RequestHandlerClass.candidate_count_supported = supported
+                server._candidate_count_unsupported.clear()
+                server.translation_cache = TTLCache(server.TRANSLATION_CACHE_SIZE, server.TRANSLATION_CACHE_TTL)
+                httpd.RequestHandlerClass.served.clear()
+                samples = [await call(client, prompt, args.variants) for prompt in PROMPTS]
+                upstream = sum(httpd.RequestHandlerClass.served.values())
+                print(f"{label:>16}: mean={statistics.mean(samples) * 1000:7.1f}ms per prompt  "
+                      f"upstream_requests={upstream}")
+    finally:
+        await gemini_client.close_clients()
+        httpd.shutdown()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--variants", type=int, default=3)
+    args = parser.parse_args()
+    # The rejected candidate_count probe is logged as an error
+    logging.disable(logging.CRITICAL)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
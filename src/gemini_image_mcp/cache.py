@@ -0,0 +1,333 @@
+import atexit
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from .shared import SharedStore
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Thread-safe LRU cache whose entries also expire after a fixed TTL.
+
+    When ``persist_path`` is set, the cache is loaded from that JSON file on
+    creation, so values must be JSON serializable. Updates are written back
+    at most once every ``persist_interval`` seconds and at exit; each write
+    merges in the entries other processes saved to the same file. With a
+    ``shared`` store, entries are also written there and local misses are
+    looked up there, so several processes share one cache.
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl: float,
+        persist_path: Optional[str] = None,
+        shared: Optional[SharedStore] = None,
+        persist_interval: float = 5.0,
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.shared = shared
+        self.persist_interval = persist_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = 0.0
+        self._save_timer: Optional[threading.Timer] = None
+        if persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for ``key`` or None if missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+
+        value = self._shared_get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._memory_set(key, value)
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store ``value`` under ``key``, evicting the least recently used entry if full."""
+        with self._lock:
+            self._memory_set(key, value)
+            if self.persist_path:
+                self._dirty = True
+                self._schedule_save()
+        if self.shared is not None:
+            try:
+                self.shared.set(key, json.dumps(value, ensure_ascii=False).encode("utf-8"), self.ttl)
+            except Exception as e:
+                logger.warning(f"Could not write cache entry to the shared store: {str(e)}")
+
+    def flush(self) -> None:
+        """Write pending updates to ``persist_path`` now."""
+        with self._lock:
+            if self._save_timer is not None:
+                self._save_timer.cancel()
+                self._save_timer = None
+            if self._dirty:
+                self._save()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the current number of entries."""
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _schedule_save(self) -> None:
+        # Called with the lock held; coalesces bursts of updates into one write
+        if self._save_timer is not None:
+            return
+        delay = self._last_save + self.persist_interval - time.monotonic()
+        if delay <= 0:
+            self._save()
+            return
+        self._save_timer = threading.Timer(delay, self._timed_save)
+        self._save_timer.daemon = True
+        self._save_timer.start()
+
+    def _timed_save(self) -> None:
+        with self._lock:
+            self._save_timer = None
+            if self._dirty:
+                self._save()
+
+    def _memory_set(self, key: str, value: Any) -> None:
+        self._entries[key] = (time.time() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _shared_get(self, key: str) -> Optional[Any]:
+        if self.shared is None:
+            return None
+        try:
+            stored = self.shared.get(key)
+            return json.loads(stored) if stored is not None else None
+        except Exception as e:
+            logger.warning(f"Could not read cache entry from the shared store: {str(e)}")
+            return None
+
+    def _read_persisted(self) -> Dict[str, Any]:
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            logger.warning(f"Could not load cache from {self.persist_path}: {str(e)}")
+            return {}
+
+    def _load(self) -> None:
+        stored = self._read_persisted()
+        if not stored:
+            return
+
+        now = time.time()
+        for key, (expires_at, value) in stored.items():
+            if expires_at >= now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        logger.info(f"Loaded {len(self._entries)} cache entries from {self.persist_path}")
+
+    def _save(self) -> None:
+        # Called with the lock held. Other processes may share the file, so
+        # keep their unexpired entries and write through a temp file of our own.
+        now = time.time()
+        merged = {
+            key: entry
+            for key, entry in self._read_persisted().items()
+            if key not in self._entries and entry[0] >= now
+        }
+        merged.update(self._entries)
+        entries = list(merged.items())[-self.max_entries:]
+
+        directory = os.path.dirname(self.persist_path) or "."
+        tmp_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                dir=directory, prefix=f"{os.path.basename(self.persist_path)}.", suffix=".tmp"
+            )
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(dict(entries), f, ensure_ascii=False)
+            os.replace(tmp_path, self.persist_path)
+        except Exception as e:
+            logger.warning(f"Could not persist cache to {self.persist_path}: {str(e)}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+
+class ResultCache:
+    """Two-tier cache for generated images keyed on a content hash.
+
+    The memory tier is an LRU bounded by total bytes. The optional disk tier
+    stores one file per entry under ``disk_dir`` and evicts
+    the oldest files once ``disk_bytes`` is exceeded. The optional ``shared``
+    tier is a store used by every server process. Entries in all tiers
+    expire ``ttl`` seconds after they were written.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int,
+        ttl: float,
+        disk_dir: Optional[str] = None,
+        disk_bytes: int = 0,
+        shared: Optional[SharedStore] = None,
+    ):
+        self.memory_bytes = memory_bytes
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.disk_bytes = disk_bytes
+        self.shared = shared
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, bytes, str]]" = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """Return ``(data, format)`` for ``key`` from memory, disk or the shared store, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] >= time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            if entry is not None:
+                self._evict(key)
+
+        found = self._disk_get(key) or self._shared_get(key)
+        with self._lock:
+            if found is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            data, fmt, expires_at = found
+            self._memory_set(key, data, fmt, expires_at)
+        return data, fmt
+
+    def set(self, key: str, data: bytes, fmt: str) -> None:
+        """Store image bytes in the memory tier and, if configured, on disk and in the shared store."""
+        with self._lock:
+            self._memory_set(key, data, fmt)
+        if self.disk_dir and self.disk_bytes > 0:
+            self._disk_set(key, data, fmt)
+        if self.shared is not None:
+            try:
+                self.shared.set(key, fmt.encode("ascii") + b"\n" + data, self.ttl)
+            except Exception as e:
+                logger.warning(f"Could not write result cache entry {key} to the shared store: {str(e)}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and memory tier usage."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "memory_bytes": self._memory_used,
+        }
+
+    def _memory_set(self, key: str, data: bytes, fmt: str, expires_at: Optional[float] = None) -> None:
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (expires_at or time.time() + self.ttl, data, fmt)
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: str) -> None:
+        _, data, _ = self._entries.pop(key)
+        self._memory_used -= len(data)
+
+    def _disk_get(self, key: str) -> Optional[Tuple[bytes, str, float]]:
+        if not self.disk_dir:
+            return None
+        path = os.path.join(self.disk_dir, key)
+        try:
+            expires_at = os.path.getmtime(path) + self.ttl
+            if expires_at < time.time():
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                fmt = f.readline().strip().decode("ascii")
+                return f.read(), fmt, expires_at
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Could not read result cache entry {key}: {str(e)}")
+            return None
+
+    def _shared_get(self, key: str) -> Optional[Tuple[bytes, str, float]]:
+        # Stored like the disk tier: a format line followed by the raw bytes
+        if self.shared is None:
+            return None
+        try:
+            stored = self.shared.get(key)
+        except Exception as e:
+            logger.warning(f"Could not read result cache entry {key} from the shared store: {str(e)}")
+            return None
+        if stored is None:
+            return None
+        fmt, _, data = stored.partition(b"\n")
+        return data, fmt.decode("ascii"), time.time() + self.ttl
+
+    def _disk_set(self, key: str, data: bytes, fmt: str) -> None:
+        # Each file starts with a one-line format header followed by the raw bytes
+        path = os.path.join(self.disk_dir, key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(fmt.encode("ascii") + b"\n")
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._disk_evict()
+        except Exception as e:
+            logger.warning(f"Could not write result cache entry {key}: {str(e)}")
+
+    def _disk_evict(self) -> None:
+        now = time.time()
+        files = []
+        for entry in os.scandir(self.disk_dir):
+            if not entry.is_file() or entry.name.endswith(".tmp"):
+                continue
+            stat = entry.stat()
+            if stat.st_mtime + self.ttl < now:
+                os.remove(entry.path)
+            else:
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            os.remove(path)
+            total -= size
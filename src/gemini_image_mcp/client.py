@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import httpx
+
+from .lazy import LazyModule
+
+genai = LazyModule("google.genai")
+types = LazyModule("google.genai.types")
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== Connection Pool Settings ====================
+
+# Maximum number of open connections to the Gemini API per client
+GEMINI_HTTP_MAX_CONNECTIONS = int(os.environ.get("GEMINI_HTTP_MAX_CONNECTIONS", "32"))
+
+# Idle connections kept open for reuse between requests
+GEMINI_HTTP_MAX_KEEPALIVE = int(os.environ.get("GEMINI_HTTP_MAX_KEEPALIVE", "16"))
+
+# Seconds an idle keep-alive connection stays in the pool
+GEMINI_HTTP_KEEPALIVE_EXPIRY = float(os.environ.get("GEMINI_HTTP_KEEPALIVE_EXPIRY", "60"))
+
+# Seconds a rotated-out client stays open before it is closed, so requests
+# already in flight on it can finish; keep it above GEMINI_REQUEST_DEADLINE
+GEMINI_CLIENT_RETIRE_GRACE = float(os.environ.get("GEMINI_CLIENT_RETIRE_GRACE", "300"))
+
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, Optional[str], Optional[str]], genai.Client] = {}
+_retired_clients: List[genai.Client] = []
+# Pending delayed closes, referenced so they are not garbage collected
+_close_tasks: Set[asyncio.Task] = set()
+
+
+def get_api_keys() -> List[str]:
+    """Return the configured API keys.
+
+    GEMINI_API_KEYS holds a comma-separated list of keys to spread requests
+    over; if it is not set, GEMINI_API_KEY is used as the only key.
+
+    Raises:
+        ValueError: If no API key is configured
+    """
+    keys = [k.strip() for k in os.environ.get("GEMINI_API_KEYS", "").split(",") if k.strip()]
+    if not keys and os.environ.get("GEMINI_API_KEY"):
+        keys = [os.environ["GEMINI_API_KEY"]]
+    if not keys:
+        raise ValueError("GEMINI_API_KEY environment variable not set")
+    return keys
+
+
+def _current_config(api_key: Optional[str], api_keys: List[str]) -> Tuple[str, Optional[str], Optional[str]]:
+    """Read the settings that determine which client to use from the environment."""
+    return (
+        api_key or api_keys[0],
+        os.environ.get("GEMINI_BASE_URL") or None,
+        os.environ.get("GEMINI_API_VERSION") or None,
+    )
+
+
+def _build_client(api_key: str, base_url: Optional[str], api_version: Optional[str]) -> genai.Client:
+    """Create a Gemini client backed by a keep-alive connection pool."""
+    limits = httpx.Limits(
+        max_connections=GEMINI_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=GEMINI_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=GEMINI_HTTP_KEEPALIVE_EXPIRY,
+    )
+    http_options = types.HttpOptions(
+        base_url=base_url,
+        api_version=api_version,
+        client_args={"limits": limits},
+        async_client_args={"limits": limits},
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+def get_client(api_key: Optional[str] = None) -> genai.Client:
+    """Return the process-wide Gemini client for an API key, creating it on first use.
+
+    There is one client per API key. Clients are rebuilt when GEMINI_BASE_URL
+    or GEMINI_API_VERSION change, and dropped when their key is removed from
+    the configured keys; such clients are retired and closed only after
+    GEMINI_CLIENT_RETIRE_GRACE seconds, so requests already in flight on them
+    can finish.
+
+    Args:
+        api_key: API key to use; defaults to the first configured key
+
+    Returns:
+        A shared genai.Client instance
+
+    Raises:
+        ValueError: If no API key is configured
+    """
+    api_keys = get_api_keys()
+    config = _current_config(api_key, api_keys)
+    with _lock:
+        for stale in [c for c in _clients if c[1:] != config[1:]]:
+            logger.info("Gemini client configuration changed, rotating client")
+            _retire(_clients.pop(stale))
+        for stale in [c for c in _clients if c[0] not in api_keys and c[0] != config[0]]:
+            logger.info(f"API key ...{stale[0][-4:]} is no longer configured, retiring its client")
+            _retire(_clients.pop(stale))
+
+        client = _clients.get(config)
+        if client is not None:
+            return client
+
+        client = _build_client(*config)
+        _clients[config] = client
+        logger.info(f"Created Gemini client for key ...{config[0][-4:]}")
+        return client
+
+
+def _retire(client: genai.Client) -> None:
+    """Take a client out of use and schedule it to be closed after the grace period.
+
+    Must be called with ``_lock`` held. Without a running event loop the
+    client stays retired until ``close_clients()``.
+    """
+    _retired_clients.append(client)
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    task = loop.create_task(_close_retired(client, GEMINI_CLIENT_RETIRE_GRACE))
+    _close_tasks.add(task)
+    task.add_done_callback(_close_tasks.discard)
+
+
+async def _close_retired(client: genai.Client, delay: float) -> None:
+    """Close a retired client once requests in flight on it have had ``delay`` seconds."""
+    await asyncio.sleep(delay)
+    with _lock:
+        if client not in _retired_clients:
+            # Already closed by close_clients()
+            return
+        _retired_clients.remove(client)
+    await _close(client)
+    logger.info("Closed retired Gemini client")
+
+
+async def _close(client: genai.Client) -> None:
+    try:
+        await client.aio.aclose()
+        client.close()
+    except Exception as e:
+        logger.warning(f"Error closing Gemini client: {str(e)}")
+
+
+async def close_clients() -> None:
+    """Close the active clients and any retired clients."""
+    with _lock:
+        clients = _retired_clients + list(_clients.values())
+        _retired_clients.clear()
+        _clients.clear()
+        tasks = list(_close_tasks)
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    for client in clients:
+        await _close(client)
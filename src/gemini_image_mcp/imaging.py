@@ -0,0 +1,288 @@
+from __future__ import annotations
+
+import binascii
+import logging
+import os
+import struct
+from io import BytesIO
+from typing import Dict, Optional, Tuple
+
+from .lazy import LazyModule
+
+logger = logging.getLogger(__name__)
+
+Image = LazyModule("PIL.Image")
+ImageOps = LazyModule("PIL.ImageOps")
+features = LazyModule("PIL.features")
+types = LazyModule("google.genai.types")
+
+# Image MIME types Gemini accepts as inline data without conversion
+UPLOAD_MIME_TYPES = {"image/png", "image/jpeg", "image/webp", "image/heic", "image/heif"}
+
+# Pre-upload policy for source images. Images whose longest edge exceeds
+# UPLOAD_MAX_EDGE (0 disables) or that carry a non-default EXIF orientation are
+# decoded, downscaled/rotated and re-encoded as UPLOAD_FORMAT ("jpeg", "webp"
+# or "original"). Everything else is forwarded untouched.
+UPLOAD_MAX_EDGE = int(os.environ.get("UPLOAD_MAX_EDGE", "2048"))
+UPLOAD_FORMAT = os.environ.get("UPLOAD_FORMAT", "jpeg").lower()
+UPLOAD_QUALITY = int(os.environ.get("UPLOAD_QUALITY", "90"))
+
+_EXIF_ORIENTATION = 0x0112
+
+# Largest source image accepted, in decoded bytes
+MAX_INPUT_IMAGE_BYTES = int(os.environ.get("MAX_INPUT_IMAGE_BYTES", str(32 * 1024 * 1024)))
+
+# Characters of base64 text decoded per step
+_BASE64_CHUNK_CHARS = 1024 * 1024
+
+# Skipped when decoding, as base64.b64decode does for line-wrapped input
+_BASE64_WHITESPACE = b" \t\n\r\v\f"
+
+# Running totals of source image bytes before and after the pre-upload stage
+upload_stats: Dict[str, int] = {"images": 0, "resized": 0, "bytes_in": 0, "bytes_out": 0}
+
+# JPEG start-of-frame markers that carry the image dimensions
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """Walk JPEG segment headers until a start-of-frame marker is found."""
+    offset = 2
+    while offset + 4 <= len(data):
+        if data[offset] != 0xFF:
+            return None
+        marker = data[offset + 1]
+        if marker == 0xFF:
+            offset += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            offset += 2
+            continue
+        (length,) = struct.unpack(">H", data[offset + 2:offset + 4])
+        if marker in _JPEG_SOF_MARKERS and offset + 9 <= len(data):
+            height, width = struct.unpack(">HH", data[offset + 5:offset + 9])
+            return width, height
+        offset += 2 + length
+    return None
+
+
+def _webp_size(data: bytes) -> Optional[Tuple[int, int]]:
+    chunk = data[12:16]
+    if chunk == b"VP8 " and len(data) >= 30:
+        width, height = struct.unpack("<HH", data[26:30])
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L" and len(data) >= 25:
+        bits = int.from_bytes(data[21:25], "little")
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X" and len(data) >= 30:
+        return int.from_bytes(data[24:27], "little") + 1, int.from_bytes(data[27:30], "little") + 1
+    return None
+
+
+def sniff_image(data: bytes) -> Tuple[str, Optional[Tuple[int, int]]]:
+    """Identify an image's MIME type and dimensions from its header bytes.
+
+    Only the first few bytes (or, for JPEG, the segment headers) are read, so
+    this is cheap even for very large images.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        Tuple of the MIME type and ``(width, height)``, or None for the size
+        if it cannot be read from the header
+
+    Raises:
+        ValueError: If the data is not a recognized image format
+    """
+    if data[:8] == b"\x89PNG\r\n\x1a\n" and len(data) >= 24:
+        return "image/png", struct.unpack(">II", data[16:24])
+    if data[:3] == b"\xff\xd8\xff":
+        return "image/jpeg", _jpeg_size(data)
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp", _webp_size(data)
+    if data[:6] in (b"GIF87a", b"GIF89a") and len(data) >= 10:
+        return "image/gif", struct.unpack("<HH", data[6:10])
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+        return ("image/heic" if data[8:12] in (b"heic", b"heix") else "image/heif"), None
+    if data[:2] == b"BM" and len(data) >= 26:
+        width, height = struct.unpack("<ii", data[18:26])
+        return "image/bmp", (width, abs(height))
+    if data[:4] in (b"II*\x00", b"MM\x00*"):
+        return "image/tiff", None
+    raise ValueError("Could not identify image format. Supported formats include PNG, JPEG, GIF, WebP.")
+
+
+def decode_base64_chunked(encoded: str, start: int = 0, max_bytes: int = MAX_INPUT_IMAGE_BYTES) -> bytes:
+    """Decode the base64 text in ``encoded[start:]`` in fixed-size chunks.
+
+    ASCII whitespace, such as the line breaks of wrapped base64, is skipped.
+    Each chunk is validated strictly and its decoded size is checked against
+    ``max_bytes`` before it is decoded, so oversized or malformed input is
+    rejected without first materializing a full copy of it. Only one chunk of
+    text is copied at a time instead of slicing out the whole payload.
+
+    Args:
+        encoded: String containing base64 text, e.g. a data URL
+        start: Offset at which the base64 text begins
+        max_bytes: Maximum decoded size in bytes
+
+    Returns:
+        The decoded bytes
+
+    Raises:
+        ValueError: If the decoded data would exceed ``max_bytes``
+        binascii.Error: If the text is not valid base64
+    """
+    buffer = BytesIO()
+    carry = b""
+    for offset in range(start, len(encoded), _BASE64_CHUNK_CHARS):
+        try:
+            text = encoded[offset:offset + _BASE64_CHUNK_CHARS].encode("ascii")
+        except UnicodeEncodeError:
+            raise binascii.Error("Non-ASCII character in base64 data") from None
+        text = carry + text.translate(None, _BASE64_WHITESPACE)
+        # Decode whole 4-character groups; the rest waits for the next chunk
+        usable = len(text) - len(text) % 4
+        carry = text[usable:]
+        decoded_size = buffer.tell() + usable // 4 * 3 - text.count(b"=", max(0, usable - 2), usable)
+        if decoded_size > max_bytes:
+            raise ValueError(f"Image is too large: more than {max_bytes} bytes")
+        buffer.write(binascii.a2b_base64(text[:usable], strict_mode=True))
+    if carry:
+        raise binascii.Error("Incorrect base64 padding")
+    return buffer.getvalue()
+
+
+def _has_alpha(image: Image.Image) -> bool:
+    return image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+
+
+def _encode(image: Image.Image, fmt: str, quality: int) -> bytes:
+    """Encode ``image`` as ``fmt`` ("png", "jpeg", "webp" or "avif")."""
+    if fmt == "jpeg":
+        image = image.convert("RGB")
+    elif image.mode not in ("RGB", "RGBA", "L", "LA"):
+        image = image.convert("RGBA" if _has_alpha(image) else "RGB")
+
+    buffer = BytesIO()
+    if fmt == "png":
+        image.save(buffer, format="PNG")
+    else:
+        image.save(buffer, format=fmt.upper(), quality=quality)
+    return buffer.getvalue()
+
+
+def _encode_for_upload(image: Image.Image, source_mime: str) -> Tuple[bytes, str]:
+    """Encode a processed image using the configured upload format."""
+    target = UPLOAD_FORMAT
+    if target == "original":
+        target = source_mime.split("/")[-1] if source_mime in UPLOAD_MIME_TYPES else "png"
+    if target in ("heic", "heif") or (target == "jpeg" and _has_alpha(image)):
+        target = "png"
+    return _encode(image, target, UPLOAD_QUALITY), f"image/{target}"
+
+
+def _forward_unchanged(data: bytes, mime_type: str, size: Optional[Tuple[int, int]]) -> types.Part:
+    logger.info(f"Forwarding {mime_type} image {size} ({len(data)} bytes) without re-encoding")
+    upload_stats["bytes_out"] += len(data)
+    return types.Part.from_bytes(data=data, mime_type=mime_type)
+
+
+def image_part_from_bytes(data: bytes) -> types.Part:
+    """Build a Gemini request part from encoded image bytes.
+
+    Images in a format Gemini accepts, within UPLOAD_MAX_EDGE and without an
+    EXIF rotation are forwarded as-is with their sniffed MIME type, avoiding a
+    decode/re-encode. Otherwise the image is decoded (using JPEG draft mode to
+    decode at reduced scale where possible), downscaled, rotated upright and
+    re-encoded per UPLOAD_FORMAT/UPLOAD_QUALITY. This is CPU bound; call it
+    from a worker thread.
+
+    Args:
+        data: Encoded image bytes
+
+    Returns:
+        A Part with inline image data
+
+    Raises:
+        ValueError: If the data is not a recognized image format
+    """
+    mime_type, size = sniff_image(data)
+    upload_stats["images"] += 1
+    upload_stats["bytes_in"] += len(data)
+
+    try:
+        image = Image.open(BytesIO(data))
+    except Image.UnidentifiedImageError:
+        if mime_type not in UPLOAD_MIME_TYPES:
+            raise ValueError("Could not identify image format. Supported formats include PNG, JPEG, GIF, WebP.")
+        # e.g. HEIC without a PIL plugin; Gemini can still read it as-is
+        return _forward_unchanged(data, mime_type, size)
+
+    with image:
+        size = image.size
+        orientation = image.getexif().get(_EXIF_ORIENTATION, 1)
+        oversized = bool(UPLOAD_MAX_EDGE and max(size) > UPLOAD_MAX_EDGE)
+        if mime_type in UPLOAD_MIME_TYPES and not oversized and orientation == 1:
+            return _forward_unchanged(data, mime_type, size)
+
+        processed = image
+        if oversized:
+            scale = UPLOAD_MAX_EDGE / max(size)
+            # For JPEG, draft() makes the decoder scale by 1/2, 1/4 or 1/8
+            # directly; thumbnail() then uses reduce() before resampling
+            processed.draft("RGB", (round(size[0] * scale), round(size[1] * scale)))
+            processed.thumbnail((UPLOAD_MAX_EDGE, UPLOAD_MAX_EDGE), Image.Resampling.LANCZOS, reducing_gap=3.0)
+            upload_stats["resized"] += 1
+        if orientation != 1:
+            processed = ImageOps.exif_transpose(processed)
+
+        encoded, upload_mime = _encode_for_upload(processed, mime_type)
+
+    upload_stats["bytes_out"] += len(encoded)
+    logger.info(
+        f"Prepared {mime_type} image {size} for upload as {upload_mime} {processed.size}: "
+        f"{len(data)} -> {len(encoded)} bytes"
+    )
+    return types.Part.from_bytes(data=encoded, mime_type=upload_mime)
+
+
+def transcode_image(
+    data: bytes,
+    fmt: Optional[str] = None,
+    quality: int = 85,
+    max_edge: int = 0,
+) -> Tuple[bytes, str]:
+    """Re-encode and/or downscale an encoded image.
+
+    Runs entirely on bytes so it can be submitted to a process pool. If the
+    image already has the requested format and fits within ``max_edge``, the
+    input is returned unchanged without decoding pixel data.
+
+    Args:
+        data: Encoded image bytes
+        fmt: Target format ("png", "jpeg", "webp" or "avif"); None keeps the source format
+        quality: Encoder quality for lossy formats
+        max_edge: Maximum length of the longest edge in pixels; 0 means no limit
+
+    Returns:
+        Tuple of the encoded bytes and their format name
+    """
+    with Image.open(BytesIO(data)) as image:
+        source_fmt = (image.format or "png").lower()
+        target = (fmt or source_fmt).lower()
+        if target == "jpg":
+            target = "jpeg"
+        if target == "avif" and not features.check("avif"):
+            logger.warning("AVIF encoding is not available in this Pillow build, using WebP")
+            target = "webp"
+
+        oversized = bool(max_edge and max(image.size) > max_edge)
+        if target == source_fmt and not oversized:
+            return data, source_fmt
+
+        if oversized:
+            image.draft("RGB", (max_edge, max_edge))
+            image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        return _encode(image, target, quality), target
@@ -0,0 +1,365 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from .shared import SharedStore
+
+logger = logging.getLogger(__name__)
+
+# Job lifecycle: queued -> running -> succeeded | failed
+JOB_STATUSES = ("queued", "running", "succeeded", "failed")
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+# Called in a worker thread with the expired jobs of one kind
+JobCleanup = Callable[[List[Dict[str, Any]]], None]
+
+# Shared stores keep expired records this much longer, so a process can see
+# them expire and clean up after them before the store drops them
+_EXPIRED_RECORD_GRACE = 3600.0
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when a job is submitted while the queue is at capacity."""
+
+
+class JobStore:
+    """Job records kept in memory or in a shared store.
+
+    With a ``shared`` store, records live only there (under ``job:``), so every
+    server process sees the same jobs and they survive a restart. Each
+    unfinished job also has a lease (under ``claim:``) naming the process
+    that runs it; a job whose lease lapses is picked up by another process.
+    Finished records outlive their expiry by ``_EXPIRED_RECORD_GRACE``
+    seconds in the shared store, so that ``purge_expired`` can return them.
+    """
+
+    def __init__(self, shared: Optional[SharedStore] = None):
+        self.shared = shared
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._records = shared.namespace("job:") if shared is not None else None
+        self._claims = shared.namespace("claim:") if shared is not None else None
+
+    def put(self, job: Dict[str, Any]) -> None:
+        """Insert or replace a job record."""
+        if self._records is not None:
+            ttl = None
+            if job.get("expires_at") is not None:
+                ttl = job["expires_at"] - time.time() + _EXPIRED_RECORD_GRACE
+            self._records.set(job["id"], json.dumps(job).encode("utf-8"), ttl)
+            return
+        with self._lock:
+            self._jobs[job["id"]] = job
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the job record, or None if it does not exist."""
+        if self._records is not None:
+            record = self._records.get(job_id)
+            return json.loads(record) if record is not None else None
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **changes: Any) -> Dict[str, Any]:
+        """Apply ``changes`` to a job record and return the updated copy."""
+        job = self.get(job_id)
+        if job is None:
+            raise KeyError(job_id)
+        job = {**job, **changes, "updated_at": time.time()}
+        self.put(job)
+        return job
+
+    def with_status(self, *statuses: str) -> List[Dict[str, Any]]:
+        """Return copies of all jobs in one of ``statuses``, oldest first."""
+        if self._records is not None:
+            jobs = [json.loads(record) for _, record in self._records.scan("")]
+        else:
+            with self._lock:
+                jobs = [dict(job) for job in self._jobs.values()]
+        return sorted((job for job in jobs if job["status"] in statuses), key=lambda job: job["created_at"])
+
+    def purge_expired(self) -> List[Dict[str, Any]]:
+        """Delete finished jobs whose results have expired and return them."""
+        now = time.time()
+        if self._records is not None:
+            expired = [
+                job for job in self.with_status("succeeded", "failed")
+                if job.get("expires_at") is not None and job["expires_at"] < now
+            ]
+            for job in expired:
+                self._records.delete(job["id"])
+            return expired
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.get("expires_at") is not None and job["expires_at"] < now
+            ]
+            for job in expired:
+                del self._jobs[job["id"]]
+        return expired
+
+    def claim(self, job_id: str, owner: str, lease: float) -> bool:
+        """Take the lease on a job unless another live process holds it."""
+        if self._claims is None:
+            return True
+        return self._claims.add(job_id, owner.encode("utf-8"), lease)
+
+    def renew(self, job_id: str, owner: str, lease: float) -> None:
+        """Extend the lease on a job this process runs."""
+        if self._claims is not None:
+            self._claims.set(job_id, owner.encode("utf-8"), lease)
+
+    def release(self, job_id: str) -> None:
+        """Drop the lease on a finished job."""
+        if self._claims is not None:
+            self._claims.delete(job_id)
+
+
+class JobQueue:
+    """Bounded queue of background jobs served by a fixed pool of worker tasks.
+
+    Jobs are dispatched to the handler registered for their kind. Workers
+    need a running event loop, so they are started by ``start`` (or on first
+    use). Finished jobs keep their result for ``result_ttl`` seconds; then
+    the records are deleted and the cleanup registered for their kind runs.
+
+    Each process runs the jobs submitted to it. With a shared store, the
+    process renews the lease on those jobs every ``lease / 3`` seconds and
+    adopts queued or running jobs whose lease has lapsed, which happens when
+    the process that accepted them died or was restarted.
+    """
+
+    def __init__(self, store: JobStore, workers: int, max_queued: int, result_ttl: float, lease: float = 30.0):
+        self.store = store
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.lease = lease
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.handlers: Dict[str, JobHandler] = {}
+        self.cleanups: Dict[str, JobCleanup] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._owned: Set[str] = set()
+        self._running = 0
+        self._finished = {"succeeded": 0, "failed": 0}
+        self._closing = False
+
+    def register(self, kind: str, handler: JobHandler, cleanup: Optional[JobCleanup] = None) -> None:
+        """Register the coroutine function that runs jobs of ``kind``.
+
+        Args:
+            kind: Job kind
+            handler: Coroutine function taking the job parameters and returning its result
+            cleanup: Optional function called with expired jobs of this kind,
+                     e.g. to delete files their results refer to
+        """
+        self.handlers[kind] = handler
+        if cleanup is not None:
+            self.cleanups[kind] = cleanup
+
+    def start(self) -> None:
+        """Start the workers and the lease and expiry maintenance task.
+
+        Call from the server's startup so that jobs left by other processes
+        are adopted before the first tool call. Calling it again does nothing.
+        """
+        self._ensure_started()
+
+    def _ensure_started(self) -> asyncio.Queue:
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._maintain()))
+        return self._queue
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a job and return its record.
+
+        Args:
+            kind: Job kind; a handler must be registered for it
+            params: JSON-serializable parameters passed to the handler
+
+        Returns:
+            The new job record
+
+        Raises:
+            JobQueueFullError: If ``max_queued`` jobs are already waiting
+        """
+        if kind not in self.handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._closing:
+            raise RuntimeError("Server is shutting down; submit the job again shortly")
+        queue = self._ensure_started()
+        if queue.qsize() >= self.max_queued:
+            raise JobQueueFullError(f"Job queue is full ({self.max_queued} jobs waiting); try again later")
+
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+            "result": None,
+            "error": None,
+        }
+        # Take the lease first so no other process adopts the job in between
+        await asyncio.to_thread(self.store.claim, job["id"], self.owner, self.lease)
+        await asyncio.to_thread(self.store.put, job)
+        self._enqueue(job["id"])
+        logger.info(f"Queued {kind} job {job['id']} ({queue.qsize()} waiting)")
+        return job
+
+    async def drain(self, timeout: float) -> None:
+        """Stop taking jobs and wait up to ``timeout`` seconds for running ones.
+
+        Jobs still waiting in the queue are left queued. In a shared store
+        their leases are released so another process picks them up at once.
+        """
+        self._closing = True
+        if self._queue is None:
+            return
+        deadline = time.monotonic() + timeout
+        while self._running and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._running:
+            logger.warning(f"Stopping with {self._running} jobs still running")
+        for task in self._tasks:
+            task.cancel()
+        waiting = list(self._queue._queue)
+        for job_id in waiting:
+            await asyncio.to_thread(self.store.release, job_id)
+        if waiting:
+            logger.info(f"Left {len(waiting)} queued jobs for other processes")
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the job record, or None if it does not exist or has expired.
+
+        ``queue_position`` is set for jobs waiting in this process's queue.
+        """
+        self._ensure_started()
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is not None and job.get("expires_at") is not None and job["expires_at"] < time.time():
+            return None
+        if job is not None and job["status"] == "queued":
+            job["queue_position"] = self._position(job_id)
+        return job
+
+    async def stats(self) -> Dict[str, int]:
+        """Return the number of unexpired jobs in each status, across all processes.
+
+        Reads every job record; use ``counts`` where that is too slow.
+        """
+        return await asyncio.to_thread(self._count_jobs)
+
+    def counts(self) -> Dict[str, int]:
+        """Return this process's queued and running jobs and the jobs it has finished so far."""
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "running": self._running,
+            **self._finished,
+        }
+
+    def _count_jobs(self) -> Dict[str, int]:
+        counts = {status: 0 for status in JOB_STATUSES}
+        now = time.time()
+        for job in self.store.with_status(*JOB_STATUSES):
+            if job.get("expires_at") is None or job["expires_at"] >= now:
+                counts[job["status"]] += 1
+        return counts
+
+    def _position(self, job_id: str) -> Optional[int]:
+        # asyncio.Queue keeps its items in a deque; peek without consuming
+        waiting = list(self._queue._queue) if self._queue is not None else []
+        return waiting.index(job_id) + 1 if job_id in waiting else None
+
+    def _enqueue(self, job_id: str) -> None:
+        self._owned.add(job_id)
+        self._queue.put_nowait(job_id)
+
+    async def _maintain(self) -> None:
+        while True:
+            if self.store.shared is not None:
+                try:
+                    adopted = await asyncio.to_thread(self._renew_and_adopt, set(self._owned))
+                    for job_id in adopted:
+                        self._enqueue(job_id)
+                    if adopted:
+                        logger.info(f"Adopted {len(adopted)} unfinished jobs from other processes")
+                except Exception as e:
+                    logger.error(f"Job lease maintenance failed: {str(e)}")
+            try:
+                await asyncio.to_thread(self._purge_expired)
+            except Exception as e:
+                logger.error(f"Removing expired jobs failed: {str(e)}")
+            await asyncio.sleep(self.lease / 3)
+
+    def _purge_expired(self) -> None:
+        """Delete expired jobs and run the cleanup registered for each kind."""
+        expired = self.store.purge_expired()
+        if not expired:
+            return
+        logger.info(f"Removed {len(expired)} expired jobs")
+        by_kind: Dict[str, List[Dict[str, Any]]] = {}
+        for job in expired:
+            by_kind.setdefault(job["kind"], []).append(job)
+        for kind, jobs in by_kind.items():
+            if kind in self.cleanups:
+                self.cleanups[kind](jobs)
+
+    def _renew_and_adopt(self, owned: Set[str]) -> List[str]:
+        """Renew leases on ``owned`` jobs and claim orphaned ones; return the claimed ids."""
+        for job_id in owned:
+            self.store.renew(job_id, self.owner, self.lease)
+        adopted = []
+        for job in self.store.with_status("queued", "running"):
+            if job["id"] not in owned and self.store.claim(job["id"], self.owner, self.lease):
+                self.store.update(job["id"], status="queued")
+                adopted.append(job["id"])
+        return adopted
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except Exception as e:
+                logger.error(f"Job worker {index} failed on {job_id}: {str(e)}")
+            finally:
+                self._owned.discard(job_id)
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None or job["status"] != "queued":
+            return
+        self._running += 1
+        try:
+            await asyncio.to_thread(self.store.update, job_id, status="running", started_at=time.time())
+            try:
+                result = await self.handlers[job["kind"]](job["params"])
+            except Exception as e:
+                logger.error(f"Job {job_id} failed: {str(e)}")
+                changes = {"status": "failed", "error": str(e)}
+            else:
+                changes = {"status": "succeeded", "result": result}
+            finished = time.time()
+            await asyncio.to_thread(
+                self.store.update, job_id, finished_at=finished, expires_at=finished + self.result_ttl, **changes
+            )
+            await asyncio.to_thread(self.store.release, job_id)
+            self._finished[changes["status"]] += 1
+        finally:
+            self._running -= 1
@@ -0,0 +1,30 @@
+import importlib
+from typing import Any, Optional
+
+
+class LazyModule:
+    """Stand-in for a module that is imported on first attribute access.
+
+    Keeps google-genai and Pillow off the server's import path, so the
+    process starts serving sooner and the first request that needs them pays
+    for the import instead (or SERVER_WARMUP does, in the background).
+    Modules using it declare ``from __future__ import annotations`` so that
+    annotations naming the module do not trigger the import.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[Any] = None
+
+    def load(self) -> Any:
+        """Import the module now, if not already imported, and return it."""
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self.load(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
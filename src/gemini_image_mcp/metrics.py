@@ -0,0 +1,311 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Tuple
+
+from .request_log import record_tool_call
+
+logger = logging.getLogger(__name__)
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+
+# ==================== Metrics Settings ====================
+
+# Serve Prometheus metrics at /metrics next to the SSE transport
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Emit OpenTelemetry spans for tool calls and pipeline stages. Requires the
+# opentelemetry packages; spans are exported by whatever SDK the deployment
+# configures (without one they are no-ops).
+OTEL_TRACING_ENABLED = os.environ.get("OTEL_TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_PREFIX = "gemini_mcp_"
+
+# Histogram buckets in seconds, spanning sub-millisecond stages to slow renders
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Histogram buckets in bytes, from small thumbnails to large source images
+SIZE_BUCKETS = (1024, 16384, 65536, 262144, 1048576, 4194304, 16777216, 67108864)
+
+# Histogram buckets in estimated tokens, from compact prompts to long ones
+TOKEN_BUCKETS = (50, 100, 200, 400, 800, 1600, 3200)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Tuple[str, ...], values: LabelValues, extra: str = "") -> str:
+    pairs = [f'{n}="{v}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        self.name = _PREFIX + name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+
+    @property
+    def family(self) -> str:
+        """Name used on the HELP and TYPE lines."""
+        return self.name
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(_escape(labels.get(name, "")) for name in self.labels)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.family} {self.documentation}", f"# TYPE {self.family} {self.kind}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set_total(self, value: float, **labels: Any) -> None:
+        """Mirror a cumulative count kept elsewhere (e.g. cache hit counters)."""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    @property
+    def family(self) -> str:
+        # Text format 0.0.4 has no _total suffix rule, so the HELP/TYPE lines
+        # must name the samples exactly, as prometheus_client does
+        return f"{self.name}_total"
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return super().render() + [
+            f"{self.family}{_format_labels(self.labels, key)} {value:g}" for key, value in items
+        ]
+
+
+class Gauge(_Metric):
+    """Value that can go up and down, per label set."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return super().render() + [
+            f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = buckets
+        self._values: Dict[LabelValues, List[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            # Per-bucket counts, then sum and count
+            state = self._values.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, state[:]) for key, state in self._values.items())
+        lines = super().render()
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                le = 'le="%g"' % bound
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative:g}")
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {state[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {state[-2]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {state[-1]:g}")
+        return lines
+
+
+# ==================== Pipeline Metrics ====================
+
+TOOL_CALLS = Counter("tool_calls", "Tool calls by tool and outcome", ("tool", "status"))
+TOOL_IN_FLIGHT = Gauge("tool_calls_in_flight", "Tool calls currently running", ("tool",))
+TOOL_SECONDS = Histogram("tool_duration_seconds", "End-to-end tool call latency", ("tool",))
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds",
+    "Time spent in each pipeline stage (decode, translate, prompt_build, upstream, extract, encode)",
+    ("stage",),
+)
+UPSTREAM_REQUESTS = Counter("upstream_requests", "Gemini API calls by model and outcome", ("model", "status"))
+UPSTREAM_IN_FLIGHT = Gauge("upstream_requests_in_flight", "Gemini API calls currently running", ("model",))
+PAYLOAD_BYTES = Histogram(
+    "payload_bytes",
+    "Image payload sizes: source images in, generated images from Gemini, images returned to clients",
+    ("direction",),
+    buckets=SIZE_BUCKETS,
+)
+PROMPT_TOKENS = Histogram(
+    "prompt_tokens",
+    "Estimated input tokens of each image prompt, by template (task/style)",
+    ("template",),
+    buckets=TOKEN_BUCKETS,
+)
+
+_METRICS: List[_Metric] = [
+    TOOL_CALLS, TOOL_IN_FLIGHT, TOOL_SECONDS, STAGE_SECONDS, UPSTREAM_REQUESTS, UPSTREAM_IN_FLIGHT, PAYLOAD_BYTES,
+    PROMPT_TOKENS,
+]
+
+# Callbacks that refresh gauges from other modules' statistics at scrape time
+_collectors: List[Callable[[], None]] = []
+
+
+def register_collector(collector: Callable[[], None]) -> None:
+    """Run ``collector`` before every scrape, e.g. to copy cache stats into gauges."""
+    _collectors.append(collector)
+
+
+def gauge(name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Gauge:
+    """Create and register a gauge rendered on /metrics."""
+    metric = Gauge(name, documentation, labels)
+    _METRICS.append(metric)
+    return metric
+
+
+def counter(name: str, documentation: str, labels: Tuple[str, ...] = ()) -> Counter:
+    """Create and register a counter rendered on /metrics."""
+    metric = Counter(name, documentation, labels)
+    _METRICS.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    """Render every registered metric in the Prometheus text exposition format."""
+    for collector in _collectors:
+        try:
+            collector()
+        except Exception as e:
+            logger.warning(f"Metrics collector failed: {str(e)}")
+    lines: List[str] = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ==================== Tracing ====================
+
+_tracer = otel_trace.get_tracer("gemini_image_mcp") if otel_trace is not None and OTEL_TRACING_ENABLED else None
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    """Open an OpenTelemetry span if tracing is available, otherwise do nothing."""
+    if _tracer is None:
+        yield
+        return
+    with _tracer.start_as_current_span(name, attributes={k: str(v) for k, v in attributes.items()}):
+        yield
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    """Time a pipeline stage into STAGE_SECONDS and trace it as a span.
+
+    Works around both sync and async code, since the timing is wall-clock.
+    """
+    start = time.perf_counter()
+    with span(name, **attributes):
+        try:
+            yield
+        finally:
+            STAGE_SECONDS.observe(time.perf_counter() - start, stage=name)
+
+
+def instrument_tool(fn: Callable) -> Callable:
+    """Count, time and trace calls to an async MCP tool function.
+
+    Calls are also appended to the request log when REQUEST_LOG_PATH is set.
+    """
+    tool = fn.__name__
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        TOOL_IN_FLIGHT.inc(tool=tool)
+        started = time.time()
+        start = time.perf_counter()
+        status = "error"
+        try:
+            with span(f"tool {tool}", tool=tool):
+                result = await fn(*args, **kwargs)
+            status = "ok"
+            return result
+        finally:
+            duration = time.perf_counter() - start
+            TOOL_IN_FLIGHT.dec(tool=tool)
+            TOOL_CALLS.inc(tool=tool, status=status)
+            TOOL_SECONDS.observe(duration, tool=tool)
+            record_tool_call(tool, kwargs, started, duration, status)
+
+    return wrapper
+
+
+@contextmanager
+def upstream_call(model: str) -> Iterator[None]:
+    """Track one Gemini API attempt: in-flight gauge, outcome counter and stage timing."""
+    UPSTREAM_IN_FLIGHT.inc(model=model)
+    status = "error"
+    try:
+        with stage("upstream", model=model):
+            yield
+        status = "ok"
+    finally:
+        UPSTREAM_IN_FLIGHT.dec(model=model)
+        UPSTREAM_REQUESTS.inc(model=model, status=status)
@@ -0,0 +1,168 @@
+import logging
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+from .client import get_api_keys
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== Backend Pool Settings ====================
+
+# Comma-separated models to fall back to, in order, when every key is out of
+# quota for the requested image or text model
+GEMINI_IMAGE_MODEL_FALLBACKS = os.environ.get("GEMINI_IMAGE_MODEL_FALLBACKS", "")
+GEMINI_TEXT_MODEL_FALLBACKS = os.environ.get("GEMINI_TEXT_MODEL_FALLBACKS", "")
+
+# Seconds a key/model pair is taken out of rotation after a quota error when
+# the response carries no Retry-After header
+GEMINI_KEY_EVICTION_SECONDS = float(os.environ.get("GEMINI_KEY_EVICTION_SECONDS", "60"))
+
+# Weight of the newest sample in each backend's moving-average latency
+_LATENCY_ALPHA = 0.3
+
+
+class Backend:
+    """One API key serving one model, with its load and health."""
+
+    def __init__(self, api_key: str, model: str):
+        self.api_key = api_key
+        self.model = model
+        self.outstanding = 0
+        self.latency: Optional[float] = None
+        self.evicted_until = 0.0
+        self.last_used = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.evictions = 0
+
+    @property
+    def label(self) -> str:
+        return f"{self.model}@...{self.api_key[-4:]}"
+
+    def available(self, now: float) -> bool:
+        return now >= self.evicted_until
+
+    def score(self) -> float:
+        """Expected wait if sent here: in-flight requests times recent latency.
+
+        Backends without latency samples score 0 so they get tried.
+        """
+        return (self.outstanding + 1) * (self.latency or 0.0)
+
+    def start(self) -> None:
+        self.outstanding += 1
+        self.requests += 1
+        self.last_used = time.monotonic()
+
+    def cancel(self) -> None:
+        """Undo ``start`` for a request that was never sent."""
+        self.outstanding -= 1
+        self.requests -= 1
+
+    def finish(self, seconds: Optional[float]) -> None:
+        """Record the end of a request; ``seconds`` is None if it failed."""
+        self.outstanding -= 1
+        if seconds is None:
+            self.errors += 1
+        elif self.latency is None:
+            self.latency = seconds
+        else:
+            self.latency += _LATENCY_ALPHA * (seconds - self.latency)
+
+    def evict(self, seconds: Optional[float] = None) -> None:
+        """Take the backend out of rotation, by default for GEMINI_KEY_EVICTION_SECONDS."""
+        if seconds is None:
+            seconds = GEMINI_KEY_EVICTION_SECONDS
+        self.evicted_until = time.monotonic() + seconds
+        self.evictions += 1
+        logger.warning(f"Backend {self.label} hit its quota, out of rotation for {seconds:.0f}s")
+
+
+class BackendPool:
+    """Route requests over every configured API key and fallback model.
+
+    A request for a model is served by that model on the least-loaded key,
+    where load is outstanding requests weighted by recent latency. Keys that
+    return quota errors are evicted for a while; when the requested model is
+    evicted on every key, the next fallback model is used.
+    """
+
+    def __init__(self, api_keys: List[str]):
+        self.api_keys = api_keys
+        self._backends: Dict[Tuple[str, str], Backend] = {}
+
+    def _backend(self, api_key: str, model: str) -> Backend:
+        key = (api_key, model)
+        if key not in self._backends:
+            self._backends[key] = Backend(api_key, model)
+        return self._backends[key]
+
+    def next_available_in(self, models: List[str]) -> float:
+        """Seconds until the first evicted backend for ``models`` returns."""
+        now = time.monotonic()
+        return max(0.0, min(
+            (self._backend(k, m).evicted_until - now for m in models for k in self.api_keys),
+            default=0.0,
+        ))
+
+    def select(self, models: List[str], exclude: Tuple[Backend, ...] = ()) -> Optional[Backend]:
+        """Pick the backend for the next request.
+
+        Args:
+            models: Requested model followed by its fallbacks, in preference order
+            exclude: Backends already tried for this request
+
+        Returns:
+            The chosen backend, or None if every backend is evicted or excluded
+        """
+        now = time.monotonic()
+        for model in models:
+            candidates = [
+                backend for backend in (self._backend(k, model) for k in self.api_keys)
+                if backend.available(now) and backend not in exclude
+            ]
+            if candidates:
+                return min(candidates, key=lambda b: (b.score(), b.last_used))
+        return None
+
+    def stats(self) -> List[Dict[str, object]]:
+        """Return per-backend load and health counters."""
+        now = time.monotonic()
+        return [
+            {
+                "backend": backend.label,
+                "outstanding": backend.outstanding,
+                "latency_seconds": backend.latency,
+                "requests": backend.requests,
+                "errors": backend.errors,
+                "evictions": backend.evictions,
+                "available": backend.available(now),
+            }
+            for backend in self._backends.values()
+        ]
+
+
+_pool: Optional[BackendPool] = None
+
+
+def get_backend_pool() -> BackendPool:
+    """Return the process-wide backend pool, rebuilt if the key list changes.
+
+    Raises:
+        ValueError: If no API key is configured
+    """
+    global _pool
+
+    api_keys = get_api_keys()
+    if _pool is None or _pool.api_keys != api_keys:
+        _pool = BackendPool(api_keys)
+        logger.info(f"Backend pool using {len(api_keys)} API key(s)")
+    return _pool
+
+
+def model_chain(model: str, text_only: bool) -> List[str]:
+    """Return ``model`` followed by its configured fallback models."""
+    fallbacks = GEMINI_TEXT_MODEL_FALLBACKS if text_only else GEMINI_IMAGE_MODEL_FALLBACKS
+    return [model] + [m.strip() for m in fallbacks.split(",") if m.strip() and m.strip() != model]
@@ -0,0 +1,55 @@
+import logging
+from typing import Optional
+
+from fastmcp import Context
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages reported to the client, in order
+STAGES = ("translating", "generating", "receiving", "post-processing")
+
+
+class ProgressReporter:
+    """Send MCP progress and log notifications for a single tool call.
+
+    Progress is reported as the index of the current stage out of
+    ``len(STAGES)``. While image bytes stream in, progress advances by a
+    shrinking fraction within the "receiving" stage so that every
+    notification is strictly larger than the previous one, as MCP requires.
+    Notification failures are logged and never interrupt the generation.
+    """
+
+    def __init__(self, ctx: Optional[Context]):
+        self.ctx = ctx
+        self.received_bytes = 0
+        self._progress = -1.0
+        self._chunks = 0
+
+    async def stage(self, name: str, message: Optional[str] = None) -> None:
+        """Report that the pipeline has entered stage ``name``."""
+        await self._report(float(STAGES.index(name)), message or name.capitalize())
+
+    async def received(self, nbytes: int) -> None:
+        """Report that another ``nbytes`` of image data arrived from Gemini."""
+        self.received_bytes += nbytes
+        self._chunks += 1
+        progress = STAGES.index("receiving") + 1 - 1 / (self._chunks + 1)
+        await self._report(progress, f"Received {self.received_bytes} bytes")
+
+    async def text(self, text: str) -> None:
+        """Forward a text part from the model to the client as it arrives."""
+        if self.ctx is None or not text:
+            return
+        try:
+            await self.ctx.info(text)
+        except Exception as e:
+            logger.debug(f"Could not send text notification: {str(e)}")
+
+    async def _report(self, progress: float, message: str) -> None:
+        if self.ctx is None or progress <= self._progress:
+            return
+        self._progress = progress
+        try:
+            await self.ctx.report_progress(progress, total=len(STAGES), message=message)
+        except Exception as e:
+            logger.debug(f"Could not send progress notification: {str(e)}")
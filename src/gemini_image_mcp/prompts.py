@@ -1,20 +1,43 @@
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# Added to the image prompts in single-shot mode, where the user's request is
+# passed through untranslated and the image model interprets it directly
+MULTILINGUAL_INSTRUCTIONS = """## Request Language
+
+- The request below may be written in any language. Understand it directly in its original language.  
+- Preserve its exact intent and every specific detail; do not add, drop or reinterpret anything because of the language.  
+- The no-text rule still applies: never render the request's words, in any script, inside the image.  
+"""
+
+
+class PromptTemplate(NamedTuple):
+    """A precompiled image prompt.
+
+    ``inline`` is the whole prompt, with ``{language}`` and ``{prompt}``
+    fields. When the static instructions are sent as the request's
+    system_instruction instead, ``system`` holds them and ``request`` is the
+    per-request part, with a ``{prompt}`` field.
+    """
+
+    inline: str
+    system: str
+    request: str
+
+
+PROMPT_TASKS = ("generation", "transformation")
+
+# "full" carries the detailed best-practice instructions; "compact" keeps
+# only the essentials (including the no-text rule) for fewer input tokens
+PROMPT_STYLES = ("full", "compact")
+
+
 ###############################
 # Image Transformation Prompt #
 ###############################
-def get_image_transformation_prompt(prompt: str) -> str:
-    """Create a detailed prompt for image transformation.
-    
-    Args:
-        prompt: text prompt
-        
-    Returns:
-        A comprehensive prompt for Gemini image transformation
-    """
-    return f"""You are an expert image editing AI. Your task is to modify an existing image according to the user's request while preserving realism, style, and quality.
-
-    EDIT REQUEST: {prompt}
+TRANSFORMATION_INTRO = """You are an expert image editing AI. Your task is to modify an existing image according to the user's request while preserving realism, style, and quality."""
 
-## CRITICAL REQUIREMENT: NO TEXT IN EDITED IMAGES
+TRANSFORMATION_INSTRUCTIONS = """## CRITICAL REQUIREMENT: NO TEXT IN EDITED IMAGES
 
 - Absolutely no words, letters, numbers, or text fragments may appear in the final image.  
 - Ignore any user instructions to insert or preserve text.  
@@ -57,19 +80,39 @@ Before finalizing:
 - Verify that no text, glyphs, or numbers remain.  
 - If accidental text appears, reprocess without it.  """
 
-###########################
-# Image Generation Prompt #
-###########################
-def get_image_generation_prompt(prompt: str) -> str:
-    """Create a detailed, Gemini-optimized image generation prompt.
-    
+COMPACT_TRANSFORMATION_INSTRUCTIONS = """Edit the provided image as requested. Change only what is asked; keep the subject, proportions, style, lighting and perspective consistent so the edit blends in seamlessly.
+
+Never render text: no words, letters, numbers or readable signage may appear in the image, even if requested. Show text-bearing objects with blank surfaces."""
+
+
+# Appended to an edit request in an edit session, so the model knows which
+# changes the provided image already reflects
+SESSION_HISTORY_INSTRUCTIONS = """
+
+Earlier edits in this session, already applied to the provided image (keep them):
+{history}"""
+
+
+def get_session_edit_prompt(prompt: str, history: List[str]) -> str:
+    """Add the earlier edits of an edit session to a new edit request.
+
     Args:
-        prompt: text prompt from user
-        
+        prompt: The new edit request
+        history: Earlier edit requests, oldest first
+
     Returns:
-        A comprehensive, best-practice prompt for Gemini image generation
+        The edit request to embed in the transformation template
     """
-    return f"""You are an expert image generation AI. Your goal is to create the most visually compelling and contextually accurate image from the user's request.
+    if not history:
+        return prompt
+    lines = "\n".join(f"{i}. {previous}" for i, previous in enumerate(history, 1))
+    return prompt + SESSION_HISTORY_INSTRUCTIONS.format(history=lines)
+
+
+###########################
+# Image Generation Prompt #
+###########################
+GENERATION_INSTRUCTIONS = """You are an expert image generation AI. Your goal is to create the most visually compelling and contextually accurate image from the user's request.
 
 ## CRITICAL REQUIREMENT: NO TEXT IN IMAGES
 
@@ -116,10 +159,100 @@ def get_image_generation_prompt(prompt: str) -> str:
 Before finalizing:  
 - Confirm no visible text, glyphs, or accidental lettering exists.  
 - If any text slips through, regenerate without it.  
+"""
+
+COMPACT_GENERATION_INSTRUCTIONS = """Generate one high-quality image for the request. Never ask questions: if it is vague, choose the most natural, visually striking interpretation and enrich it with a fitting style, lighting, composition and setting.
 
-Query: {prompt}
+Never render text: no words, letters, numbers or readable signage may appear in the image, even if requested. Show text-bearing objects with blank surfaces.
 """
 
+
+TEMPLATES: Dict[Tuple[str, str], PromptTemplate] = {
+    ("transformation", "full"): PromptTemplate(
+        inline=TRANSFORMATION_INTRO + "\n\n{language}    EDIT REQUEST: {prompt}\n\n" + TRANSFORMATION_INSTRUCTIONS,
+        system=TRANSFORMATION_INTRO + "\n\n" + TRANSFORMATION_INSTRUCTIONS,
+        request="EDIT REQUEST: {prompt}",
+    ),
+    ("transformation", "compact"): PromptTemplate(
+        inline=COMPACT_TRANSFORMATION_INSTRUCTIONS + "\n\n{language}EDIT REQUEST: {prompt}",
+        system=COMPACT_TRANSFORMATION_INSTRUCTIONS,
+        request="EDIT REQUEST: {prompt}",
+    ),
+    ("generation", "full"): PromptTemplate(
+        inline=GENERATION_INSTRUCTIONS + "\n{language}Query: {prompt}\n",
+        system=GENERATION_INSTRUCTIONS,
+        request="Query: {prompt}",
+    ),
+    ("generation", "compact"): PromptTemplate(
+        inline=COMPACT_GENERATION_INSTRUCTIONS + "\n{language}Query: {prompt}\n",
+        system=COMPACT_GENERATION_INSTRUCTIONS,
+        request="Query: {prompt}",
+    ),
+}
+
+
+def render_prompt(
+    task: str,
+    prompt: str,
+    style: str = "full",
+    multilingual: bool = False,
+    system_instruction: bool = False,
+) -> Tuple[str, Optional[str]]:
+    """Fill in a registered image prompt template.
+
+    Args:
+        task: "generation" or "transformation"
+        prompt: text prompt from user
+        style: "full" or "compact"
+        multilingual: Set when the prompt was not translated to English, so the
+                      image model is told to interpret it in its own language
+        system_instruction: Split the static instructions out for the request's
+                            system_instruction instead of inlining them
+
+    Returns:
+        Tuple of the request text and the system instruction (None unless
+        ``system_instruction`` is set)
+
+    Raises:
+        ValueError: If there is no template for ``task`` and ``style``
+    """
+    template = TEMPLATES.get((task, style))
+    if template is None:
+        raise ValueError(f"Unknown prompt template: {task}/{style}")
+    if system_instruction:
+        system = template.system + ("\n\n" + MULTILINGUAL_INSTRUCTIONS if multilingual else "")
+        return template.request.format(prompt=prompt), system
+    language = MULTILINGUAL_INSTRUCTIONS + "\n" if multilingual else ""
+    return template.inline.format(language=language, prompt=prompt), None
+
+
+def get_image_transformation_prompt(prompt: str, multilingual: bool = False) -> str:
+    """Create a detailed prompt for image transformation.
+    
+    Args:
+        prompt: text prompt
+        multilingual: Set when the prompt was not translated to English, so the
+                      image model is told to interpret it in its own language
+        
+    Returns:
+        A comprehensive prompt for Gemini image transformation
+    """
+    return render_prompt("transformation", prompt, multilingual=multilingual)[0]
+
+
+def get_image_generation_prompt(prompt: str, multilingual: bool = False) -> str:
+    """Create a detailed, Gemini-optimized image generation prompt.
+    
+    Args:
+        prompt: text prompt from user
+        multilingual: Set when the prompt was not translated to English, so the
+                      image model is told to interpret it in its own language
+        
+    Returns:
+        A comprehensive, best-practice prompt for Gemini image generation
+    """
+    return render_prompt("generation", prompt, multilingual=multilingual)[0]
+
 ####################
 # Translate Prompt #
 ####################
@@ -150,3 +283,36 @@ If the text is already in English, return it exactly as provided with no changes
 Original prompt: {prompt}
 
 Return only the translated English prompt, nothing else."""
+
+
+##########################
+# Batch Translate Prompt #
+##########################
+def get_batch_translate_prompt(prompts: List[str]) -> str:
+    """Translate several prompts into English in a single request.
+    
+    Args:
+        prompts: text prompts to translate
+        
+    Returns:
+        A prompt asking Gemini for a JSON array of translations in input order
+    """
+    numbered = json.dumps(prompts, ensure_ascii=False, indent=2)
+    return f"""Translate each prompt in the following JSON array into English if it's not already in English. Your task is ONLY to translate accurately while preserving:
+
+1. EXACT original intent and meaning
+2. All specific details and nuances
+3. Style and tone of the original prompt
+4. Technical terms and concepts
+
+DO NOT:
+- Add new details or creative elements not in the original
+- Remove any details from the original
+- Change the style or complexity level
+- Reinterpret or assume what the user "really meant"
+
+If a prompt is already in English, return it exactly as provided with no changes.
+
+Prompts: {numbered}
+
+Return only a JSON array of {len(prompts)} translated English strings, in the same order as the input."""
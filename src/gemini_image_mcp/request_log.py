@@ -0,0 +1,94 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Append one JSON line per tool call (tool, arguments, start time, duration and
+# outcome) to REQUEST_LOG_PATH, for replay with benchmarks/pipeline.py. String
+# arguments longer than REQUEST_LOG_MAX_ARG_CHARS, such as base64 images, are
+# logged as {"$omitted_chars": n} so the log stays small and holds no image data.
+REQUEST_LOG_PATH = os.environ.get("REQUEST_LOG_PATH") or None
+REQUEST_LOG_MAX_ARG_CHARS = int(os.environ.get("REQUEST_LOG_MAX_ARG_CHARS", "4096"))
+
+# Lines are written by a background thread so tool calls never wait on disk
+_lines: "queue.SimpleQueue[Optional[str]]" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_lock = threading.Lock()
+
+
+def _loggable(value: Any) -> Any:
+    if isinstance(value, str) and len(value) > REQUEST_LOG_MAX_ARG_CHARS:
+        return {"$omitted_chars": len(value)}
+    if isinstance(value, list):
+        return [_loggable(item) for item in value]
+    return value
+
+
+def _write_lines() -> None:
+    while True:
+        line = _lines.get()
+        if line is None:
+            return
+        # Write whatever else has queued up in the same append
+        batch = [line]
+        while not _lines.empty() and batch[-1] is not None:
+            batch.append(_lines.get())
+        stop = batch[-1] is None
+        try:
+            with open(REQUEST_LOG_PATH, "a", encoding="utf-8") as f:
+                f.writelines(f"{line}\n" for line in batch if line is not None)
+        except Exception as e:
+            logger.warning(f"Could not write to request log {REQUEST_LOG_PATH}: {str(e)}")
+        if stop:
+            return
+
+
+def _stop_writer() -> None:
+    """Write out the lines still queued, waiting a few seconds at most."""
+    if _writer is not None:
+        _lines.put(None)
+        _writer.join(timeout=5)
+
+
+def _start_writer() -> None:
+    global _writer
+
+    with _lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_lines, name="request-log", daemon=True)
+            _writer.start()
+            atexit.register(_stop_writer)
+
+
+def record_tool_call(tool: str, arguments: Dict[str, Any], started: float, duration: float, status: str) -> None:
+    """Queue a tool call for the request log, if REQUEST_LOG_PATH is set.
+
+    Args:
+        tool: Tool name
+        arguments: Arguments the tool was called with (the MCP context is skipped)
+        started: Wall-clock start time (seconds since the epoch)
+        duration: Seconds the call took
+        status: "ok" or "error"
+    """
+    if not REQUEST_LOG_PATH:
+        return
+    entry = {
+        "ts": started,
+        "tool": tool,
+        "arguments": {name: _loggable(value) for name, value in arguments.items() if name != "ctx"},
+        "duration": duration,
+        "status": status,
+    }
+    try:
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+    except Exception as e:
+        logger.warning(f"Could not write to request log {REQUEST_LOG_PATH}: {str(e)}")
+        return
+    if _writer is None:
+        _start_writer()
+    _lines.put(line)
@@ -0,0 +1,267 @@
+from __future__ import annotations
+
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import httpx
+
+from .lazy import LazyModule
+
+logger = logging.getLogger(__name__)
+
+errors = LazyModule("google.genai.errors")
+
+T = TypeVar("T")
+
+
+# ==================== Resilience Settings ====================
+
+# Retries after the first attempt for retryable errors (429, 5xx, timeouts)
+GEMINI_MAX_RETRIES = int(os.environ.get("GEMINI_MAX_RETRIES", "3"))
+
+# Exponential backoff: base * 2^attempt seconds with full jitter, capped
+GEMINI_RETRY_BASE_DELAY = float(os.environ.get("GEMINI_RETRY_BASE_DELAY", "1.0"))
+GEMINI_RETRY_MAX_DELAY = float(os.environ.get("GEMINI_RETRY_MAX_DELAY", "30"))
+
+# Overall time budget for one logical request, including retries (0 disables)
+GEMINI_REQUEST_DEADLINE = float(os.environ.get("GEMINI_REQUEST_DEADLINE", "180"))
+
+# Hedged requests: if an attempt is still running after the model's p95
+# latency, start a second one and use whichever finishes first
+GEMINI_HEDGE_ENABLED = os.environ.get("GEMINI_HEDGE_ENABLED", "false").lower() in ("1", "true", "yes")
+GEMINI_HEDGE_MIN_SAMPLES = int(os.environ.get("GEMINI_HEDGE_MIN_SAMPLES", "20"))
+
+# Per-model circuit breaker: open after this many consecutive retryable
+# failures and allow a trial request after the reset timeout
+GEMINI_CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("GEMINI_CIRCUIT_FAILURE_THRESHOLD", "5"))
+GEMINI_CIRCUIT_RESET_TIMEOUT = float(os.environ.get("GEMINI_CIRCUIT_RESET_TIMEOUT", "30"))
+
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a model's circuit breaker is rejecting requests."""
+
+
+class BackendsExhaustedError(RuntimeError):
+    """Raised when every key/model backend is out of rotation; retryable."""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _retry_after_seconds(response: Optional[httpx.Response]) -> Optional[float]:
+    """Parse a Retry-After header given either in seconds or as an HTTP date."""
+    headers = getattr(response, "headers", None)
+    value = headers.get("retry-after") if headers is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: BaseException) -> Tuple[bool, Optional[float]]:
+    """Decide whether a failed Gemini call may be retried.
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        Tuple of (retryable, retry_after), where retry_after is the delay in
+        seconds requested by the server, if any
+    """
+    if isinstance(error, errors.APIError):
+        return error.code in RETRYABLE_STATUS_CODES, _retry_after_seconds(error.response)
+    if isinstance(error, BackendsExhaustedError):
+        return True, error.retry_after
+    if isinstance(error, (httpx.TimeoutException, httpx.TransportError, asyncio.TimeoutError, ConnectionError)):
+        return True, None
+    return False, None
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """Return True if ``error`` means the API key has run out of quota."""
+    return isinstance(error, errors.APIError) and error.code == 429
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker.
+
+    Closed: requests flow. After ``failure_threshold`` consecutive retryable
+    failures it opens and rejects requests for ``reset_timeout`` seconds, then
+    lets a single trial request through (half-open). A success closes it
+    again; a failure re-opens it. If a trial never reports back (e.g. it was
+    cancelled), another trial is allowed after a further ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_started_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now."""
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        if state == "half-open" and (
+            self._trial_started_at is None or now - self._trial_started_at >= self.reset_timeout
+        ):
+            self._trial_started_at = now
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._trial_started_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._trial_started_at = None
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Rolling window of successful call durations, used to pick hedge delays."""
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_latencies: Dict[str, LatencyTracker] = {}
+
+
+def get_breaker(model: str) -> CircuitBreaker:
+    """Return the circuit breaker for ``model``, creating it on first use."""
+    if model not in _breakers:
+        _breakers[model] = CircuitBreaker(GEMINI_CIRCUIT_FAILURE_THRESHOLD, GEMINI_CIRCUIT_RESET_TIMEOUT)
+    return _breakers[model]
+
+
+def get_latency_tracker(model: str) -> LatencyTracker:
+    """Return the latency tracker for ``model``, creating it on first use."""
+    if model not in _latencies:
+        _latencies[model] = LatencyTracker()
+    return _latencies[model]
+
+
+async def _hedged(attempt: Callable[[], Awaitable[T]], delay: float) -> T:
+    """Run ``attempt``; if it has not finished after ``delay``, race a second copy."""
+    first = asyncio.ensure_future(attempt())
+    tasks = [first]
+    try:
+        done, _ = await asyncio.wait({first}, timeout=delay)
+        if done:
+            return first.result()
+
+        logger.info(f"Request slower than p95 ({delay:.2f}s), sending hedged request")
+        tasks.append(asyncio.ensure_future(attempt()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        # Both attempts failed; surface the original attempt's error
+        return first.result()
+    finally:
+        # Also runs when the caller is cancelled or times out mid-wait
+        for task in tasks:
+            task.cancel()
+
+
+async def call_with_resilience(model: str, attempt: Callable[[], Awaitable[T]]) -> T:
+    """Run one upstream call with retries, backoff, deadline, hedging and circuit breaking.
+
+    Args:
+        model: Model name, used to select the circuit breaker and latency stats
+        attempt: Zero-argument coroutine function performing a single attempt
+
+    Returns:
+        The result of the first successful attempt
+
+    Raises:
+        CircuitOpenError: If the model's circuit breaker is open
+        asyncio.TimeoutError: If GEMINI_REQUEST_DEADLINE is exceeded
+        Exception: The last error if it was fatal or retries were exhausted
+    """
+    breaker = get_breaker(model)
+    latency = get_latency_tracker(model)
+    deadline = time.monotonic() + GEMINI_REQUEST_DEADLINE if GEMINI_REQUEST_DEADLINE > 0 else None
+
+    retry = 0
+    while True:
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit breaker for {model} is open after repeated failures")
+
+        remaining = deadline - time.monotonic() if deadline is not None else None
+        hedge_delay = latency.percentile(0.95) if len(latency.samples) >= GEMINI_HEDGE_MIN_SAMPLES else None
+        start = time.monotonic()
+        try:
+            async with asyncio.timeout(remaining):
+                if GEMINI_HEDGE_ENABLED and hedge_delay is not None:
+                    result = await _hedged(attempt, hedge_delay)
+                else:
+                    result = await attempt()
+        except Exception as e:
+            retryable, retry_after = classify_error(e)
+            if not retryable:
+                if isinstance(e, errors.APIError):
+                    # The model answered, so this says nothing about its health
+                    breaker.record_success()
+                raise
+            if not isinstance(e, BackendsExhaustedError) and not is_quota_error(e):
+                # Running out of quota says nothing about the model's health
+                breaker.record_failure()
+
+            delay = random.uniform(0, min(GEMINI_RETRY_MAX_DELAY, GEMINI_RETRY_BASE_DELAY * 2 ** retry))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            out_of_time = deadline is not None and time.monotonic() + delay >= deadline
+            if retry == GEMINI_MAX_RETRIES or out_of_time:
+                raise
+            logger.warning(f"Retryable error from {model} ({str(e)}), retrying in {delay:.2f}s "
+                           f"(attempt {retry + 2}/{GEMINI_MAX_RETRIES + 1})")
+            await asyncio.sleep(delay)
+            retry += 1
+            continue
+
+        breaker.record_success()
+        latency.record(time.monotonic() - start)
+        return result
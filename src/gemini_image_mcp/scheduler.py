@@ -0,0 +1,307 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+
+from .lazy import LazyModule
+
+logger = logging.getLogger(__name__)
+
+types = LazyModule("google.genai.types")
+
+
+# ==================== Quota Settings ====================
+
+# Client-side request and token budgets per minute for each API key and model
+# (0 disables the limit). Text budgets apply to text-only calls (translation,
+# filenames), image budgets to generation and transformation calls.
+GEMINI_TEXT_RPM = int(os.environ.get("GEMINI_TEXT_RPM", "0"))
+GEMINI_TEXT_TPM = int(os.environ.get("GEMINI_TEXT_TPM", "0"))
+GEMINI_IMAGE_RPM = int(os.environ.get("GEMINI_IMAGE_RPM", "0"))
+GEMINI_IMAGE_TPM = int(os.environ.get("GEMINI_IMAGE_TPM", "0"))
+
+# Burst allowance: a bucket holds at most this many seconds' worth of budget,
+# so an idle period does not let a full minute of requests go out at once
+GEMINI_QUOTA_BURST_SECONDS = float(os.environ.get("GEMINI_QUOTA_BURST_SECONDS", "10"))
+
+# Requests allowed to wait for quota per model; further requests are rejected
+# immediately instead of queueing behind an exhausted budget
+GEMINI_QUEUE_MAX_DEPTH = int(os.environ.get("GEMINI_QUEUE_MAX_DEPTH", "64"))
+
+# Priority lanes, highest first. Waiting requests are admitted strictly by
+# lane, then in arrival order.
+LANES = ("interactive", "standard", "batch")
+
+# Rough token costs used to charge the TPM budget before a call is made
+_CHARS_PER_TOKEN = 4
+_TOKENS_PER_IMAGE_INPUT = 258
+_TOKENS_PER_IMAGE_OUTPUT = 1290
+
+# Lane of the current tool call; tasks started from it inherit the value
+current_lane: contextvars.ContextVar[str] = contextvars.ContextVar("gemini_lane", default="standard")
+
+
+class QueueFullError(RuntimeError):
+    """Raised when too many requests are already waiting for a model's quota."""
+
+
+def estimate_tokens(contents: Union[str, List[Any]], text_only: bool = False, outputs: int = 1) -> int:
+    """Estimate the tokens a generate_content call will use.
+
+    Args:
+        contents: Request contents: a string, or a list of strings and/or Parts
+        text_only: Whether the response is text only; otherwise one generated
+                   image per output is added to the estimate
+        outputs: Number of candidates requested
+
+    Returns:
+        Estimated input plus output tokens
+    """
+    if isinstance(contents, str):
+        # generate_content takes a bare prompt string as a single text part
+        contents = [contents]
+    tokens = 0
+    for item in contents:
+        if isinstance(item, str):
+            tokens += len(item) // _CHARS_PER_TOKEN + 1
+        elif isinstance(item, types.Part) and item.text is not None:
+            tokens += len(item.text) // _CHARS_PER_TOKEN + 1
+        else:
+            tokens += _TOKENS_PER_IMAGE_INPUT
+    return tokens + (0 if text_only else _TOKENS_PER_IMAGE_OUTPUT * outputs)
+
+
+class TokenBucket:
+    """Token bucket refilled at ``per_minute`` tokens per minute.
+
+    The bucket holds at most ``burst_seconds`` of refill (but at least one
+    token) and starts full.
+    """
+
+    def __init__(self, per_minute: int, burst_seconds: float):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until ``amount`` tokens are available (0 if they are now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return max(0.0, (amount - self.tokens) / self.rate)
+
+    def take(self, amount: float) -> None:
+        self.tokens -= min(amount, self.capacity)
+
+
+class QuotaScheduler:
+    """Admit requests for one model within its RPM/TPM budgets.
+
+    Requests that fit the budget and have nobody waiting ahead of them are
+    admitted immediately. Others wait in a priority queue ordered by lane and
+    arrival; the head of the queue is admitted as soon as both buckets can
+    cover it, so a large request is never starved by smaller ones behind it.
+    When the queue is full, a newcomer displaces the newest waiter from a
+    lower-priority lane, or is rejected if there is none.
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int, max_depth: int):
+        self.name = name
+        self.buckets: List[Tuple[TokenBucket, bool]] = []
+        if rpm > 0:
+            self.buckets.append((TokenBucket(rpm, GEMINI_QUOTA_BURST_SECONDS), False))
+        if tpm > 0:
+            self.buckets.append((TokenBucket(tpm, GEMINI_QUOTA_BURST_SECONDS), True))
+        self.max_depth = max_depth
+        self._queue: List[Tuple[int, int, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._waiting = 0
+        self._wait_samples: Deque[float] = deque(maxlen=1000)
+        self.stats: Dict[str, float] = {
+            "admitted": 0,
+            "rejected": 0,
+            "queued": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    @property
+    def depth(self) -> int:
+        """Number of requests currently waiting for quota."""
+        return self._waiting
+
+    def _wait_time(self, tokens: int, now: float) -> float:
+        return max((b.wait_time(tokens if by_tokens else 1, now) for b, by_tokens in self.buckets), default=0.0)
+
+    def _take(self, tokens: int) -> None:
+        for bucket, by_tokens in self.buckets:
+            bucket.take(tokens if by_tokens else 1)
+
+    async def acquire(self, tokens: int, lane: str = "standard") -> float:
+        """Wait until the request may be sent and charge it to the budgets.
+
+        Args:
+            tokens: Estimated tokens for the request
+            lane: Priority lane, one of LANES
+
+        Returns:
+            Seconds spent waiting for quota
+
+        Raises:
+            QueueFullError: If GEMINI_QUEUE_MAX_DEPTH requests are already waiting
+        """
+        start = time.monotonic()
+        if not self._waiting and self._wait_time(tokens, start) == 0:
+            self._take(tokens)
+            self._record(0.0)
+            return 0.0
+
+        if self._waiting >= self.max_depth and not self._evict_below(LANES.index(lane)):
+            self.stats["rejected"] += 1
+            raise QueueFullError(
+                f"Too many requests waiting for {self.name} quota ({self._waiting}); try again later"
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (LANES.index(lane), next(self._seq), tokens, future))
+        self._waiting += 1
+        self.stats["queued"] += 1
+        self._drain()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # Admitted just as we were cancelled; the quota is spent anyway
+                self._record(time.monotonic() - start)
+            raise
+        finally:
+            if not future.done() or future.cancelled():
+                self._waiting -= 1
+                self._drain()
+
+        waited = time.monotonic() - start
+        self._record(waited)
+        if waited > 1:
+            logger.info(f"Waited {waited:.2f}s for {self.name} quota ({lane} lane)")
+        return waited
+
+    def _evict_below(self, priority: int) -> bool:
+        """Reject the newest waiter in a lower-priority lane to make room.
+
+        Returns:
+            True if a waiter was evicted
+        """
+        pending = [entry for entry in self._queue if not entry[3].done()]
+        if not pending:
+            return False
+        victim = max(pending, key=lambda entry: entry[:2])
+        if victim[0] <= priority:
+            return False
+        victim[3].set_exception(QueueFullError(
+            f"Request for {self.name} quota was displaced by higher-priority work; try again later"
+        ))
+        self._waiting -= 1
+        self.stats["rejected"] += 1
+        return True
+
+    def _record(self, waited: float) -> None:
+        self.stats["admitted"] += 1
+        self.stats["wait_seconds_total"] += waited
+        self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], waited)
+        self._wait_samples.append(waited)
+
+    def wait_percentile(self, q: float) -> float:
+        """Return the ``q`` quantile of recent queue wait times in seconds."""
+        if not self._wait_samples:
+            return 0.0
+        ordered = sorted(self._wait_samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def _drain(self) -> None:
+        """Admit waiting requests from the head of the queue while quota allows."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._queue:
+            _, _, tokens, future = self._queue[0]
+            if future.done():
+                heapq.heappop(self._queue)
+                continue
+            wait = self._wait_time(tokens, time.monotonic())
+            if wait > 0:
+                self._timer = asyncio.get_running_loop().call_later(wait, self._drain)
+                return
+            heapq.heappop(self._queue)
+            self._take(tokens)
+            self._waiting -= 1
+            future.set_result(None)
+
+
+_schedulers: Dict[str, QuotaScheduler] = {}
+
+
+def get_scheduler(model: str, text_only: bool, api_key: Optional[str] = None) -> QuotaScheduler:
+    """Return the quota scheduler for ``model`` on ``api_key``, creating it on first use.
+
+    Schedulers are named like backends ("<model>@...<last 4 key chars>"), or
+    after the model alone when no key is given.
+    """
+    name = f"{model}@...{api_key[-4:]}" if api_key else model
+    if name not in _schedulers:
+        if text_only:
+            rpm, tpm = GEMINI_TEXT_RPM, GEMINI_TEXT_TPM
+        else:
+            rpm, tpm = GEMINI_IMAGE_RPM, GEMINI_IMAGE_TPM
+        _schedulers[name] = QuotaScheduler(name, rpm, tpm, GEMINI_QUEUE_MAX_DEPTH)
+    return _schedulers[name]
+
+
+async def acquire_quota(
+    model: str,
+    contents: Union[str, List[Any]],
+    text_only: bool = False,
+    outputs: int = 1,
+    api_key: Optional[str] = None,
+) -> float:
+    """Wait for quota to send ``contents`` to ``model`` in the current lane.
+
+    Args:
+        model: Model the request is sent to
+        contents: Request contents, used to estimate token usage
+        text_only: Whether this is a text-only call
+        outputs: Number of candidates requested
+        api_key: API key the request is sent with; each key has its own budgets
+
+    Returns:
+        Seconds spent waiting for quota
+
+    Raises:
+        QueueFullError: If the model's quota queue is full
+    """
+    scheduler = get_scheduler(model, text_only, api_key)
+    return await scheduler.acquire(estimate_tokens(contents, text_only, outputs), current_lane.get())
+
+
+def get_scheduler_stats() -> Dict[str, Dict[str, float]]:
+    """Return admission and queue-wait statistics for every scheduler, by name."""
+    return {
+        name: {
+            **scheduler.stats,
+            "depth": scheduler.depth,
+            "wait_seconds_p50": scheduler.wait_percentile(0.5),
+            "wait_seconds_p95": scheduler.wait_percentile(0.95),
+        }
+        for name, scheduler in _schedulers.items()
+    }
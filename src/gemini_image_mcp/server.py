@@ -1,18 +1,73 @@
+from __future__ import annotations
+
+import asyncio
 import base64
+import hashlib
+import importlib
+import io
+import json
 import os
 import logging
+import multiprocessing
+import random
 import sys
+import time
+import unicodedata
 import uuid
-from io import BytesIO
-from typing import Optional, Any, Union, List, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from typing import Optional, Any, Dict, Union, List, Set, Tuple
 
-import PIL.Image
-from google import genai
-from google.genai import types
-from fastmcp import FastMCP
+import mcp.types as mcp_types
+from fastmcp import Context, FastMCP
+from fastmcp.resources import ResourceContent, ResourceResult
 from fastmcp.utilities.types import Image as MCPImage
+from starlette.middleware import Middleware
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
 
-from .prompts import get_image_generation_prompt, get_image_transformation_prompt, get_translate_prompt
+from .asgi import BodySizeLimitMiddleware
+from .cache import ResultCache, TTLCache
+from .client import close_clients, get_api_keys, get_client
+from .imaging import (
+    MAX_INPUT_IMAGE_BYTES,
+    decode_base64_chunked,
+    image_part_from_bytes,
+    sniff_image,
+    transcode_image,
+    upload_stats,
+)
+from .jobs import JOB_STATUSES, JobQueue, JobStore
+from .lazy import LazyModule
+from .metrics import (
+    METRICS_ENABLED,
+    PAYLOAD_BYTES,
+    PROMPT_TOKENS,
+    counter,
+    gauge,
+    instrument_tool,
+    register_collector,
+    render_metrics,
+    span,
+    stage,
+    upstream_call,
+)
+from .pool import get_backend_pool, model_chain
+from .progress import ProgressReporter
+from .prompts import (
+    PROMPT_STYLES,
+    get_batch_translate_prompt,
+    get_session_edit_prompt,
+    get_translate_prompt,
+    render_prompt,
+)
+from .resilience import BackendsExhaustedError, call_with_resilience, classify_error, is_quota_error
+from .scheduler import acquire_quota, current_lane, estimate_tokens, get_scheduler_stats
+from .sessions import SessionStore
+from .shared import SQLiteStore, open_shared_store
+from .singleflight import SingleFlight
+from .utils import JOB_IMAGE_PATH, store_image, stored_image_path
 
 
 # Setup logging
@@ -23,8 +78,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+errors = LazyModule("google.genai.errors")
+types = LazyModule("google.genai.types")
+
+
+
+@asynccontextmanager
+async def _server_lifespan(server: FastMCP):
+    """Start the job queue and the background warm-up (SERVER_WARMUP) when the server starts serving."""
+    if SERVER_WARMUP not in SERVER_WARMUP_MODES:
+        raise ValueError(f"Unsupported SERVER_WARMUP: {SERVER_WARMUP}. Use one of {', '.join(SERVER_WARMUP_MODES)}")
+    # Adopt jobs orphaned by other processes without waiting for a job tool call
+    job_queue.start()
+    task = asyncio.create_task(warm_up(connect=SERVER_WARMUP == "connect")) if SERVER_WARMUP != "off" else None
+    try:
+        yield {}
+    finally:
+        if task is not None:
+            task.cancel()
+
+
 # Initialize MCP server
-mcp = FastMCP("GeminiImageMCP")
+mcp = FastMCP("GeminiImageMCP", lifespan=_server_lifespan)
 
 
 # ==================== Gemini API Interaction ====================
@@ -41,44 +116,357 @@ DEFAULT_GEMINI_TEXT_MODEL = os.environ.get(
     "gemini-2.0-flash",
 )
 
+# Upper bound on concurrent upstream Gemini requests. Calls beyond this limit
+# wait for a free slot instead of piling onto the API.
+GEMINI_MAX_CONCURRENT_REQUESTS = int(os.environ.get("GEMINI_MAX_CONCURRENT_REQUESTS", "8"))
 
-def _extract_image_from_response(response) -> MCPImage:
-    """Extract the first inline image from a Gemini response and wrap as MCPImage.
+_gemini_semaphore = asyncio.Semaphore(GEMINI_MAX_CONCURRENT_REQUESTS)
+
+# Use the streaming generate API for image calls so progress can be reported
+# while the response arrives
+GEMINI_STREAMING_ENABLED = os.environ.get("GEMINI_STREAMING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Multi-worker deployments run SERVER_WORKERS processes on one port. State the
+# processes must agree on (result and translation caches, background jobs)
+# goes to SHARED_STORE_URL: a SQLite file path for processes on one host, or a
+# redis:// URL (requires the redis package).
+SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "1"))
+SHARED_STORE_URL = os.environ.get("SHARED_STORE_URL") or None
+
+shared_store = open_shared_store(SHARED_STORE_URL)
+
+# Translation cache settings. Set TRANSLATION_CACHE_PATH to persist
+# translations across restarts.
+TRANSLATION_CACHE_SIZE = int(os.environ.get("TRANSLATION_CACHE_SIZE", "512"))
+TRANSLATION_CACHE_TTL = float(os.environ.get("TRANSLATION_CACHE_TTL", "86400"))
+TRANSLATION_CACHE_PATH = os.environ.get("TRANSLATION_CACHE_PATH") or None
+# Minimum seconds between rewrites of TRANSLATION_CACHE_PATH
+TRANSLATION_CACHE_PERSIST_INTERVAL = float(os.environ.get("TRANSLATION_CACHE_PERSIST_INTERVAL", "5"))
+
+translation_cache = TTLCache(
+    TRANSLATION_CACHE_SIZE,
+    TRANSLATION_CACHE_TTL,
+    persist_path=TRANSLATION_CACHE_PATH,
+    persist_interval=TRANSLATION_CACHE_PERSIST_INTERVAL,
+    shared=shared_store.namespace("translation:") if shared_store else None,
+)
+
+# Opt-in cache of generated images keyed on model, final prompt and source
+# image bytes. The disk tier is only used when RESULT_CACHE_DIR is set.
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "false").lower() in ("1", "true", "yes")
+RESULT_CACHE_TTL = float(os.environ.get("RESULT_CACHE_TTL", "604800"))
+RESULT_CACHE_MEMORY_BYTES = int(os.environ.get("RESULT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR") or None
+RESULT_CACHE_DISK_BYTES = int(os.environ.get("RESULT_CACHE_DISK_BYTES", str(1024 * 1024 * 1024)))
+
+result_cache = ResultCache(
+    RESULT_CACHE_MEMORY_BYTES,
+    RESULT_CACHE_TTL,
+    disk_dir=RESULT_CACHE_DIR,
+    disk_bytes=RESULT_CACHE_DISK_BYTES,
+    shared=shared_store.namespace("result:") if shared_store else None,
+)
+
+# Identical image requests that arrive while one is already in flight share
+# its upstream call instead of issuing their own
+REQUEST_COALESCING_ENABLED = os.environ.get("REQUEST_COALESCING_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_image_requests = SingleFlight()
+
+# Limits for generate_images_batch
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "16"))
+BATCH_MAX_PARALLEL = int(os.environ.get("BATCH_MAX_PARALLEL", "4"))
+
+# Server defaults for returned images; tools can override them per call.
+# OUTPUT_FORMAT is "original" (keep what the model returned), png, jpeg, webp
+# or avif. OUTPUT_MAX_EDGE of 0 keeps the original dimensions.
+OUTPUT_FORMAT = os.environ.get("OUTPUT_FORMAT", "original").lower()
+OUTPUT_QUALITY = int(os.environ.get("OUTPUT_QUALITY", "85"))
+OUTPUT_MAX_EDGE = int(os.environ.get("OUTPUT_MAX_EDGE", "0"))
+OUTPUT_THUMBNAIL_EDGE = int(os.environ.get("OUTPUT_THUMBNAIL_EDGE", "256"))
+
+# Transcoding runs in a process pool so it never blocks the event loop or
+# competes for the GIL; 0 falls back to a worker thread
+OUTPUT_TRANSCODE_WORKERS = int(os.environ.get("OUTPUT_TRANSCODE_WORKERS", "2"))
+
+OUTPUT_FORMATS = ("original", "png", "jpeg", "jpg", "webp", "avif")
+
+_transcode_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _get_transcode_pool() -> ProcessPoolExecutor:
+    """Return the transcoding process pool, creating it on first use.
+
+    Workers are not forked from this process: its threads (asyncio.to_thread,
+    the request log writer, database and HTTP clients) may hold locks that a
+    forked child would inherit locked. They are forked from a separate fork
+    server that imports the imaging module once, or spawned where fork
+    servers are not available.
+    """
+    global _transcode_pool
+
+    if _transcode_pool is None:
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["gemini_image_mcp.imaging"])
+        else:
+            context = multiprocessing.get_context("spawn")
+        _transcode_pool = ProcessPoolExecutor(max_workers=OUTPUT_TRANSCODE_WORKERS, mp_context=context)
+    return _transcode_pool
+
+
+def shutdown_transcode_pool() -> None:
+    """Stop the transcoding workers, if started."""
+    global _transcode_pool
+
+    if _transcode_pool is not None:
+        _transcode_pool.shutdown(wait=False, cancel_futures=True)
+        _transcode_pool = None
+
+# How tools return images: "inline" (base64 image content), "resource" (a link
+# to an image://generated/... resource) or "path" (the stored file path).
+# Non-inline modes write results to the content-addressed store under
+# OUTPUT_IMAGE_PATH and keep image bytes out of the JSON-RPC stream.
+RESPONSE_MODE = os.environ.get("RESPONSE_MODE", "inline").lower()
+RESPONSE_MODES = ("inline", "resource", "path")
+
+STORED_IMAGE_URI_PREFIX = "image://generated/"
+
+# Variants per generate_image_from_text call (variant_count). Models that take
+# candidate_count return them from one request; for models that reject it
+# (remembered per process), or with GEMINI_CANDIDATE_COUNT_ENABLED off, the
+# variants come from parallel requests with distinct seeds.
+MAX_VARIANTS = int(os.environ.get("MAX_VARIANTS", "4"))
+GEMINI_CANDIDATE_COUNT_ENABLED = os.environ.get("GEMINI_CANDIDATE_COUNT_ENABLED", "true").lower() in ("1", "true", "yes")
+
+_candidate_count_unsupported: set = set()
+
+# How non-English prompts reach the image model: "translate" rewrites them to
+# English with DEFAULT_GEMINI_TEXT_MODEL first (two sequential round trips);
+# "single_shot" sends them as-is and has the image model interpret them.
+TRANSLATION_MODE = os.environ.get("TRANSLATION_MODE", "translate").lower()
+TRANSLATION_MODES = ("translate", "single_shot")
+
+# Image prompt templates: "full" (detailed best-practice instructions) or
+# "compact" (the essentials only, roughly 450 fewer input tokens per request).
+# With PROMPT_SYSTEM_INSTRUCTION set, the static instructions go in the
+# request's system_instruction and only the user's request is sent as contents.
+PROMPT_STYLE = os.environ.get("PROMPT_STYLE", "full").lower()
+PROMPT_SYSTEM_INSTRUCTION = os.environ.get("PROMPT_SYSTEM_INSTRUCTION", "false").lower() in ("1", "true", "yes")
+
+# Background jobs (submit_image_job). Results are kept for JOB_RESULT_TTL
+# seconds. Jobs live in SHARED_STORE_URL if set, otherwise in the SQLite file
+# at JOB_DB_PATH if set, otherwise in memory. Unfinished jobs in a shared
+# store are taken over by another process (or after a restart) once their
+# JOB_LEASE_SECONDS lease lapses.
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX_SIZE = int(os.environ.get("JOB_QUEUE_MAX_SIZE", "100"))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", "3600"))
+JOB_DB_PATH = os.environ.get("JOB_DB_PATH") or None
+JOB_LEASE_SECONDS = float(os.environ.get("JOB_LEASE_SECONDS", "30"))
+
+job_queue = JobQueue(
+    JobStore(shared_store or (SQLiteStore(JOB_DB_PATH) if JOB_DB_PATH else None)),
+    JOB_WORKERS,
+    JOB_QUEUE_MAX_SIZE,
+    JOB_RESULT_TTL,
+    lease=JOB_LEASE_SECONDS,
+)
+
+# Multi-turn editing (start_edit_session / edit_in_session). Sessions keep the
+# current image and recent edit instructions server-side; beyond
+# EDIT_SESSION_MAX_COUNT sessions or EDIT_SESSION_MAX_BYTES of images the least
+# recently used are evicted, and idle ones expire after EDIT_SESSION_TTL
+# seconds. Each edit sends the current image, the new instruction and the last
+# EDIT_SESSION_HISTORY instructions. With EDIT_SESSION_FILES_API, each new
+# image is uploaded to the Gemini Files API in the background between turns
+# and the next edit refers to it by URI instead of sending the bytes again
+# (only with a single API key, as files belong to the key's project). With
+# SHARED_STORE_URL set, sessions live in the shared store instead, expiring
+# after EDIT_SESSION_TTL, so any worker can continue them.
+EDIT_SESSION_MAX_COUNT = int(os.environ.get("EDIT_SESSION_MAX_COUNT", "100"))
+EDIT_SESSION_MAX_BYTES = int(os.environ.get("EDIT_SESSION_MAX_BYTES", str(256 * 1024 * 1024)))
+EDIT_SESSION_TTL = float(os.environ.get("EDIT_SESSION_TTL", "1800"))
+EDIT_SESSION_HISTORY = int(os.environ.get("EDIT_SESSION_HISTORY", "6"))
+EDIT_SESSION_FILES_API = os.environ.get("EDIT_SESSION_FILES_API", "true").lower() in ("1", "true", "yes")
+
+edit_sessions = SessionStore(
+    EDIT_SESSION_MAX_COUNT,
+    EDIT_SESSION_MAX_BYTES,
+    EDIT_SESSION_TTL,
+    shared=shared_store.namespace("session:") if shared_store else None,
+)
+
+
+def _extract_images_from_response(response) -> List[MCPImage]:
+    """Extract every inline image from every candidate of a Gemini response.
 
     Uses the google-genai response structure.
     """
     if not getattr(response, "candidates", None):
         raise ValueError("Model returned no candidates")
 
-    candidate = response.candidates[0]
-    content = getattr(candidate, "content", None)
-    parts = getattr(content, "parts", []) if content else []
-
-    for part in parts:
-        inline = getattr(part, "inline_data", None)
-        if inline and getattr(inline, "data", None):
-            raw = inline.data
-            # The google-genai SDK returns bytes for image inline_data; but
-            # if it's unexpectedly a str, decode as base64 or utf-8 best effort.
-            if isinstance(raw, str):
-                try:
-                    buf = base64.b64decode(raw)
-                except Exception:
-                    buf = raw.encode("utf-8")
-            else:
-                buf = raw
-
-            mime = getattr(inline, "mime_type", "image/png")
-            fmt = mime.split("/")[-1] if "/" in mime else "png"
-            return MCPImage(data=buf, format=fmt)
-
-    raise ValueError("No image was generated from the model response")
+    images = []
+    for candidate in response.candidates:
+        content = getattr(candidate, "content", None)
+        parts = getattr(content, "parts", []) if content else []
+
+        for part in parts or []:
+            inline = getattr(part, "inline_data", None)
+            if inline and getattr(inline, "data", None):
+                raw = inline.data
+                # The google-genai SDK returns bytes for image inline_data; but
+                # if it's unexpectedly a str, decode as base64 or utf-8 best effort.
+                if isinstance(raw, str):
+                    try:
+                        buf = base64.b64decode(raw)
+                    except Exception:
+                        buf = raw.encode("utf-8")
+                else:
+                    buf = raw
+
+                mime = getattr(inline, "mime_type", "image/png")
+                fmt = mime.split("/")[-1] if "/" in mime else "png"
+                images.append(MCPImage(data=buf, format=fmt))
+
+    if not images:
+        raise ValueError("No image was generated from the model response")
+    return images
+
+
+def _extract_image_from_response(response) -> MCPImage:
+    """Extract the first inline image from a Gemini response and wrap as MCPImage."""
+    return _extract_images_from_response(response)[0]
+
+
+async def _stream_gemini(
+    client: Any,
+    contents: List[Any],
+    model: str,
+    config: Optional[types.GenerateContentConfig],
+    progress: ProgressReporter,
+) -> types.GenerateContentResponse:
+    """Stream a generate call, reporting progress, and merge the chunks into one response."""
+    # Parts per candidate index, for requests with candidate_count > 1
+    parts: Dict[int, List[types.Part]] = {}
+    stream = await client.aio.models.generate_content_stream(
+        model=model,
+        contents=contents,
+        config=config,
+    )
+    async for chunk in stream:
+        for candidate in chunk.candidates or []:
+            if not candidate.content:
+                continue
+            for part in candidate.content.parts or []:
+                parts.setdefault(candidate.index or 0, []).append(part)
+                if part.text:
+                    await progress.text(part.text)
+                if part.inline_data and part.inline_data.data:
+                    await progress.received(len(part.inline_data.data))
+
+    return types.GenerateContentResponse(
+        candidates=[
+            types.Candidate(index=index, content=types.Content(role="model", parts=parts[index]))
+            for index in sorted(parts)
+        ] or [types.Candidate(content=types.Content(role="model", parts=[]))]
+    )
+
+
+async def _call_backends(
+    contents: List[Any],
+    model: str,
+    config: Optional[types.GenerateContentConfig],
+    text_only: bool,
+    progress: Optional[ProgressReporter],
+    outputs: int = 1,
+) -> types.GenerateContentResponse:
+    """Send one request through the backend pool, failing over on quota errors.
+
+    The least-loaded API key for ``model`` is tried first, once that key's
+    client-side RPM/TPM quota admits the request. A key that returns a quota
+    error is evicted from rotation and the request moves on to the next key,
+    then to the configured fallback models. If no other backend is left, the
+    quota error is raised without evicting, so the caller's retry policy
+    backs off and tries again.
+    """
+    pool = get_backend_pool()
+    models = model_chain(model, text_only)
+    tried = ()
+    while True:
+        backend = pool.select(models, exclude=tried)
+        if backend is None:
+            raise BackendsExhaustedError(
+                f"All API keys are out of quota for {model}",
+                retry_after=pool.next_available_in(models),
+            )
+
+        client = get_client(backend.api_key)
+        # Count the request against the backend while it waits for quota, so
+        # concurrent requests spread over the keys instead of queueing on one
+        backend.start()
+        try:
+            await acquire_quota(backend.model, contents, text_only, outputs, api_key=backend.api_key)
+        except BaseException:
+            backend.cancel()
+            raise
+        try:
+            async with _gemini_semaphore:
+                start = time.monotonic()
+                with upstream_call(backend.model):
+                    if progress is not None and GEMINI_STREAMING_ENABLED and not text_only:
+                        response = await _stream_gemini(client, contents, backend.model, config, progress)
+                    else:
+                        response = await client.aio.models.generate_content(
+                            model=backend.model,
+                            contents=contents,
+                            config=config
+                        )
+        except BaseException as e:
+            backend.finish(None)
+            if not is_quota_error(e):
+                raise
+            tried += (backend,)
+            if pool.select(models, exclude=tried) is None:
+                # Nothing left to fail over to: keep the key in rotation and
+                # let call_with_resilience back off and retry it
+                raise
+            _, retry_after = classify_error(e)
+            backend.evict(retry_after)
+            continue
+
+        backend.finish(time.monotonic() - start)
+        if backend.model != model:
+            logger.info(f"Served request for {model} with fallback model {backend.model}")
+        return response
+
+
+async def _generate(
+    contents: List[Any],
+    model: str,
+    config: Optional[types.GenerateContentConfig],
+    text_only: bool,
+    progress: Optional[ProgressReporter],
+) -> types.GenerateContentResponse:
+    """Send a generate request under the quota scheduler, concurrency limit and retry policy."""
+    outputs = (config.candidate_count or 1) if config is not None else 1
+
+    # Generate content using the async client so the event loop stays free
+    # for other sessions while the request is in flight. Quota is taken per
+    # API key once _call_backends has picked one.
+    async def attempt() -> types.GenerateContentResponse:
+        return await _call_backends(contents, model, config, text_only, progress, outputs)
+
+    # Retry transient failures with backoff, within the request deadline
+    return await call_with_resilience(model, attempt)
+
 
 async def call_gemini(
     contents: List[Any],
     model: str = DEFAULT_GEMINI_IMAGE_MODEL,
     config: Optional[types.GenerateContentConfig] = None,
     text_only: bool = False,
+    progress: Optional[ProgressReporter] = None,
 ) -> Union[str, bytes, MCPImage]:
     """Call Gemini API with flexible configuration for different use cases.
     
@@ -87,6 +475,8 @@ async def call_gemini(
         model: The Gemini model to use
         config: Optional configuration for the Gemini API call
         text_only: If True, extract and return only text from the response
+        progress: If given (and GEMINI_STREAMING_ENABLED is set), stream the
+                  response and report received bytes and text parts through it
         
     Returns:
         If text_only is True: str - The text response from Gemini
@@ -96,19 +486,7 @@ async def call_gemini(
         Exception: If there's an error calling the Gemini API
     """
     try:
-        # Initialize Gemini client
-        api_key = os.environ.get("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY environment variable not set")
-            
-        client = genai.Client(api_key=api_key)
-        
-        # Generate content using Gemini
-        response = client.models.generate_content(
-            model=model,
-            contents=contents,
-            config=config
-        )
+        response = await _generate(contents, model, config, text_only, progress)
         
         logger.info(f"Response received from Gemini API using model {model}")
         
@@ -117,7 +495,42 @@ async def call_gemini(
             return response.candidates[0].content.parts[0].text.strip()
 
         # Return the image as MCP Image for LibreChat
-        return _extract_image_from_response(response)
+        with stage("extract"):
+            image = _extract_image_from_response(response)
+        PAYLOAD_BYTES.observe(len(image.data), direction="generated")
+        return image
+
+    except Exception as e:
+        logger.error(f"Error calling Gemini API: {str(e)}")
+        raise
+
+
+async def call_gemini_images(
+    contents: List[Any],
+    model: str = DEFAULT_GEMINI_IMAGE_MODEL,
+    config: Optional[types.GenerateContentConfig] = None,
+    progress: Optional[ProgressReporter] = None,
+) -> List[MCPImage]:
+    """Call Gemini and return the images from every candidate of the response.
+
+    Args:
+        contents: The content to send to Gemini. list containing text and/or images
+        model: The Gemini model to use
+        config: Optional configuration, e.g. with candidate_count set
+        progress: Optional reporter for streamed progress notifications
+
+    Returns:
+        Every generated image, in candidate order
+    """
+    try:
+        response = await _generate(contents, model, config, False, progress)
+        logger.info(f"Response received from Gemini API using model {model}")
+
+        with stage("extract"):
+            images = _extract_images_from_response(response)
+        for image in images:
+            PAYLOAD_BYTES.observe(len(image.data), direction="generated")
+        return images
 
     except Exception as e:
         logger.error(f"Error calling Gemini API: {str(e)}")
@@ -166,15 +579,42 @@ async def convert_prompt_to_filename(prompt: str) -> str:
         return f"image_{truncated_text}_{str(uuid.uuid4())[:8]}"
 
 
+def _normalize_prompt(text: str) -> str:
+    """Normalize unicode form and whitespace so equivalent prompts share a cache key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def is_english_text(text: str) -> bool:
+    """Cheaply decide whether a prompt can skip translation.
+
+    A prompt counts as English when every alphabetic character in it is ASCII.
+    Non-ASCII punctuation and symbols (curly quotes, dashes, emoji) are ignored.
+    """
+    return all(ch.isascii() for ch in text if ch.isalpha())
+
+
 async def translate_prompt(text: str) -> str:
     """Translate and optimize the user's prompt to English for better image generation results.
     
+    English prompts are returned as-is without calling Gemini, and previous
+    translations are served from ``translation_cache``.
+
     Args:
         text: The original prompt in any language
         
     Returns:
         English translation of the prompt with preserved intent
     """
+    if is_english_text(text):
+        logger.info("Prompt is already English, skipping translation")
+        return text
+
+    cache_key = f"{DEFAULT_GEMINI_TEXT_MODEL}:{_normalize_prompt(text)}"
+    cached = await asyncio.to_thread(translation_cache.get, cache_key)
+    if cached is not None:
+        logger.info(f"Translation cache hit: {translation_cache.stats()}")
+        return cached
+
     try:
         # Create a prompt for translation with strict intent preservation
         prompt = get_translate_prompt(text)
@@ -187,7 +627,8 @@ async def translate_prompt(text: str) -> str:
         )
         logger.info(f"Original prompt: {text}")
         logger.info(f"Translated prompt: {translated_prompt}")
-        
+
+        await asyncio.to_thread(translation_cache.set, cache_key, translated_prompt)
         return translated_prompt
     
     except Exception as e:
@@ -196,120 +637,606 @@ async def translate_prompt(text: str) -> str:
         return text
 
 
+async def translate_prompts(texts: List[str]) -> List[str]:
+    """Translate several prompts to English with at most one Gemini call.
+
+    English prompts and cached translations are resolved locally; the rest are
+    sent together in a single batched request.
+
+    Args:
+        texts: The original prompts in any language
+
+    Returns:
+        English prompts in the same order as ``texts``
+    """
+    results: List[Optional[str]] = []
+    pending: List[int] = []
+    for i, text in enumerate(texts):
+        if is_english_text(text):
+            results.append(text)
+            continue
+        cached = await asyncio.to_thread(translation_cache.get, f"{DEFAULT_GEMINI_TEXT_MODEL}:{_normalize_prompt(text)}")
+        results.append(cached)
+        if cached is None:
+            pending.append(i)
+
+    if len(pending) == 1:
+        results[pending[0]] = await translate_prompt(texts[pending[0]])
+    elif pending:
+        try:
+            response = await call_gemini(
+                get_batch_translate_prompt([texts[i] for i in pending]),
+                model=DEFAULT_GEMINI_TEXT_MODEL,
+                config=types.GenerateContentConfig(response_mime_type="application/json"),
+                text_only=True,
+            )
+            translations = json.loads(response)
+            if not isinstance(translations, list) or len(translations) != len(pending):
+                raise ValueError(f"Expected {len(pending)} translations, got: {response}")
+
+            for i, translated in zip(pending, translations):
+                translated = str(translated)
+                logger.info(f"Translated prompt: {texts[i]} -> {translated}")
+                await asyncio.to_thread(
+                    translation_cache.set, f"{DEFAULT_GEMINI_TEXT_MODEL}:{_normalize_prompt(texts[i])}", translated
+                )
+                results[i] = translated
+        except Exception as e:
+            logger.error(f"Error translating prompts in batch: {str(e)}")
+            # Fall back to the original text, as translate_prompt does
+            for i in pending:
+                results[i] = texts[i]
+
+    return results
+
+
+def _check_translation_mode(translation_mode: Optional[str]) -> str:
+    """Resolve and validate a translation mode before any work is done."""
+    translation_mode = (translation_mode or TRANSLATION_MODE).lower()
+    if translation_mode not in TRANSLATION_MODES:
+        raise ValueError(
+            f"Unsupported translation mode: {translation_mode}. Use one of {', '.join(TRANSLATION_MODES)}"
+        )
+    return translation_mode
+
+
+async def prepare_prompt(text: str, translation_mode: str) -> Tuple[str, bool]:
+    """Get a user prompt ready for the image prompt templates.
+
+    Args:
+        text: The original prompt in any language
+        translation_mode: "translate" or "single_shot" (see TRANSLATION_MODE)
+
+    Returns:
+        Tuple of the prompt to embed and whether it is non-English text the
+        image model must interpret itself (the template's ``multilingual`` flag)
+    """
+    if translation_mode == "single_shot":
+        return text, not is_english_text(text)
+    return await translate_prompt(text), False
+
+
+def _check_prompt_style(prompt_style: Optional[str]) -> str:
+    """Resolve and validate a prompt template style before any work is done."""
+    prompt_style = (prompt_style or PROMPT_STYLE).lower()
+    if prompt_style not in PROMPT_STYLES:
+        raise ValueError(f"Unsupported prompt style: {prompt_style}. Use one of {', '.join(PROMPT_STYLES)}")
+    return prompt_style
+
+
+def build_image_prompt(
+    task: str,
+    prompt: str,
+    multilingual: bool = False,
+    prompt_style: Optional[str] = None,
+) -> Tuple[str, Optional[str]]:
+    """Render the image prompt template and record its estimated size.
+
+    Args:
+        task: "generation" or "transformation"
+        prompt: Prompt to embed, as returned by ``prepare_prompt``
+        multilingual: Whether the prompt is untranslated non-English text
+        prompt_style: "full" or "compact"; defaults to PROMPT_STYLE
+
+    Returns:
+        Tuple of the request text and the system instruction (None unless
+        PROMPT_SYSTEM_INSTRUCTION is set)
+    """
+    prompt_style = _check_prompt_style(prompt_style)
+    with stage("prompt_build"):
+        text, system_instruction = render_prompt(task, prompt, prompt_style, multilingual, PROMPT_SYSTEM_INSTRUCTION)
+    tokens = estimate_tokens([text] + ([system_instruction] if system_instruction else []), text_only=True)
+    PROMPT_TOKENS.observe(tokens, template=f"{task}/{prompt_style}")
+    logger.info(f"Built {task}/{prompt_style} prompt of ~{tokens} input tokens")
+    return text, system_instruction
+
+
 # ==================== Image Processing Functions ====================
 
+def _result_cache_key(contents: List[Any], model: str, system_instruction: Optional[str] = None) -> str:
+    """Hash the model and request contents into a result cache key.
+
+    Text parts contribute their UTF-8 bytes and images their encoded bytes,
+    so the same prompt applied to the same source image maps to the same key.
+    """
+    digest = hashlib.sha256(model.encode("utf-8"))
+    if system_instruction is not None:
+        digest.update(b"system:" + system_instruction.encode("utf-8"))
+    for item in contents:
+        if isinstance(item, str):
+            digest.update(b"text:" + item.encode("utf-8"))
+        elif isinstance(item, (bytes, bytearray)):
+            digest.update(b"bytes:" + bytes(item))
+        elif isinstance(item, types.Part) and item.inline_data is not None:
+            digest.update(f"part:{item.inline_data.mime_type}:".encode("utf-8"))
+            digest.update(item.inline_data.data or b"")
+        else:
+            digest.update(repr(item).encode("utf-8"))
+    return digest.hexdigest()
+
+
 async def process_image_with_gemini(
     contents: List[Any],
     prompt: str,
     model: str = DEFAULT_GEMINI_IMAGE_MODEL,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    progress: Optional[ProgressReporter] = None,
+    system_instruction: Optional[str] = None,
 ) -> MCPImage:
     """Process an image request with Gemini and return an MCPImage (no disk writes).
 
+    When RESULT_CACHE_ENABLED is set, identical requests are answered from
+    ``result_cache`` instead of calling Gemini again. Concurrent identical
+    requests share a single upstream call when REQUEST_COALESCING_ENABLED is set.
+
     Args:
         contents: List containing the prompt and optionally an image
         prompt: Original prompt (kept for potential future metadata usage)
         model: Gemini model to use
+        use_cache: If False, neither read from nor write to the result cache
+        refresh_cache: If True, skip the cache lookup but store the new result
+        progress: Optional reporter for stage, byte and text-part notifications
+        system_instruction: Optional static instructions sent as the system instruction
 
     Returns:
         FastMCP Image object suitable for LibreChat
     """
-    # Call Gemini Vision API and extract as MCPImage
-    mcp_image = await call_gemini(
-        contents,
-        model=model,
-        config=types.GenerateContentConfig(
-            response_modalities=['Text', 'Image']
+    progress = progress or ProgressReporter(None)
+    caching = RESULT_CACHE_ENABLED and use_cache
+    request_key = None
+    if caching or REQUEST_COALESCING_ENABLED:
+        request_key = await asyncio.to_thread(_result_cache_key, contents, model, system_instruction)
+
+    if caching and not refresh_cache:
+        cached = await asyncio.to_thread(result_cache.get, request_key)
+        if cached is not None:
+            logger.info(f"Result cache hit: {result_cache.stats()}")
+            data, fmt = cached
+            return MCPImage(data=data, format=fmt)
+
+    await progress.stage("generating")
+
+    async def generate() -> MCPImage:
+        # Call Gemini Vision API and extract as MCPImage
+        mcp_image = await call_gemini(
+            contents,
+            model=model,
+            config=types.GenerateContentConfig(
+                response_modalities=['Text', 'Image'],
+                system_instruction=system_instruction,
+            ),
+            progress=progress,
         )
-    )
+        await progress.stage("post-processing")
+
+        # Fallback in case SDK changed and returned raw bytes
+        if isinstance(mcp_image, (bytes, bytearray)):
+            mcp_image = MCPImage(data=bytes(mcp_image), format="png")
+        if not isinstance(mcp_image, MCPImage):
+            raise ValueError("Gemini did not return an image response")
 
-    if isinstance(mcp_image, MCPImage):
+        if caching:
+            fmt = getattr(mcp_image, "_format", None) or "png"
+            await asyncio.to_thread(result_cache.set, request_key, mcp_image.data, fmt)
         return mcp_image
-    # Fallback in case SDK changed and returned raw bytes
-    if isinstance(mcp_image, (bytes, bytearray)):
-        return MCPImage(data=bytes(mcp_image), format="png")
-    raise ValueError("Gemini did not return an image response")
+
+    with span("process_image_with_gemini", model=model):
+        if REQUEST_COALESCING_ENABLED:
+            return await _image_requests.do(request_key, generate)
+        return await generate()
+
+
+async def _generate_variants_in_parallel(
+    contents: List[Any],
+    model: str,
+    count: int,
+    system_instruction: Optional[str] = None,
+) -> List[MCPImage]:
+    """Generate ``count`` images with separate requests, each with its own seed.
+
+    Returns the images that succeeded; raises the first error if none did.
+    """
+    seed = random.randrange(2 ** 31 - count)
+    results = await asyncio.gather(
+        *(
+            call_gemini_images(
+                contents,
+                model=model,
+                config=types.GenerateContentConfig(
+                    response_modalities=['Text', 'Image'],
+                    system_instruction=system_instruction,
+                    seed=seed + i,
+                ),
+            )
+            for i in range(count)
+        ),
+        return_exceptions=True,
+    )
+    images = [result[0] for result in results if not isinstance(result, BaseException)]
+    failures = [result for result in results if isinstance(result, BaseException)]
+    if not images:
+        raise failures[0]
+    if failures:
+        logger.warning(f"{len(failures)} of {count} variant requests failed: {str(failures[0])}")
+    return images
+
+
+async def process_image_variants(
+    contents: List[Any],
+    prompt: str,
+    count: int,
+    model: str = DEFAULT_GEMINI_IMAGE_MODEL,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    progress: Optional[ProgressReporter] = None,
+    system_instruction: Optional[str] = None,
+) -> List[MCPImage]:
+    """Generate ``count`` alternative images for the same request.
+
+    The variants are requested with candidate_count in a single call when
+    the model supports it, and topped up with parallel single-image calls
+    otherwise. With one variant this is ``process_image_with_gemini``.
+
+    Args:
+        contents: List containing the prompt and optionally an image
+        prompt: Original prompt (kept for potential future metadata usage)
+        count: Number of variants to generate
+        model: Gemini model to use
+        use_cache: If False, neither read from nor write to the result cache
+        refresh_cache: If True, skip the cache lookup but store the new results
+        progress: Optional reporter for progress notifications
+        system_instruction: Optional static instructions sent as the system instruction
+
+    Returns:
+        Up to ``count`` images; fewer only if some of the parallel calls failed
+    """
+    if count == 1:
+        return [await process_image_with_gemini(
+            contents, prompt, model, use_cache, refresh_cache, progress, system_instruction
+        )]
+
+    progress = progress or ProgressReporter(None)
+    caching = RESULT_CACHE_ENABLED and use_cache
+    request_key = await asyncio.to_thread(_result_cache_key, contents, model, system_instruction)
+    variant_keys = [f"{request_key}:variant-{i}" for i in range(count)]
+
+    if caching and not refresh_cache:
+        cached = [await asyncio.to_thread(result_cache.get, key) for key in variant_keys]
+        if all(entry is not None for entry in cached):
+            logger.info(f"Result cache hit for {count} variants: {result_cache.stats()}")
+            return [MCPImage(data=data, format=fmt) for data, fmt in cached]
+
+    await progress.stage("generating")
+
+    async def generate() -> List[MCPImage]:
+        images: List[MCPImage] = []
+        if GEMINI_CANDIDATE_COUNT_ENABLED and model not in _candidate_count_unsupported:
+            try:
+                images = await call_gemini_images(
+                    contents,
+                    model=model,
+                    config=types.GenerateContentConfig(
+                        response_modalities=['Text', 'Image'],
+                        system_instruction=system_instruction,
+                        candidate_count=count,
+                    ),
+                    progress=progress,
+                )
+            except errors.ClientError as e:
+                if e.code != 400 or "candidate" not in str(e).lower():
+                    raise
+                _candidate_count_unsupported.add(model)
+                logger.info(f"{model} does not support candidate_count, generating variants in parallel")
+        if len(images) < count:
+            images += await _generate_variants_in_parallel(contents, model, count - len(images), system_instruction)
+        images = images[:count]
+        await progress.stage("post-processing")
+
+        if caching and len(images) == count:
+            for key, image in zip(variant_keys, images):
+                fmt = getattr(image, "_format", None) or "png"
+                await asyncio.to_thread(result_cache.set, key, image.data, fmt)
+        return images
+
+    with span("process_image_variants", model=model, count=count):
+        if REQUEST_COALESCING_ENABLED:
+            return await _image_requests.do(f"{request_key}:variants-{count}", generate)
+        return await generate()
 
 
 async def process_image_transform(
-    source_image: PIL.Image.Image, 
+    source_image: types.Part,
     optimized_edit_prompt: str, 
-    original_edit_prompt: str
+    original_edit_prompt: str,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    progress: Optional[ProgressReporter] = None,
+    multilingual: bool = False,
+    prompt_style: Optional[str] = None,
 ) -> MCPImage:
     """Process image transformation with Gemini.
     
     Args:
-        source_image: PIL Image object to transform
+        source_image: Request part holding the encoded source image
         optimized_edit_prompt: Optimized text prompt for transformation
         original_edit_prompt: Original user prompt for naming
+        use_cache: If False, bypass the result cache
+        refresh_cache: If True, regenerate and overwrite any cached result
+        progress: Optional reporter for progress notifications
+        multilingual: Set if the prompt is untranslated (single-shot mode)
+        prompt_style: "full" or "compact" prompt template; defaults to PROMPT_STYLE
         
     Returns:
         FastMCP Image object with the transformed image
     """
     # Create prompt for image transformation
-    edit_instructions = get_image_transformation_prompt(optimized_edit_prompt)
+    edit_instructions, system_instruction = build_image_prompt(
+        "transformation", optimized_edit_prompt, multilingual, prompt_style
+    )
     
     # Process with Gemini and return the result
     return await process_image_with_gemini(
         [edit_instructions, source_image],
-        original_edit_prompt
+        original_edit_prompt,
+        use_cache=use_cache,
+        refresh_cache=refresh_cache,
+        progress=progress,
+        system_instruction=system_instruction,
     )
 
 
-async def load_image_from_base64(encoded_image: str) -> Tuple[PIL.Image.Image, str]:
+async def load_image_from_base64(encoded_image: str) -> Tuple[types.Part, str]:
     """Load an image from a base64-encoded string.
     
+    The payload is decoded in chunks straight from the data URL, rejecting
+    anything over MAX_INPUT_IMAGE_BYTES before decoding. The decoded bytes are
+    forwarded to Gemini without a PIL round trip unless the image needs
+    converting (see ``image_part_from_bytes``).
+
     Args:
         encoded_image: Base64 encoded image data with header
         
     Returns:
-        Tuple containing the PIL Image object and the image format
+        Tuple containing the request part for the image and the image format
     """
     if not encoded_image.startswith('data:image/'):
         raise ValueError("Invalid image format. Expected data:image/[format];base64,[data]")
     
-    try:
-        # Extract the base64 data from the data URL
-        image_format, image_data = encoded_image.split(';base64,')
-        image_format = image_format.replace('data:', '')  # Get the MIME type e.g., "image/png"
-        image_bytes = base64.b64decode(image_data)
-        source_image = PIL.Image.open(BytesIO(image_bytes))
-        logger.info(f"Successfully loaded image with format: {image_format}")
-        return source_image, image_format
-    except ValueError as e:
-        logger.error(f"Error: Invalid image data format: {str(e)}")
+    # Locate the base64 data in the data URL without copying it
+    separator = encoded_image.find(';base64,', 0, 256)
+    if separator < 0:
+        logger.error("Error: Invalid image data format: missing ';base64,' separator")
         raise ValueError("Invalid image data format. Image must be in format 'data:image/[format];base64,[data]'")
+    image_format = encoded_image[len('data:'):separator]  # Get the MIME type e.g., "image/png"
+
+    try:
+        image_bytes = await asyncio.to_thread(
+            decode_base64_chunked, encoded_image, separator + len(';base64,')
+        )
     except base64.binascii.Error as e:
         logger.error(f"Error: Invalid base64 encoding: {str(e)}")
         raise ValueError("Invalid base64 encoding. Please provide a valid base64 encoded image.")
-    except PIL.UnidentifiedImageError:
-        logger.error("Error: Could not identify image format")
-        raise ValueError("Could not identify image format. Supported formats include PNG, JPEG, GIF, WebP.")
+    except ValueError as e:
+        logger.error(f"Error: {str(e)}")
+        raise
+    PAYLOAD_BYTES.observe(len(image_bytes), direction="source")
+
+    try:
+        source_image = await asyncio.to_thread(image_part_from_bytes, image_bytes)
+        logger.info(f"Successfully loaded image with format: {image_format}")
+        return source_image, image_format
+    except ValueError as e:
+        logger.error(f"Error: {str(e)}")
+        raise
     except Exception as e:
         logger.error(f"Error: Could not load image: {str(e)}")
         raise
 
 
+def _check_output_format(output_format: Optional[str]) -> str:
+    """Resolve and validate an output format before any work is done."""
+    output_format = (output_format or OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}. Use one of {', '.join(OUTPUT_FORMATS)}")
+    return output_format
+
+
+async def postprocess_image(
+    image: MCPImage,
+    output_format: Optional[str] = None,
+    quality: Optional[int] = None,
+    max_size: Optional[int] = None,
+    thumbnail_only: bool = False,
+) -> MCPImage:
+    """Apply output format and size settings to a generated image.
+
+    Arguments left as None fall back to the OUTPUT_* server defaults. If
+    nothing needs to change, the image is returned as-is.
+
+    Args:
+        image: Image returned by Gemini
+        output_format: "original", "png", "jpeg", "webp" or "avif"
+        quality: Encoder quality (1-100) for lossy formats
+        max_size: Maximum length of the longest edge in pixels; 0 for no limit
+        thumbnail_only: If True, return a small preview (OUTPUT_THUMBNAIL_EDGE)
+
+    Returns:
+        FastMCP Image in the requested format and size
+    """
+    output_format = _check_output_format(output_format)
+    fmt = None if output_format == "original" else output_format
+    max_edge = OUTPUT_THUMBNAIL_EDGE if thumbnail_only else (OUTPUT_MAX_EDGE if max_size is None else max_size)
+    if fmt is None and not max_edge:
+        return image
+
+    args = (image.data, fmt, quality or OUTPUT_QUALITY, max_edge)
+    if OUTPUT_TRANSCODE_WORKERS > 0:
+        pool = _get_transcode_pool()
+        try:
+            data, fmt = await asyncio.get_running_loop().run_in_executor(pool, transcode_image, *args)
+        except BrokenProcessPool:
+            # A worker died; start a new pool for the next request
+            logger.error("Transcoding worker exited unexpectedly, restarting the pool")
+            if _transcode_pool is pool:
+                shutdown_transcode_pool()
+            raise
+    else:
+        data, fmt = await asyncio.to_thread(transcode_image, *args)
+
+    logger.info(f"Post-processed output image as {fmt} (max edge {max_edge or 'unchanged'}): "
+                f"{len(image.data)} -> {len(data)} bytes")
+    return MCPImage(data=data, format=fmt)
+
+
+def _check_response_mode(response_mode: Optional[str]) -> str:
+    """Resolve and validate a response mode before any work is done."""
+    response_mode = (response_mode or RESPONSE_MODE).lower()
+    if response_mode not in RESPONSE_MODES:
+        raise ValueError(f"Unsupported response mode: {response_mode}. Use one of {', '.join(RESPONSE_MODES)}")
+    return response_mode
+
+
+async def deliver_image(
+    image: MCPImage,
+    response_mode: Optional[str] = None,
+) -> Union[MCPImage, mcp_types.ResourceLink, str]:
+    """Return an image inline, or store it and return a reference to it.
+
+    Args:
+        image: Final image to return to the client
+        response_mode: "inline", "resource" or "path"; defaults to RESPONSE_MODE
+
+    Returns:
+        The image itself, a resource link to the stored image, or its file path
+    """
+    response_mode = _check_response_mode(response_mode)
+    PAYLOAD_BYTES.observe(len(image.data), direction="response")
+    if response_mode == "inline":
+        return image
+
+    fmt = getattr(image, "_format", None) or "png"
+    image_path = await asyncio.to_thread(store_image, image.data, fmt)
+    if response_mode == "path":
+        return image_path
+
+    name = os.path.basename(image_path)
+    return mcp_types.ResourceLink.model_validate({
+        "type": "resource_link",
+        "uri": f"{STORED_IMAGE_URI_PREFIX}{name}",
+        "name": name,
+        "mimeType": image._mime_type,
+        "size": len(image.data),
+        "description": f"Generated image, also served over HTTP at /images/{name}",
+    })
+
+
+def _load_image_file(image_file_path: str) -> types.Part:
+    """Read an image file and build its request part."""
+    size = os.path.getsize(image_file_path)
+    if size > MAX_INPUT_IMAGE_BYTES:
+        raise ValueError(f"Image is too large: {size} bytes (maximum is {MAX_INPUT_IMAGE_BYTES} bytes)")
+    PAYLOAD_BYTES.observe(size, direction="source")
+    with open(image_file_path, "rb") as f:
+        return image_part_from_bytes(f.read())
+
+
 # ==================== MCP Tools ====================
 
 @mcp.tool
-async def generate_image_from_text(prompt: str) -> MCPImage:
+@instrument_tool
+async def generate_image_from_text(
+    prompt: str,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    output_format: Optional[str] = None,
+    output_quality: Optional[int] = None,
+    max_size: Optional[int] = None,
+    thumbnail_only: bool = False,
+    response_mode: Optional[str] = None,
+    translation_mode: Optional[str] = None,
+    variant_count: int = 1,
+    prompt_style: Optional[str] = None,
+    ctx: Optional[Context] = None,
+) -> Union[MCPImage, mcp_types.ResourceLink, str, List[Union[MCPImage, mcp_types.ResourceLink, str]]]:
     """Generate an image based on the given text prompt using Google's Gemini model.
 
     Args:
         prompt: User's text prompt describing the desired image to generate
+        use_cache: Set to False to bypass the server's result cache
+        refresh_cache: Set to True to regenerate and replace a cached result
+        output_format: Format of the returned image: original, png, jpeg, webp or avif
+        output_quality: Quality (1-100) for jpeg, webp and avif output
+        max_size: Maximum width/height of the returned image in pixels (0 for no limit)
+        thumbnail_only: Set to True to return only a small preview image
+        response_mode: "inline" to return the image itself, "resource" for a resource
+                       link or "path" for the file path of the stored image
+        translation_mode: "translate" to translate non-English prompts to English first,
+                          or "single_shot" to send them as-is in one request
+        variant_count: Number of alternative images to generate for the prompt
+                       (1 to MAX_VARIANTS); use this instead of calling the tool repeatedly
+        prompt_style: "full" for the detailed prompt instructions or "compact" for a
+                      shorter prompt (fewer input tokens, faster first byte)
         
     Returns:
-        FastMCP Image containing the generated image (no file saved)
+        FastMCP Image containing the generated image, or a reference to it;
+        a list of them when variant_count is more than 1
     """
     try:
-        # Translate the prompt to English
-        translated_prompt = await translate_prompt(prompt)
+        _check_output_format(output_format)
+        _check_response_mode(response_mode)
+        translation_mode = _check_translation_mode(translation_mode)
+        prompt_style = _check_prompt_style(prompt_style)
+        if not 1 <= variant_count <= MAX_VARIANTS:
+            raise ValueError(f"variant_count must be between 1 and {MAX_VARIANTS}")
+        progress = ProgressReporter(ctx)
+
+        # Translate the prompt to English (unless in single-shot mode)
+        await progress.stage("translating")
+        with stage("translate"):
+            translated_prompt, multilingual = await prepare_prompt(prompt, translation_mode)
         
         # Create detailed generation prompt
-        contents = get_image_generation_prompt(translated_prompt)
+        contents, system_instruction = build_image_prompt("generation", translated_prompt, multilingual, prompt_style)
         
-        # Process with Gemini and return the result
-        return await process_image_with_gemini([contents], prompt)
+        # Process with Gemini; variants share the translated prompt
+        images = await process_image_variants(
+            [contents],
+            prompt,
+            variant_count,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            progress=progress,
+            system_instruction=system_instruction,
+        )
+
+        async def finish(image: MCPImage) -> Union[MCPImage, mcp_types.ResourceLink, str]:
+            image = await postprocess_image(image, output_format, output_quality, max_size, thumbnail_only)
+            return await deliver_image(image, response_mode)
+
+        with stage("encode"):
+            results = await asyncio.gather(*(finish(image) for image in images))
+        return results[0] if variant_count == 1 else results
         
     except Exception as e:
         error_msg = f"Error generating image: {str(e)}"
@@ -318,7 +1245,21 @@ async def generate_image_from_text(prompt: str) -> MCPImage:
 
 
 @mcp.tool
-async def transform_image_from_encoded(encoded_image: str, prompt: str) -> MCPImage:
+@instrument_tool
+async def transform_image_from_encoded(
+    encoded_image: str,
+    prompt: str,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    output_format: Optional[str] = None,
+    output_quality: Optional[int] = None,
+    max_size: Optional[int] = None,
+    thumbnail_only: bool = False,
+    response_mode: Optional[str] = None,
+    translation_mode: Optional[str] = None,
+    prompt_style: Optional[str] = None,
+    ctx: Optional[Context] = None,
+) -> Union[MCPImage, mcp_types.ResourceLink, str]:
     """Transform an existing image based on the given text prompt using Google's Gemini model.
 
     Args:
@@ -326,24 +1267,55 @@ async def transform_image_from_encoded(encoded_image: str, prompt: str) -> MCPIm
                     "data:image/[format];base64,[data]"
                     Where [format] can be: png, jpeg, jpg, gif, webp, etc.
         prompt: Text prompt describing the desired transformation or modifications
+        use_cache: Set to False to bypass the server's result cache
+        refresh_cache: Set to True to regenerate and replace a cached result
+        output_format: Format of the returned image: original, png, jpeg, webp or avif
+        output_quality: Quality (1-100) for jpeg, webp and avif output
+        max_size: Maximum width/height of the returned image in pixels (0 for no limit)
+        thumbnail_only: Set to True to return only a small preview image
+        response_mode: "inline" to return the image itself, "resource" for a resource
+                       link or "path" for the file path of the stored image
+        translation_mode: "translate" to translate non-English prompts to English first,
+                          or "single_shot" to send them as-is in one request
+        prompt_style: "full" for the detailed prompt instructions or "compact" for a
+                      shorter prompt (fewer input tokens, faster first byte)
         
     Returns:
-        FastMCP Image containing the transformed image
+        FastMCP Image containing the transformed image, or a reference to it
     """
     try:
         logger.info(f"Processing transform_image_from_encoded request with prompt: {prompt}")
+        current_lane.set("interactive")
+        _check_output_format(output_format)
+        _check_response_mode(response_mode)
+        translation_mode = _check_translation_mode(translation_mode)
+        prompt_style = _check_prompt_style(prompt_style)
+
+        progress = ProgressReporter(ctx)
 
         # Load and validate the image
-        source_image, _ = await load_image_from_base64(encoded_image)
+        with stage("decode"):
+            source_image, _ = await load_image_from_base64(encoded_image)
         
-        # Translate the prompt to English
-        translated_prompt = await translate_prompt(prompt)
+        # Translate the prompt to English (unless in single-shot mode)
+        await progress.stage("translating")
+        with stage("translate"):
+            translated_prompt, multilingual = await prepare_prompt(prompt, translation_mode)
 
-        # Create detailed generation prompt
-        contents = get_image_transformation_prompt(translated_prompt)
-        
         # Process the transformation
-        return await process_image_transform(source_image, contents, prompt)
+        image = await process_image_transform(
+            source_image,
+            translated_prompt,
+            prompt,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            progress=progress,
+            multilingual=multilingual,
+            prompt_style=prompt_style,
+        )
+        with stage("encode"):
+            image = await postprocess_image(image, output_format, output_quality, max_size, thumbnail_only)
+            return await deliver_image(image, response_mode)
         
     except Exception as e:
         error_msg = f"Error transforming image: {str(e)}"
@@ -352,40 +1324,88 @@ async def transform_image_from_encoded(encoded_image: str, prompt: str) -> MCPIm
 
 
 @mcp.tool
-async def transform_image_from_file(image_file_path: str, prompt: str) -> MCPImage:
+@instrument_tool
+async def transform_image_from_file(
+    image_file_path: str,
+    prompt: str,
+    use_cache: bool = True,
+    refresh_cache: bool = False,
+    output_format: Optional[str] = None,
+    output_quality: Optional[int] = None,
+    max_size: Optional[int] = None,
+    thumbnail_only: bool = False,
+    response_mode: Optional[str] = None,
+    translation_mode: Optional[str] = None,
+    prompt_style: Optional[str] = None,
+    ctx: Optional[Context] = None,
+) -> Union[MCPImage, mcp_types.ResourceLink, str]:
     """Transform an existing image file based on the given text prompt using Google's Gemini model.
 
     Args:
         image_file_path: Path to the image file to be transformed
         prompt: Text prompt describing the desired transformation or modifications
+        use_cache: Set to False to bypass the server's result cache
+        refresh_cache: Set to True to regenerate and replace a cached result
+        output_format: Format of the returned image: original, png, jpeg, webp or avif
+        output_quality: Quality (1-100) for jpeg, webp and avif output
+        max_size: Maximum width/height of the returned image in pixels (0 for no limit)
+        thumbnail_only: Set to True to return only a small preview image
+        response_mode: "inline" to return the image itself, "resource" for a resource
+                       link or "path" for the file path of the stored image
+        translation_mode: "translate" to translate non-English prompts to English first,
+                          or "single_shot" to send them as-is in one request
+        prompt_style: "full" for the detailed prompt instructions or "compact" for a
+                      shorter prompt (fewer input tokens, faster first byte)
         
     Returns:
-        FastMCP Image containing the transformed image
+        FastMCP Image containing the transformed image, or a reference to it
     """
     try:
         logger.info(f"Processing transform_image_from_file request with prompt: {prompt}")
+        current_lane.set("interactive")
         logger.info(f"Image file path: {image_file_path}")
+        _check_output_format(output_format)
+        _check_response_mode(response_mode)
+        translation_mode = _check_translation_mode(translation_mode)
+        prompt_style = _check_prompt_style(prompt_style)
 
         # Validate file path
         if not os.path.exists(image_file_path):
             raise ValueError(f"Image file not found: {image_file_path}")
 
-        # Translate the prompt to English
-        translated_prompt = await translate_prompt(prompt)
+        progress = ProgressReporter(ctx)
+
+        # Translate the prompt to English (unless in single-shot mode)
+        await progress.stage("translating")
+        with stage("translate"):
+            translated_prompt, multilingual = await prepare_prompt(prompt, translation_mode)
             
-        # Load the source image directly using PIL
+        # Read the raw file bytes; they are forwarded without decoding when possible
         try:
-            source_image = PIL.Image.open(image_file_path)
+            with stage("decode"):
+                source_image = await asyncio.to_thread(_load_image_file, image_file_path)
             logger.info(f"Successfully loaded image from file: {image_file_path}")
-        except PIL.UnidentifiedImageError:
-            logger.error("Error: Could not identify image format")
-            raise ValueError("Could not identify image format. Supported formats include PNG, JPEG, GIF, WebP.")
+        except ValueError as e:
+            logger.error(f"Error: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Error: Could not load image: {str(e)}")
             raise 
         
         # Process the transformation
-        return await process_image_transform(source_image, translated_prompt, prompt)
+        image = await process_image_transform(
+            source_image,
+            translated_prompt,
+            prompt,
+            use_cache=use_cache,
+            refresh_cache=refresh_cache,
+            progress=progress,
+            multilingual=multilingual,
+            prompt_style=prompt_style,
+        )
+        with stage("encode"):
+            image = await postprocess_image(image, output_format, output_quality, max_size, thumbnail_only)
+            return await deliver_image(image, response_mode)
         
     except Exception as e:
         error_msg = f"Error transforming image: {str(e)}"
@@ -393,10 +1413,782 @@ async def transform_image_from_file(image_file_path: str, prompt: str) -> MCPIma
         raise
 
 
+@mcp.tool
+@instrument_tool
+async def generate_images_batch(
+    prompts: List[str],
+    variants: Optional[List[Optional[str]]] = None,
+    translation_mode: Optional[str] = None,
+) -> List[Union[str, MCPImage, mcp_types.ResourceLink]]:
+    """Generate one image per prompt in a single call using Google's Gemini model.
+
+    Prompts are translated together in one request and the images are generated
+    in parallel. A failure for one prompt is reported in place and does not
+    fail the rest of the batch.
+
+    Args:
+        prompts: List of text prompts, one per image to generate
+        variants: Optional per-prompt variation (e.g. a style or mood) appended to
+                  the matching prompt. Must be the same length as prompts if given.
+        translation_mode: "translate" to translate non-English prompts to English first,
+                          or "single_shot" to send them as-is with each image request
+        
+    Returns:
+        For each prompt in order, a "[n] ..." label followed by its image, or a
+        "[n] Error: ..." message if that item failed
+    """
+    if not prompts:
+        raise ValueError("At least one prompt is required")
+    if len(prompts) > BATCH_MAX_ITEMS:
+        raise ValueError(f"Too many prompts: {len(prompts)} (maximum is {BATCH_MAX_ITEMS})")
+    if variants is not None and len(variants) != len(prompts):
+        raise ValueError("variants must have the same length as prompts")
+    translation_mode = _check_translation_mode(translation_mode)
+
+    logger.info(f"Processing generate_images_batch request with {len(prompts)} prompts")
+    current_lane.set("batch")
+
+    requests = [
+        f"{prompt}, {variant}" if variant else prompt
+        for prompt, variant in zip(prompts, variants or [None] * len(prompts))
+    ]
+    if translation_mode == "single_shot":
+        translated_prompts = requests
+    else:
+        with stage("translate"):
+            translated_prompts = await translate_prompts(requests)
+    semaphore = asyncio.Semaphore(BATCH_MAX_PARALLEL)
+
+    async def generate(request: str, translated_prompt: str) -> Union[MCPImage, mcp_types.ResourceLink, str]:
+        async with semaphore:
+            multilingual = translation_mode == "single_shot" and not is_english_text(request)
+            contents, system_instruction = build_image_prompt("generation", translated_prompt, multilingual)
+            image = await process_image_with_gemini([contents], request, system_instruction=system_instruction)
+            with stage("encode"):
+                return await deliver_image(await postprocess_image(image))
+
+    results = await asyncio.gather(
+        *(generate(r, t) for r, t in zip(requests, translated_prompts)),
+        return_exceptions=True,
+    )
+
+    output: List[Union[str, MCPImage, mcp_types.ResourceLink]] = []
+    for i, (request, result) in enumerate(zip(requests, results), start=1):
+        if isinstance(result, BaseException):
+            logger.error(f"Error generating batch item {i}: {str(result)}")
+            output.append(f"[{i}] Error: {str(result)}")
+        else:
+            output.append(f"[{i}] {request}")
+            output.append(result)
+    return output
+
+
+# ==================== Background Jobs ====================
+
+async def _run_image_job(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Job handler: generate or transform an image and store the result."""
+    current_lane.set("batch")
+    translated_prompt, multilingual = await prepare_prompt(params["prompt"], params["translation_mode"])
+
+    if params.get("source_image"):
+        source_path = stored_image_path(params["source_image"], JOB_IMAGE_PATH)
+
+        def read_source() -> bytes:
+            with open(source_path, "rb") as f:
+                return f.read()
+
+        # The stored source was already prepared for upload at submit time
+        source_image = types.Part.from_bytes(data=await asyncio.to_thread(read_source), mime_type=params["source_mime_type"])
+        image = await process_image_transform(
+            source_image,
+            translated_prompt,
+            params["prompt"],
+            use_cache=params["use_cache"],
+            multilingual=multilingual,
+        )
+    else:
+        contents, system_instruction = build_image_prompt("generation", translated_prompt, multilingual)
+        image = await process_image_with_gemini(
+            [contents], params["prompt"], use_cache=params["use_cache"], system_instruction=system_instruction
+        )
+
+    image = await postprocess_image(
+        image, params["output_format"], params["output_quality"], params["max_size"], params["thumbnail_only"]
+    )
+    fmt = getattr(image, "_format", None) or "png"
+    image_path = await asyncio.to_thread(store_image, image.data, fmt, JOB_IMAGE_PATH)
+    return {"image": os.path.basename(image_path), "format": fmt, "size": len(image.data)}
+
+
+def _remove_image_job_files(jobs: List[Dict[str, Any]]) -> None:
+    """Job cleanup: delete the result and source images of expired image jobs.
+
+    Job images live in JOB_IMAGE_PATH, away from the images other tools
+    return. They are named by content, so files another live job still
+    refers to are kept.
+    """
+    def files(job: Dict[str, Any]) -> Set[str]:
+        names = {job["params"].get("source_image"), (job.get("result") or {}).get("image")}
+        return {name for name in names if name}
+
+    expired = set().union(*(files(job) for job in jobs))
+    if not expired:
+        return
+    live = set().union(*(files(job) for job in job_queue.store.with_status(*JOB_STATUSES)))
+    for name in expired - live:
+        try:
+            os.remove(stored_image_path(name, JOB_IMAGE_PATH))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Could not remove expired job image {name}: {str(e)}")
+
+
+job_queue.register("image", _run_image_job, cleanup=_remove_image_job_files)
+
+
+def _job_summary(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Job fields reported to clients."""
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "queue_position": job.get("queue_position"),
+        "created_at": job["created_at"],
+        "started_at": job["started_at"],
+        "finished_at": job["finished_at"],
+        "expires_at": job["expires_at"],
+        "error": job["error"],
+    }
+
+
+@mcp.tool
+@instrument_tool
+async def submit_image_job(
+    prompt: str,
+    encoded_image: Optional[str] = None,
+    image_file_path: Optional[str] = None,
+    use_cache: bool = True,
+    output_format: Optional[str] = None,
+    output_quality: Optional[int] = None,
+    max_size: Optional[int] = None,
+    thumbnail_only: bool = False,
+    translation_mode: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Queue an image generation or transformation to run in the background.
+
+    Returns immediately with a job id. Poll get_job_status until the status is
+    "succeeded" or "failed", then call get_job_result to fetch the image.
+    Give encoded_image or image_file_path to transform that image; otherwise
+    a new image is generated from the prompt.
+
+    Args:
+        prompt: Text prompt describing the image to generate or the transformation
+        encoded_image: Optional source image as "data:image/[format];base64,[data]"
+        image_file_path: Optional path to a source image file
+        use_cache: Set to False to bypass the server's result cache
+        output_format: Format of the result image: original, png, jpeg, webp or avif
+        output_quality: Quality (1-100) for jpeg, webp and avif output
+        max_size: Maximum width/height of the result image in pixels (0 for no limit)
+        thumbnail_only: Set to True to keep only a small preview image
+        translation_mode: "translate" or "single_shot" (see generate_image_from_text)
+
+    Returns:
+        The job id, its status and its position in the queue
+    """
+    try:
+        logger.info(f"Processing submit_image_job request with prompt: {prompt}")
+        if encoded_image and image_file_path:
+            raise ValueError("Give either encoded_image or image_file_path, not both")
+        _check_output_format(output_format)
+        translation_mode = _check_translation_mode(translation_mode)
+
+        params: Dict[str, Any] = {
+            "prompt": prompt,
+            "use_cache": use_cache,
+            "output_format": output_format,
+            "output_quality": output_quality,
+            "max_size": max_size,
+            "thumbnail_only": thumbnail_only,
+            "translation_mode": translation_mode,
+        }
+
+        # Validate and prepare the source image now, so bad input fails fast,
+        # and keep it in the image store so the job survives a restart
+        source_image = None
+        if encoded_image:
+            with stage("decode"):
+                source_image, _ = await load_image_from_base64(encoded_image)
+        elif image_file_path:
+            if not os.path.exists(image_file_path):
+                raise ValueError(f"Image file not found: {image_file_path}")
+            with stage("decode"):
+                source_image = await asyncio.to_thread(_load_image_file, image_file_path)
+        if source_image is not None:
+            mime_type = source_image.inline_data.mime_type
+            source_path = await asyncio.to_thread(
+                store_image, source_image.inline_data.data, mime_type.split("/")[-1], JOB_IMAGE_PATH
+            )
+            params["source_image"] = os.path.basename(source_path)
+            params["source_mime_type"] = mime_type
+
+        job = await job_queue.submit("image", params)
+        return _job_summary(await job_queue.get(job["id"]))
+
+    except Exception as e:
+        logger.error(f"Error submitting image job: {str(e)}")
+        raise
+
+
+@mcp.tool
+@instrument_tool
+async def get_job_status(job_id: str) -> Dict[str, Any]:
+    """Report the status of a job queued with submit_image_job.
+
+    Args:
+        job_id: Id returned by submit_image_job
+
+    Returns:
+        The job status ("queued", "running", "succeeded" or "failed"), its queue
+        position while queued, timestamps, and the error message if it failed
+    """
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise ValueError(f"Unknown or expired job: {job_id}")
+    return _job_summary(job)
+
+
+@mcp.tool
+@instrument_tool
+async def get_job_result(
+    job_id: str,
+    response_mode: Optional[str] = None,
+) -> Union[MCPImage, mcp_types.ResourceLink, str]:
+    """Fetch the image produced by a finished job.
+
+    Args:
+        job_id: Id returned by submit_image_job
+        response_mode: "inline" to return the image itself, "resource" for a resource
+                       link or "path" for the file path of the stored image
+
+    Returns:
+        FastMCP Image containing the result, or a reference to it
+    """
+    _check_response_mode(response_mode)
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise ValueError(f"Unknown or expired job: {job_id}")
+    if job["status"] == "failed":
+        raise ValueError(f"Job {job_id} failed: {job['error']}")
+    if job["status"] != "succeeded":
+        raise ValueError(f"Job {job_id} is not finished yet (status: {job['status']})")
+
+    image_path = stored_image_path(job["result"]["image"], JOB_IMAGE_PATH)
+
+    def read() -> bytes:
+        with open(image_path, "rb") as f:
+            return f.read()
+
+    image = MCPImage(data=await asyncio.to_thread(read), format=job["result"]["format"])
+    with stage("encode"):
+        return await deliver_image(image, response_mode)
+
+
+# ==================== Edit Sessions ====================
+
+# Files API uploads in progress, by session id (holds the task references)
+_session_uploads: Dict[str, asyncio.Task] = {}
+# Sessions with an edit in progress; concurrent edits to one session are refused
+_busy_sessions: set = set()
+
+
+def _session_summary(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Session fields reported to clients."""
+    return {
+        "session_id": session["id"],
+        "turns": session["turns"],
+        "mime_type": session["mime_type"],
+        "image_bytes": len(session["image"]),
+        "expires_at": session["expires_at"],
+    }
+
+
+async def _upload_session_image(session_id: str, version: int) -> None:
+    """Upload a session's current image to the Files API and record its URI."""
+    session = await asyncio.to_thread(edit_sessions.get, session_id)
+    if session is None or session["version"] != version:
+        return
+    try:
+        with stage("upload"):
+            uploaded = await get_client().aio.files.upload(
+                file=io.BytesIO(session["image"]),
+                config=types.UploadFileConfig(mime_type=session["mime_type"]),
+            )
+    except Exception as e:
+        logger.warning(f"Could not upload the image of edit session {session_id}, sending it inline: {str(e)}")
+        return
+    # The session may have moved on to a newer image in the meantime
+    session = await asyncio.to_thread(edit_sessions.get, session_id)
+    if session is not None and session["version"] == version:
+        await asyncio.to_thread(edit_sessions.put, {**session, "file_uri": uploaded.uri})
+        logger.info(f"Uploaded the image of edit session {session_id} as {uploaded.uri}")
+
+
+def _schedule_session_upload(session: Dict[str, Any]) -> None:
+    """Start uploading a session's current image in the background, if enabled."""
+    # Files belong to the project of the key that uploaded them; with several
+    # keys the backend pool may send the next edit through another project
+    if not EDIT_SESSION_FILES_API or len(get_api_keys()) != 1:
+        return
+    session_id = session["id"]
+    task = asyncio.create_task(_upload_session_image(session_id, session["version"]))
+    _session_uploads[session_id] = task
+    task.add_done_callback(lambda t: _session_uploads.pop(session_id, None) if _session_uploads.get(session_id) is t else None)
+
+
+async def _edit_session_image(
+    session: Dict[str, Any],
+    edit_prompt: str,
+    original_prompt: str,
+    use_cache: bool,
+    progress: ProgressReporter,
+    multilingual: bool,
+    prompt_style: Optional[str],
+) -> MCPImage:
+    """Apply one edit to a session's current image, referring to the uploaded copy if there is one."""
+    inline = types.Part.from_bytes(data=session["image"], mime_type=session["mime_type"])
+    if session["file_uri"]:
+        try:
+            return await process_image_transform(
+                types.Part.from_uri(file_uri=session["file_uri"], mime_type=session["mime_type"]),
+                edit_prompt,
+                original_prompt,
+                use_cache=use_cache,
+                progress=progress,
+                multilingual=multilingual,
+                prompt_style=prompt_style,
+            )
+        except errors.ClientError as e:
+            # e.g. the uploaded file expired; the bytes are still here
+            logger.warning(f"Edit with uploaded file {session['file_uri']} failed, retrying inline: {str(e)}")
+    return await process_image_transform(
+        inline,
+        edit_prompt,
+        original_prompt,
+        use_cache=use_cache,
+        progress=progress,
+        multilingual=multilingual,
+        prompt_style=prompt_style,
+    )
+
+
+@mcp.tool
+@instrument_tool
+async def start_edit_session(
+    encoded_image: Optional[str] = None,
+    image_file_path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Start a multi-turn editing session on an image.
+
+    The image is decoded and prepared once and kept on the server. Call
+    edit_in_session with the returned session id for each edit; every edit
+    applies to the result of the previous one, so the image never has to be
+    sent again. Call end_edit_session when done; idle sessions also expire.
+
+    Args:
+        encoded_image: Image as "data:image/[format];base64,[data]"
+        image_file_path: Path to an image file (give this or encoded_image)
+
+    Returns:
+        The session id, the number of edits so far, the size and type of the
+        stored image, and when the session expires if left idle
+    """
+    try:
+        logger.info("Processing start_edit_session request")
+        if bool(encoded_image) == bool(image_file_path):
+            raise ValueError("Give either encoded_image or image_file_path")
+
+        if encoded_image:
+            with stage("decode"):
+                source_image, _ = await load_image_from_base64(encoded_image)
+        else:
+            if not os.path.exists(image_file_path):
+                raise ValueError(f"Image file not found: {image_file_path}")
+            with stage("decode"):
+                source_image = await asyncio.to_thread(_load_image_file, image_file_path)
+        data = source_image.inline_data.data
+        if len(data) > EDIT_SESSION_MAX_BYTES:
+            raise ValueError(f"Image is too large for an edit session: {len(data)} bytes "
+                             f"(maximum is {EDIT_SESSION_MAX_BYTES} bytes)")
+
+        session = await asyncio.to_thread(edit_sessions.create, data, source_image.inline_data.mime_type)
+        _schedule_session_upload(session)
+        logger.info(f"Started edit session {session['id']} ({len(data)} bytes)")
+        return _session_summary(session)
+
+    except Exception as e:
+        logger.error(f"Error starting edit session: {str(e)}")
+        raise
+
+
+@mcp.tool
+@instrument_tool
+async def edit_in_session(
+    session_id: str,
+    prompt: str,
+    use_cache: bool = True,
+    output_format: Optional[str] = None,
+    output_quality: Optional[int] = None,
+    max_size: Optional[int] = None,
+    thumbnail_only: bool = False,
+    response_mode: Optional[str] = None,
+    translation_mode: Optional[str] = None,
+    prompt_style: Optional[str] = None,
+    ctx: Optional[Context] = None,
+) -> Union[MCPImage, mcp_types.ResourceLink, str]:
+    """Apply an edit to the current image of an edit session.
+
+    The edit applies to the result of the previous edit (or to the starting
+    image), and the earlier instructions are passed along so they are kept.
+    The output settings only affect the returned image; the session keeps the
+    full-quality result for the next edit.
+
+    Args:
+        session_id: Id returned by start_edit_session
+        prompt: Text describing the change to make
+        use_cache: Set to False to bypass the server's result cache
+        output_format: Format of the returned image: original, png, jpeg, webp or avif
+        output_quality: Quality (1-100) for jpeg, webp and avif output
+        max_size: Maximum width/height of the returned image in pixels (0 for no limit)
+        thumbnail_only: Set to True to return only a small preview image
+        response_mode: "inline" to return the image itself, "resource" for a resource
+                       link or "path" for the file path of the stored image
+        translation_mode: "translate" or "single_shot" (see transform_image_from_encoded)
+        prompt_style: "full" or "compact" prompt template (see transform_image_from_encoded)
+
+    Returns:
+        FastMCP Image containing the edited image, or a reference to it
+    """
+    try:
+        logger.info(f"Processing edit_in_session request for {session_id} with prompt: {prompt}")
+        current_lane.set("interactive")
+        _check_output_format(output_format)
+        _check_response_mode(response_mode)
+        translation_mode = _check_translation_mode(translation_mode)
+        prompt_style = _check_prompt_style(prompt_style)
+        if session_id in _busy_sessions:
+            raise ValueError(f"Edit session {session_id} is busy with another edit; wait for it to finish")
+
+        _busy_sessions.add(session_id)
+        try:
+            session = await asyncio.to_thread(edit_sessions.get, session_id)
+            if session is None:
+                raise ValueError(f"Unknown or expired edit session: {session_id}")
+            progress = ProgressReporter(ctx)
+
+            # Translate the prompt to English (unless in single-shot mode)
+            await progress.stage("translating")
+            with stage("translate"):
+                translated_prompt, multilingual = await prepare_prompt(prompt, translation_mode)
+
+            image = await _edit_session_image(
+                session,
+                get_session_edit_prompt(translated_prompt, session["history"]),
+                prompt,
+                use_cache,
+                progress,
+                multilingual,
+                prompt_style,
+            )
+
+            # The result, prepared for upload, is the source of the next edit
+            with stage("decode"):
+                next_image = await asyncio.to_thread(image_part_from_bytes, image.data)
+            history = session["history"] + [translated_prompt]
+            session = await asyncio.to_thread(edit_sessions.put, {
+                **session,
+                "image": next_image.inline_data.data,
+                "mime_type": next_image.inline_data.mime_type,
+                "version": session["version"] + 1,
+                "turns": session["turns"] + 1,
+                "file_uri": None,
+                "history": history[-EDIT_SESSION_HISTORY:] if EDIT_SESSION_HISTORY > 0 else [],
+                "updated_at": time.time(),
+            })
+            _schedule_session_upload(session)
+        finally:
+            _busy_sessions.discard(session_id)
+
+        with stage("encode"):
+            image = await postprocess_image(image, output_format, output_quality, max_size, thumbnail_only)
+            return await deliver_image(image, response_mode)
+
+    except Exception as e:
+        logger.error(f"Error editing in session: {str(e)}")
+        raise
+
+
+@mcp.tool
+@instrument_tool
+async def end_edit_session(session_id: str) -> Dict[str, Any]:
+    """End an edit session and free the image it holds on the server.
+
+    Args:
+        session_id: Id returned by start_edit_session
+
+    Returns:
+        The session id and the number of edits made in it
+    """
+    session = await asyncio.to_thread(edit_sessions.get, session_id)
+    if session is None:
+        raise ValueError(f"Unknown or expired edit session: {session_id}")
+    upload = _session_uploads.pop(session_id, None)
+    if upload is not None:
+        upload.cancel()
+    await asyncio.to_thread(edit_sessions.delete, session_id)
+    logger.info(f"Ended edit session {session_id} after {session['turns']} edits")
+    return {"session_id": session_id, "turns": session["turns"]}
+
+
+# ==================== Stored Images ====================
+
+@mcp.resource(f"{STORED_IMAGE_URI_PREFIX}{{name}}", mime_type="application/octet-stream")
+async def read_stored_image(name: str) -> ResourceResult:
+    """Read an image saved by a tool call with response_mode "resource" or "path".
+
+    The content is labelled with the image's own MIME type, read from its
+    header bytes.
+
+    Args:
+        name: Stored image file name ("<sha256>.<format>")
+    """
+    image_path = stored_image_path(name)
+
+    def read() -> bytes:
+        with open(image_path, "rb") as f:
+            return f.read()
+
+    data = await asyncio.to_thread(read)
+    try:
+        mime_type, _ = sniff_image(data)
+    except ValueError:
+        mime_type = "application/octet-stream"
+    return ResourceResult([ResourceContent(data, mime_type=mime_type)])
+
+
+@mcp.custom_route("/images/{name}", methods=["GET", "HEAD"])
+async def serve_stored_image(request: Request) -> Response:
+    """Serve stored images over HTTP, including Range requests."""
+    try:
+        image_path = stored_image_path(request.path_params["name"])
+    except ValueError:
+        return Response(status_code=404)
+    if not os.path.exists(image_path):
+        return Response(status_code=404)
+    return FileResponse(image_path, headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+
+# ==================== Metrics ====================
+
+_cache_requests = counter("cache_requests", "Cache lookups by cache and result", ("cache", "result"))
+_cache_entries = gauge("cache_entries", "Entries currently held per cache", ("cache",))
+_coalesced_in_flight = gauge("coalesced_requests_in_flight", "Distinct image requests being generated")
+_source_bytes = counter("source_image_bytes", "Source image bytes before and after upload preparation", ("stage",))
+_quota_depth = gauge("quota_queue_depth", "Requests waiting for client-side quota", ("backend",))
+_quota_requests = counter("quota_requests", "Quota scheduler decisions by backend and result", ("backend", "result"))
+_quota_wait = counter("quota_wait_seconds", "Total time requests waited for quota", ("backend",))
+_quota_wait_p95 = gauge("quota_wait_p95_seconds", "p95 of recent quota queue waits", ("backend",))
+_backend_outstanding = gauge("backend_requests_in_flight", "Requests in flight per key/model backend", ("backend",))
+_backend_available = gauge("backend_available", "1 if the backend is in rotation, 0 if evicted", ("backend",))
+_jobs = gauge("jobs", "Background jobs queued or running in this process", ("status",))
+_jobs_finished = counter("jobs_finished", "Background jobs finished by this process", ("status",))
+_edit_sessions = gauge("edit_sessions", "Edit sessions held in memory")
+_edit_session_bytes = gauge("edit_session_image_bytes", "Image bytes held by edit sessions in memory")
+_edit_session_evictions = counter("edit_session_evictions", "Edit sessions evicted to stay within the limits")
+
+
+def _collect_metrics() -> None:
+    """Copy statistics kept by the caches, scheduler, pool, job queue and sessions into metrics."""
+    for name, cache in (("translation", translation_cache), ("result", result_cache)):
+        stats = cache.stats()
+        _cache_requests.set_total(stats["hits"], cache=name, result="hit")
+        _cache_requests.set_total(stats["misses"], cache=name, result="miss")
+        _cache_entries.set(stats["size"], cache=name)
+    _coalesced_in_flight.set(len(_image_requests))
+    _source_bytes.set_total(upload_stats["bytes_in"], stage="received")
+    _source_bytes.set_total(upload_stats["bytes_out"], stage="uploaded")
+    for name, stats in get_scheduler_stats().items():
+        _quota_depth.set(stats["depth"], backend=name)
+        _quota_requests.set_total(stats["admitted"], backend=name, result="admitted")
+        _quota_requests.set_total(stats["rejected"], backend=name, result="rejected")
+        _quota_wait.set_total(stats["wait_seconds_total"], backend=name)
+        _quota_wait_p95.set(stats["wait_seconds_p95"], backend=name)
+    try:
+        backends = get_backend_pool().stats()
+    except ValueError:
+        backends = []
+    for backend in backends:
+        _backend_outstanding.set(backend["outstanding"], backend=backend["backend"])
+        _backend_available.set(1 if backend["available"] else 0, backend=backend["backend"])
+    counts = job_queue.counts()
+    for status in ("queued", "running"):
+        _jobs.set(counts[status], status=status)
+    for status in ("succeeded", "failed"):
+        _jobs_finished.set_total(counts[status], status=status)
+    stats = edit_sessions.stats()
+    _edit_sessions.set(stats["sessions"])
+    _edit_session_bytes.set(stats["bytes"])
+    _edit_session_evictions.set_total(stats["evictions"])
+
+
+register_collector(_collect_metrics)
+
+
+if METRICS_ENABLED:
+    @mcp.custom_route("/metrics", methods=["GET"])
+    async def serve_metrics(request: Request) -> Response:
+        """Expose pipeline metrics in the Prometheus text format."""
+        return Response(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# ==================== Server Runtime ====================
+
+# Transport: "stdio", "sse" or "http" (streamable HTTP, served at /mcp). The
+# host, port and HTTP settings below do not apply to stdio.
+MCP_TRANSPORT = os.environ.get("MCP_TRANSPORT", "sse").lower()
+MCP_TRANSPORTS = ("stdio", "sse", "http", "streamable-http")
+MCP_HOST = os.environ.get("MCP_HOST", "0.0.0.0")
+MCP_PORT = int(os.environ.get("MCP_PORT", "9005"))
+
+# Serve streamable HTTP without server-side sessions, so any worker (or any
+# replica behind a load balancer) can answer any request. Always on when
+# SERVER_WORKERS > 1.
+MCP_STATELESS_HTTP = os.environ.get("MCP_STATELESS_HTTP", "false").lower() in ("1", "true", "yes")
+
+# Seconds an idle keep-alive connection stays open
+SERVER_KEEPALIVE_TIMEOUT = int(os.environ.get("SERVER_KEEPALIVE_TIMEOUT", "5"))
+
+# Largest accepted request body; the default fits a base64-encoded
+# MAX_INPUT_IMAGE_BYTES image plus the JSON-RPC envelope. 0 disables the limit.
+SERVER_MAX_REQUEST_BYTES = int(
+    os.environ.get("SERVER_MAX_REQUEST_BYTES") or MAX_INPUT_IMAGE_BYTES * 4 // 3 + 1024 * 1024
+)
+
+# On shutdown, seconds to wait for open requests and running background jobs
+# to finish before they are cancelled
+SERVER_SHUTDOWN_TIMEOUT = float(os.environ.get("SERVER_SHUTDOWN_TIMEOUT", "30"))
+
+# google-genai and Pillow are imported on first use so the server starts
+# quickly. Right after startup, "import" loads them and creates the Gemini
+# client for every API key in the background; "connect" also looks up
+# DEFAULT_GEMINI_IMAGE_MODEL with each client to open its first keep-alive
+# connection; "off" leaves everything to the first request.
+SERVER_WARMUP = os.environ.get("SERVER_WARMUP", "import").lower()
+SERVER_WARMUP_MODES = ("off", "import", "connect")
+
+_warmed_up = False
+
+
+async def warm_up(connect: bool = False) -> None:
+    """Load the Gemini SDK and Pillow and create the Gemini clients ahead of the first request.
+
+    Also starts the transcoding pool's fork server and first worker, which
+    takes a second or two. Runs once per process; failures are logged and
+    left to the first request.
+
+    Args:
+        connect: Also send one model lookup per API key to open a connection
+    """
+    global _warmed_up
+    if _warmed_up:
+        return
+    _warmed_up = True
+    start = time.perf_counter()
+
+    def load() -> None:
+        for name in ("google.genai", "PIL.Image", "PIL.ImageOps"):
+            importlib.import_module(name)
+
+    try:
+        await asyncio.to_thread(load)
+        if OUTPUT_TRANSCODE_WORKERS > 0:
+            await asyncio.get_running_loop().run_in_executor(_get_transcode_pool(), int)
+        clients = [get_client(api_key) for api_key in get_api_keys()]
+        if connect:
+            await asyncio.gather(*(client.aio.models.get(model=DEFAULT_GEMINI_IMAGE_MODEL) for client in clients))
+    except Exception as e:
+        logger.warning(f"Warm-up failed, leaving it to the first request: {str(e)}")
+        return
+    logger.info(f"Warmed up {len(clients)} Gemini client(s) in {time.perf_counter() - start:.2f}s")
+
+
+def _http_transport() -> str:
+    """Return the HTTP transport to serve, checking MCP_TRANSPORT."""
+    if MCP_TRANSPORT not in MCP_TRANSPORTS:
+        raise ValueError(f"Unsupported MCP_TRANSPORT: {MCP_TRANSPORT}. Use one of {', '.join(MCP_TRANSPORTS)}")
+    if MCP_TRANSPORT == "sse" and SERVER_WORKERS > 1:
+        # SSE sessions are bound to the process that opened them
+        logger.warning("SSE cannot be shared by several workers; serving streamable HTTP at /mcp instead")
+        return "http"
+    return "sse" if MCP_TRANSPORT == "sse" else "http"
+
+
+def create_app():
+    """Build the ASGI app for the configured HTTP transport.
+
+    Used directly for a single process and as the uvicorn app factory in each
+    worker process when SERVER_WORKERS > 1. On shutdown the app stops taking
+    background jobs, waits for running ones, stops the transcoding workers and
+    closes the Gemini clients.
+    """
+    transport = _http_transport()
+    middleware = []
+    if SERVER_MAX_REQUEST_BYTES > 0:
+        middleware.append(Middleware(BodySizeLimitMiddleware, max_bytes=SERVER_MAX_REQUEST_BYTES))
+    app = mcp.http_app(
+        transport=transport,
+        stateless_http=(MCP_STATELESS_HTTP or SERVER_WORKERS > 1) if transport == "http" else None,
+        middleware=middleware,
+    )
+
+    mcp_lifespan = app.router.lifespan_context
+
+    @asynccontextmanager
+    async def lifespan(app):
+        async with mcp_lifespan(app) as state:
+            yield state
+            logger.info("Shutting down: draining background jobs")
+            await job_queue.drain(SERVER_SHUTDOWN_TIMEOUT)
+            shutdown_transcode_pool()
+            await close_clients()
+
+    app.router.lifespan_context = lifespan
+    return app
+
+
 def main():
     logger.info("Starting GeminiImageMCP server...")
-    #mcp.run(transport="stdio")
-    mcp.run(transport="sse", host="0.0.0.0", port=9005)
+    if MCP_TRANSPORT == "stdio":
+        mcp.run(transport="stdio")
+        logger.info("Server stopped")
+        return
+
+    import uvicorn
+
+    transport = _http_transport()
+    if SERVER_WORKERS > 1 and shared_store is None:
+        logger.warning("SERVER_WORKERS > 1 without SHARED_STORE_URL: jobs are only visible to the worker that ran them")
+    logger.info(f"Serving {transport} on {MCP_HOST}:{MCP_PORT} with {SERVER_WORKERS} worker(s)")
+    # With several workers the parent binds the port once and the workers
+    # share the listening socket, so the kernel spreads connections over them
+    uvicorn.run(
+        "gemini_image_mcp.server:create_app",
+        factory=True,
+        host=MCP_HOST,
+        port=MCP_PORT,
+        workers=SERVER_WORKERS,
+        timeout_keep_alive=SERVER_KEEPALIVE_TIMEOUT,
+        timeout_graceful_shutdown=SERVER_SHUTDOWN_TIMEOUT,
+    )
     logger.info("Server stopped")
 
 if __name__ == "__main__":
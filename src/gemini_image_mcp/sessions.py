@@ -0,0 +1,117 @@
+import base64
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from .shared import SharedStore
+
+logger = logging.getLogger(__name__)
+
+
+class SessionStore:
+    """Multi-turn edit sessions, evicted by idle time, count and image bytes.
+
+    A session is a dict holding the current ``image`` (encoded bytes ready
+    to send to Gemini) and its ``mime_type``, the number of ``turns``, the
+    ``history`` of recent edit instructions, a ``version`` bumped with every
+    new image and, once the image has been uploaded, its Files API
+    ``file_uri``. Sessions expire ``ttl`` seconds after their last use;
+    beyond ``max_sessions`` sessions or ``max_bytes`` of images the least
+    recently used are evicted.
+
+    With a ``shared`` store, sessions live only there, so any server process
+    can continue a session; the store expires them, and the count and byte
+    limits do not apply.
+    """
+
+    def __init__(self, max_sessions: int, max_bytes: int, ttl: float, shared: Optional[SharedStore] = None):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.shared = shared
+        self.evictions = 0
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def create(self, image: bytes, mime_type: str) -> Dict[str, Any]:
+        """Start a session on ``image`` and return it."""
+        now = time.time()
+        session = {
+            "id": uuid.uuid4().hex,
+            "image": image,
+            "mime_type": mime_type,
+            "version": 0,
+            "turns": 0,
+            "file_uri": None,
+            "history": [],
+            "created_at": now,
+            "updated_at": now,
+        }
+        return self.put(session)
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the session, or None if it does not exist or has expired."""
+        if self.shared is not None:
+            return self._shared_get(session_id)
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and session["expires_at"] >= time.time():
+                self._sessions.move_to_end(session_id)
+                return dict(session)
+            if session is not None:
+                self._remove(session_id)
+            return None
+
+    def put(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        """Insert or replace a session, restart its idle timer and return the stored copy."""
+        session = {**session, "expires_at": time.time() + self.ttl}
+        if self.shared is not None:
+            record = {**session, "image": base64.b64encode(session["image"]).decode("ascii")}
+            self.shared.set(session["id"], json.dumps(record).encode("utf-8"), self.ttl)
+        else:
+            with self._lock:
+                self._memory_put(session)
+        return dict(session)
+
+    def delete(self, session_id: str) -> None:
+        """End a session."""
+        if self.shared is not None:
+            self.shared.delete(session_id)
+            return
+        with self._lock:
+            self._remove(session_id)
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of sessions and image bytes held in memory, and evictions so far."""
+        return {"sessions": len(self._sessions), "bytes": self._bytes, "evictions": self.evictions}
+
+    def _memory_put(self, session: Dict[str, Any]) -> None:
+        self._remove(session["id"])
+        self._sessions[session["id"]] = session
+        self._bytes += len(session["image"])
+        now = time.time()
+        for session_id in [sid for sid, s in self._sessions.items() if s["expires_at"] < now]:
+            self._remove(session_id)
+        while len(self._sessions) > 1 and (len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes):
+            session_id = next(iter(self._sessions))
+            self._remove(session_id)
+            self.evictions += 1
+            logger.info(f"Evicted edit session {session_id} ({len(self._sessions)} sessions, {self._bytes} bytes left)")
+
+    def _remove(self, session_id: str) -> None:
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= len(session["image"])
+
+    def _shared_get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        stored = self.shared.get(session_id)
+        if stored is None:
+            return None
+        session = json.loads(stored)
+        session["image"] = base64.b64decode(session["image"])
+        return session
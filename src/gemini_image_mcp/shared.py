@@ -0,0 +1,206 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SharedStore(ABC):
+    """Key-value store shared by every server process.
+
+    The interface follows Redis semantics: byte values, optional per-key
+    expiry and an atomic set-if-absent used to claim work. Implementations
+    must be safe to call from several threads and processes at once.
+    """
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value for ``key``, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        """Store ``value`` under ``key``, expiring after ``ttl`` seconds if given."""
+
+    @abstractmethod
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        """Store ``value`` only if ``key`` is missing or expired; return whether it was stored."""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Remove ``key`` if present."""
+
+    @abstractmethod
+    def scan(self, prefix: str) -> Iterator[Tuple[str, bytes]]:
+        """Yield ``(key, value)`` for every unexpired key starting with ``prefix``."""
+
+    def close(self) -> None:
+        """Release connections held by the store."""
+
+    def namespace(self, prefix: str) -> "SharedStore":
+        """Return a view of this store that prefixes every key with ``prefix``."""
+        return _Namespace(self, prefix)
+
+
+class _Namespace(SharedStore):
+    def __init__(self, store: SharedStore, prefix: str):
+        self.store = store
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.store.get(self.prefix + key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self.store.set(self.prefix + key, value, ttl)
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return self.store.add(self.prefix + key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.store.delete(self.prefix + key)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, bytes]]:
+        for key, value in self.store.scan(self.prefix + prefix):
+            yield key[len(self.prefix):], value
+
+    def close(self) -> None:
+        self.store.close()
+
+
+class SQLiteStore(SharedStore):
+    """Shared store in a SQLite file, for processes on a single host.
+
+    The database runs in WAL mode so readers do not block the writer, and
+    expired rows are deleted every ``_PURGE_EVERY`` writes.
+    """
+
+    _PURGE_EVERY = 256
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+
+    @staticmethod
+    def _expires_at(ttl: Optional[float]) -> Optional[float]:
+        return time.time() + ttl if ttl is not None else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] < time.time()):
+            return None
+        return bytes(row[0])
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, value, self._expires_at(ttl)),
+            )
+            self._wrote()
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        # Insert, or take over the row if it has expired; rowcount is 0 when
+        # a live row blocks the update
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO kv (key, value, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at "
+                "WHERE kv.expires_at IS NOT NULL AND kv.expires_at < ?",
+                (key, value, self._expires_at(ttl), time.time()),
+            )
+            self._wrote()
+            return cursor.rowcount == 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, bytes]]:
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT key, value FROM kv WHERE substr(key, 1, ?) = ? AND (expires_at IS NULL OR expires_at >= ?)",
+                (len(prefix), prefix, time.time()),
+            ).fetchall()
+        for key, value in rows:
+            yield key, bytes(value)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def _wrote(self) -> None:
+        self._writes += 1
+        if self._writes % self._PURGE_EVERY == 0:
+            self._db.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),))
+
+
+class RedisStore(SharedStore):
+    """Shared store backed by Redis (or a Redis-compatible server such as Valkey).
+
+    Requires the optional ``redis`` package.
+    """
+
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(f"The redis package is required for SHARED_STORE_URL={url}") from e
+        self.url = url
+        self._redis = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _px(ttl: Optional[float]) -> Optional[int]:
+        return max(1, int(ttl * 1000)) if ttl is not None else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._redis.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None) -> None:
+        self._redis.set(key, value, px=self._px(ttl))
+
+    def add(self, key: str, value: bytes, ttl: Optional[float] = None) -> bool:
+        return bool(self._redis.set(key, value, px=self._px(ttl), nx=True))
+
+    def delete(self, key: str) -> None:
+        self._redis.delete(key)
+
+    def scan(self, prefix: str) -> Iterator[Tuple[str, bytes]]:
+        pattern = "".join(f"\\{c}" if c in "*?[]\\" else c for c in prefix) + "*"
+        for key in self._redis.scan_iter(match=pattern):
+            value = self._redis.get(key)
+            if value is not None:
+                yield key.decode(), value
+
+    def close(self) -> None:
+        self._redis.close()
+
+
+def open_shared_store(url: Optional[str]) -> Optional[SharedStore]:
+    """Open the shared store described by ``url``.
+
+    Args:
+        url: ``redis://`` or ``rediss://`` URL for Redis, ``sqlite:///path`` or
+             a plain file path for SQLite; empty for no shared store
+
+    Returns:
+        The store, or None if ``url`` is empty
+    """
+    if not url:
+        return None
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        store: SharedStore = RedisStore(url)
+    else:
+        store = SQLiteStore(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url)
+    logger.info(f"Using shared store {url}")
+    return store
@@ -0,0 +1,48 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one underlying call.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it is still running await the same task. Each waiter is shielded,
+    so cancelling one waiter never cancels the shared call.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task"] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn`` once for ``key`` and return its result to every concurrent caller.
+
+        Args:
+            key: Identifies requests that may share a result
+            fn: Zero-argument coroutine function producing the result
+
+        Returns:
+            The result of the shared call
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            logger.info(f"Joining in-flight request {key[:12]}")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: str, task: "asyncio.Task") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark the exception as retrieved in case every waiter was cancelled
+        if not task.cancelled():
+            task.exception()
@@ -1,16 +1,30 @@
+import asyncio
 import base64
+import hashlib
 import io
 import logging
 import os
+import re
+import uuid
+from typing import Optional
 
-import PIL.Image
+from .imaging import sniff_image
+from .lazy import LazyModule
 
 logger = logging.getLogger(__name__)
 
+Image = LazyModule("PIL.Image")
+
 OUTPUT_IMAGE_PATH = os.getenv("OUTPUT_IMAGE_PATH") or os.path.expanduser("~/gen_image")
 
-if not os.path.exists(OUTPUT_IMAGE_PATH):
-    os.makedirs(OUTPUT_IMAGE_PATH)
+# Names of files written by store_image: "<sha256>.<format>"
+STORED_IMAGE_NAME = re.compile(r"[0-9a-f]{64}\.[a-z0-9]+")
+
+# Source and result images of background jobs. They are kept apart from the
+# images the other tools return as links or paths, so they can be deleted
+# when their job expires.
+JOB_IMAGE_PATH = os.path.join(OUTPUT_IMAGE_PATH, "jobs")
+
 
 def validate_base64_image(base64_string: str) -> bool:
     """Validate if a string is a valid base64-encoded image.
@@ -26,7 +40,7 @@ def validate_base64_image(base64_string: str) -> bool:
         image_data = base64.b64decode(base64_string)
 
         # Try to open as image
-        with PIL.Image.open(io.BytesIO(image_data)) as img:
+        with Image.open(io.BytesIO(image_data)) as img:
             logger.debug(
                 f"Validated base64 image, format: {img.format}, size: {img.size}"
             )
@@ -36,6 +50,64 @@ def validate_base64_image(base64_string: str) -> bool:
         logger.warning(f"Invalid base64 image: {str(e)}")
         return False
     
+def _write_atomic(path: str, data: bytes) -> None:
+    """Write ``data`` to ``path`` via a temporary file and rename.
+
+    The directory is created on first write rather than at import time.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def stored_image_path(name: str, directory: Optional[str] = None) -> str:
+    """Resolve the name of a stored image to its path under OUTPUT_IMAGE_PATH.
+
+    Args:
+        name: File name as returned by ``store_image`` ("<sha256>.<format>")
+        directory: Store directory, if not OUTPUT_IMAGE_PATH
+
+    Returns:
+        Absolute path of the stored image
+
+    Raises:
+        ValueError: If the name is not a valid stored image name
+    """
+    if not STORED_IMAGE_NAME.fullmatch(name):
+        raise ValueError(f"Invalid stored image name: {name}")
+    return os.path.join(directory or OUTPUT_IMAGE_PATH, name)
+
+
+def store_image(image_data: bytes, fmt: str, directory: Optional[str] = None) -> str:
+    """Write image bytes to the content-addressed store under OUTPUT_IMAGE_PATH.
+
+    Files are named after the SHA-256 of their contents, so storing the same
+    image twice reuses the existing file. Writes are atomic and the bytes are
+    written as-is, without decoding.
+
+    Args:
+        image_data: Encoded image bytes
+        fmt: Image format used as the file extension
+        directory: Store directory, if not OUTPUT_IMAGE_PATH
+
+    Returns:
+        Path to the stored image file
+    """
+    name = f"{hashlib.sha256(image_data).hexdigest()}.{fmt.lower()}"
+    image_path = stored_image_path(name, directory)
+    if not os.path.exists(image_path):
+        _write_atomic(image_path, image_data)
+        logger.info(f"Image stored at {image_path}")
+    return image_path
+
+
 async def save_image(image_data: bytes, filename: str) -> str:
     """Save image data to disk with a descriptive filename.
     
@@ -47,17 +119,12 @@ async def save_image(image_data: bytes, filename: str) -> str:
         Path to the saved image file
     """
     try:
-        # Open image from bytes
-        image = PIL.Image.open(io.BytesIO(image_data))
-        
-        # Save the image
-        image_path = os.path.join(OUTPUT_IMAGE_PATH, f"{filename}.png")
-        image.save(image_path)
+        # Keep the encoded bytes and name the file after their actual format
+        mime_type, _ = sniff_image(image_data)
+        image_path = os.path.join(OUTPUT_IMAGE_PATH, f"{filename}.{mime_type.split('/')[-1]}")
+        await asyncio.to_thread(_write_atomic, image_path, image_data)
         logger.info(f"Image saved to {image_path}")
         
-        # Display the image
-        image.show()
-        
         return image_path
     except Exception as e:
         logger.error(f"Error saving image: {str(e)}")
@@ -0,0 +1,37 @@
+import json
+import os
+
+from gemini_image_mcp.cache import TTLCache
+
+
+def _persisted(path):
+    with open(path, encoding="utf-8") as f:
+        return {key: value for key, (_, value) in json.load(f).items()}
+
+
+def test_persistence_is_debounced(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = TTLCache(10, 60, persist_path=path, persist_interval=60)
+    cache.set("a", "1")
+    assert _persisted(path) == {"a": "1"}
+
+    # Within the interval further updates wait for the timer or a flush
+    cache.set("b", "2")
+    cache.set("c", "3")
+    assert _persisted(path) == {"a": "1"}
+    cache.flush()
+    assert _persisted(path) == {"a": "1", "b": "2", "c": "3"}
+    assert cache._save_timer is None
+
+
+def test_processes_sharing_a_file_keep_each_others_entries(tmp_path):
+    path = str(tmp_path / "cache.json")
+    first = TTLCache(10, 60, persist_path=path, persist_interval=0)
+    second = TTLCache(10, 60, persist_path=path, persist_interval=0)
+    first.set("a", "1")
+    second.set("b", "2")
+    first.set("c", "3")
+
+    assert _persisted(path) == {"a": "1", "b": "2", "c": "3"}
+    assert os.listdir(tmp_path) == ["cache.json"]
+    assert TTLCache(10, 60, persist_path=path).get("b") == "2"
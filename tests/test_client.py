@@ -0,0 +1,58 @@
+import asyncio
+
+from gemini_image_mcp import client as gemini_client
+
+
+class FakeClient:
+    def __init__(self, *config):
+        self.config = config
+        self.closed = False
+        self.aio = self
+
+    async def aclose(self):
+        self.closed = True
+
+    def close(self):
+        pass
+
+
+def test_rotated_client_is_closed_after_grace_period(monkeypatch):
+    monkeypatch.setattr(gemini_client, "_build_client", FakeClient)
+    monkeypatch.setattr(gemini_client, "_clients", {})
+    monkeypatch.setattr(gemini_client, "_retired_clients", [])
+    monkeypatch.setattr(gemini_client, "GEMINI_CLIENT_RETIRE_GRACE", 0.05)
+    monkeypatch.setenv("GEMINI_API_KEYS", "k1")
+
+    async def run():
+        old = gemini_client.get_client()
+        monkeypatch.setenv("GEMINI_BASE_URL", "http://localhost:1")
+        new = gemini_client.get_client()
+        assert new is not old
+        # Still open for requests in flight when it was rotated out
+        assert not old.closed
+        await asyncio.sleep(0.2)
+        assert old.closed and not new.closed
+        assert gemini_client._retired_clients == []
+
+        await gemini_client.close_clients()
+        assert new.closed
+
+    asyncio.run(run())
+
+
+def test_close_clients_closes_clients_still_in_grace_period(monkeypatch):
+    monkeypatch.setattr(gemini_client, "_build_client", FakeClient)
+    monkeypatch.setattr(gemini_client, "_clients", {})
+    monkeypatch.setattr(gemini_client, "_retired_clients", [])
+    monkeypatch.setenv("GEMINI_API_KEYS", "k1,k2")
+
+    async def run():
+        old = gemini_client.get_client("k2")
+        monkeypatch.setenv("GEMINI_API_KEYS", "k1")
+        gemini_client.get_client()
+        assert gemini_client._retired_clients == [old]
+        await gemini_client.close_clients()
+        assert old.closed
+        assert not gemini_client._close_tasks
+
+    asyncio.run(run())
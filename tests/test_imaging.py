@@ -0,0 +1,56 @@
+import base64
+import binascii
+
+import pytest
+
+from gemini_image_mcp import imaging
+from gemini_image_mcp.imaging import decode_base64_chunked
+
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Chunk boundaries that do not fall on 4-character groups
+    monkeypatch.setattr(imaging, "_BASE64_CHUNK_CHARS", 37)
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_decode_base64_chunked_plain(request, chunked):
+    if chunked:
+        request.getfixturevalue("small_chunks")
+    prefix = "data:image/png;base64,"
+    encoded = prefix + base64.b64encode(DATA).decode()
+    assert decode_base64_chunked(encoded, len(prefix)) == DATA
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_decode_base64_chunked_line_wrapped(request, chunked):
+    if chunked:
+        request.getfixturevalue("small_chunks")
+    # base64.encodebytes wraps at 76 characters and ends with a newline
+    encoded = base64.encodebytes(DATA).decode()
+    assert "\n" in encoded.rstrip("\n")
+    assert decode_base64_chunked(encoded) == DATA
+    assert decode_base64_chunked(encoded.replace("\n", "\r\n") + "  \n") == DATA
+
+
+def test_decode_base64_chunked_padding(small_chunks):
+    for size in range(1, 8):
+        assert decode_base64_chunked(base64.b64encode(DATA[:size]).decode()) == DATA[:size]
+    with pytest.raises(binascii.Error):
+        decode_base64_chunked(base64.b64encode(DATA[:5]).decode().rstrip("="))
+
+
+def test_decode_base64_chunked_invalid():
+    with pytest.raises(binascii.Error):
+        decode_base64_chunked("QUJD*EVG")
+    with pytest.raises(binascii.Error):
+        decode_base64_chunked("QUJDREéG")
+
+
+def test_decode_base64_chunked_size_limit(small_chunks):
+    encoded = base64.encodebytes(DATA).decode()
+    assert decode_base64_chunked(encoded, max_bytes=len(DATA)) == DATA
+    with pytest.raises(ValueError, match="too large"):
+        decode_base64_chunked(encoded, max_bytes=len(DATA) - 1)
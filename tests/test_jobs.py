@@ -0,0 +1,41 @@
+import asyncio
+import os
+import time
+
+from gemini_image_mcp import utils
+from gemini_image_mcp.jobs import JobQueue, JobStore
+from gemini_image_mcp.shared import SQLiteStore
+
+
+def _finished_job(job_id, expires_at, **params):
+    now = time.time()
+    return {
+        "id": job_id, "kind": "image", "params": params, "status": "succeeded",
+        "created_at": now, "updated_at": now, "started_at": now, "finished_at": now,
+        "expires_at": expires_at, "result": None, "error": None,
+    }
+
+
+def test_purge_expired_runs_cleanup_once_per_kind(tmp_path):
+    for store in (JobStore(), JobStore(SQLiteStore(str(tmp_path / "jobs.db")))):
+        queue = JobQueue(store, workers=1, max_queued=10, result_ttl=60)
+        cleaned = []
+        queue.register("image", lambda params: None, cleanup=cleaned.append)
+        store.put(_finished_job("old", time.time() - 1, n=1))
+        store.put(_finished_job("new", time.time() + 60, n=2))
+
+        queue._purge_expired()
+
+        assert [[job["id"] for job in jobs] for jobs in cleaned] == [["old"]]
+        assert store.get("old") is None
+        assert store.get("new") is not None
+        assert asyncio.run(queue.get("new"))["params"] == {"n": 2}
+
+
+def test_job_images_are_stored_apart(tmp_path, monkeypatch):
+    monkeypatch.setattr(utils, "OUTPUT_IMAGE_PATH", str(tmp_path))
+    shared = utils.store_image(b"same bytes", "png")
+    job = utils.store_image(b"same bytes", "png", str(tmp_path / "jobs"))
+    assert os.path.basename(shared) == os.path.basename(job)
+    os.remove(job)
+    assert os.path.exists(shared)
@@ -0,0 +1,57 @@
+import asyncio
+import re
+
+import httpx
+
+from gemini_image_mcp import server
+from gemini_image_mcp.metrics import TOOL_CALLS
+
+_HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def _scrape() -> str:
+    async def get():
+        app = server.mcp.http_app(transport="http")
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        return response.text
+
+    return asyncio.run(get())
+
+
+def _parse(text: str):
+    """Return ({family: type}, [(family, sample name)]) for text format 0.0.4."""
+    types, helps, samples = {}, set(), []
+    for line in text.splitlines():
+        if line.startswith("# HELP "):
+            helps.add(line.split(" ")[2])
+        elif line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+        elif line:
+            name = re.match(r"[a-zA-Z_:][a-zA-Z0-9_:]*", line).group(0)
+            family = name
+            if name not in types:
+                family = next(
+                    (name[: -len(s)] for s in _HISTOGRAM_SUFFIXES if name.endswith(s) and name[: -len(s)] in types),
+                    None,
+                )
+            samples.append((family, name))
+    assert helps == set(types)
+    return types, samples
+
+
+def test_every_sample_belongs_to_its_typed_family():
+    TOOL_CALLS.inc(tool="test_tool", status="ok")
+    types, samples = _parse(_scrape())
+
+    assert types["gemini_mcp_tool_calls_total"] == "counter"
+    assert ("gemini_mcp_tool_calls_total", "gemini_mcp_tool_calls_total") in samples
+    for family, name in samples:
+        assert family is not None, f"{name} has no TYPE line"
+        if types[family] == "counter":
+            assert name == family and name.endswith("_total")
+        elif types[family] != "histogram":
+            assert name == family
@@ -0,0 +1,173 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai import errors
+
+from gemini_image_mcp import pool, resilience, scheduler, server
+from gemini_image_mcp.pool import BackendPool
+from gemini_image_mcp.resilience import BackendsExhaustedError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(pool.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_select_prefers_least_outstanding_then_lowest_latency(clock):
+    backends = BackendPool(["k1", "k2", "k3"])
+    first = backends.select(["m"])
+    first.start()
+    second = backends.select(["m"])
+    assert second is not first
+    second.start()
+
+    for backend, latency in ((first, 1.0), (second, 0.2)):
+        backend.finish(latency)
+    third = backends.select(["m"])
+    assert third.api_key == "k3"  # no latency samples yet, so tried first
+    third.start()
+    third.finish(0.5)
+    assert backends.select(["m"]) is second
+
+    second.start()
+    second.start()
+    # (2 + 1) * 0.2 = 0.6 is worse than (0 + 1) * 0.5
+    assert backends.select(["m"]) is third
+
+
+def test_select_skips_evicted_and_readmits_after_timeout(clock):
+    backends = BackendPool(["k1", "k2"])
+    k1 = backends.select(["m"])
+    k1.evict(30)
+    assert backends.select(["m"]).api_key != k1.api_key
+    assert backends.select(["m"], exclude=(backends.select(["m"]),)) is None
+    assert backends.next_available_in(["m"]) == pytest.approx(0.0)
+
+    backends.select(["m"]).evict(10)
+    assert backends.select(["m"]) is None
+    assert backends.next_available_in(["m"]) == pytest.approx(10)
+
+    clock[0] += 10
+    k2 = backends.select(["m"])
+    assert k2.api_key != k1.api_key
+    clock[0] += 20
+    assert backends.select(["m"], exclude=(k2,)) is k1
+
+
+def test_select_falls_back_in_model_order(clock):
+    backends = BackendPool(["k1", "k2"])
+    for key in ("k1", "k2"):
+        backends._backend(key, "primary").evict(60)
+    assert backends.select(["primary", "fallback-1", "fallback-2"]).model == "fallback-1"
+    for key in ("k1", "k2"):
+        backends._backend(key, "fallback-1").evict(60)
+    assert backends.select(["primary", "fallback-1", "fallback-2"]).model == "fallback-2"
+
+
+def _quota_error():
+    return errors.ClientError(429, {"error": {"code": 429, "message": "quota", "status": "RESOURCE_EXHAUSTED"}})
+
+
+class FakeModels:
+    def __init__(self, outcomes, calls):
+        self.outcomes = outcomes
+        self.calls = calls
+
+    async def generate_content(self, model, contents, config):
+        self.calls.append((self.key, model))
+        outcome = self.outcomes.get((self.key, model), "ok")
+        if outcome == "quota":
+            raise _quota_error()
+        return SimpleNamespace(served_by=(self.key, model))
+
+
+@pytest.fixture
+def backends(monkeypatch):
+    """Route _call_backends to fake clients; returns (pool, outcomes, calls)."""
+    outcomes, calls = {}, []
+
+    def get_client(api_key=None):
+        models = FakeModels(outcomes, calls)
+        models.key = api_key
+        return SimpleNamespace(aio=SimpleNamespace(models=models))
+
+    backend_pool = BackendPool(["k1", "k2"])
+    monkeypatch.setattr(server, "get_client", get_client)
+    monkeypatch.setattr(server, "get_backend_pool", lambda: backend_pool)
+    monkeypatch.setattr(pool, "GEMINI_TEXT_MODEL_FALLBACKS", "fallback")
+    monkeypatch.setattr(scheduler, "_schedulers", {})
+    return backend_pool, outcomes, calls
+
+
+def _call(model="primary"):
+    return asyncio.run(server._call_backends(["hi"], model, None, True, None))
+
+
+def test_call_backends_fails_over_to_next_key(backends):
+    backend_pool, outcomes, calls = backends
+    outcomes[("k1", "primary")] = "quota"
+    assert _call().served_by == ("k2", "primary")
+    assert calls == [("k1", "primary"), ("k2", "primary")]
+    assert not backend_pool._backend("k1", "primary").available(pool.time.monotonic())
+    assert backend_pool._backend("k1", "primary").outstanding == 0
+
+
+def test_call_backends_fails_over_to_fallback_model(backends):
+    backend_pool, outcomes, calls = backends
+    outcomes[("k1", "primary")] = outcomes[("k2", "primary")] = "quota"
+    assert _call().served_by[1] == "fallback"
+    assert [model for _, model in calls] == ["primary", "primary", "fallback"]
+
+
+def test_call_backends_keeps_last_backend_in_rotation(backends):
+    backend_pool, outcomes, calls = backends
+    for key in ("k1", "k2"):
+        outcomes[(key, "primary")] = outcomes[(key, "fallback")] = "quota"
+    with pytest.raises(errors.ClientError):
+        _call()
+    assert len(calls) == 4
+    # Three backends evicted; the last one stays for call_with_resilience to retry
+    now = pool.time.monotonic()
+    assert sum(b.available(now) for b in backend_pool._backends.values()) == 1
+
+    with pytest.raises(errors.ClientError):
+        _call()
+    for backend in backend_pool._backends.values():
+        backend.evicted_until = now + 60
+    with pytest.raises(BackendsExhaustedError):
+        _call()
+
+
+def test_quota_errors_do_not_open_the_circuit(monkeypatch):
+    monkeypatch.setattr(resilience, "_breakers", {})
+    monkeypatch.setattr(resilience, "GEMINI_MAX_RETRIES", 3)
+    monkeypatch.setattr(resilience, "GEMINI_CIRCUIT_FAILURE_THRESHOLD", 2)
+    monkeypatch.setattr(resilience, "GEMINI_RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(resilience, "GEMINI_RETRY_MAX_DELAY", 0.0)
+
+    async def attempt():
+        raise BackendsExhaustedError("exhausted", retry_after=0.0)
+
+    with pytest.raises(BackendsExhaustedError):
+        asyncio.run(resilience.call_with_resilience("m", attempt))
+    assert resilience.get_breaker("m").allow()
+
+
+def test_quota_is_charged_per_key(backends, monkeypatch):
+    backend_pool, outcomes, calls = backends
+    # One request per key fits the burst; a single shared bucket would make
+    # the second request wait a minute
+    monkeypatch.setattr(scheduler, "GEMINI_TEXT_RPM", 1)
+
+    async def run():
+        return await asyncio.wait_for(asyncio.gather(
+            server._call_backends(["a"], "primary", None, True, None),
+            server._call_backends(["b"], "primary", None, True, None),
+        ), timeout=5)
+
+    served = {response.served_by[0] for response in asyncio.run(run())}
+    assert served == {"k1", "k2"}
+    assert set(scheduler.get_scheduler_stats()) == {"primary@...k1", "primary@...k2"}
@@ -0,0 +1,109 @@
+import asyncio
+import io
+from types import SimpleNamespace
+
+import pytest
+from fastmcp import Client
+from google.genai import types
+from PIL import Image
+
+from gemini_image_mcp import scheduler, server
+from gemini_image_mcp.pool import BackendPool
+from gemini_image_mcp.progress import STAGES
+
+
+def _png() -> bytes:
+    buffer = io.BytesIO()
+    Image.new("RGB", (8, 8), "red").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _response(*parts: types.Part) -> types.GenerateContentResponse:
+    return types.GenerateContentResponse(
+        candidates=[types.Candidate(index=0, content=types.Content(role="model", parts=list(parts)))]
+    )
+
+
+class StubModels:
+    """Streams a text part followed by the image, split over several chunks."""
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    async def generate_content(self, model, contents, config):
+        self.calls.append("generate_content")
+        return _response(
+            types.Part(text="Here is a red square."),
+            types.Part.from_bytes(data=_png(), mime_type="image/png"),
+        )
+
+    async def generate_content_stream(self, model, contents, config):
+        self.calls.append("generate_content_stream")
+        image = _png()
+
+        async def chunks():
+            yield _response(types.Part(text="Here is a red square."))
+            # Split the image across chunks to produce several byte updates
+            for start in range(0, len(image), 16):
+                yield _response(types.Part.from_bytes(data=image[start:start + 16], mime_type="image/png"))
+
+        return chunks()
+
+
+@pytest.fixture
+def stub_gemini(monkeypatch):
+    calls = []
+    client = SimpleNamespace(aio=SimpleNamespace(models=StubModels(calls)))
+    backend_pool = BackendPool(["k1"])
+    monkeypatch.setattr(server, "get_client", lambda api_key=None: client)
+    monkeypatch.setattr(server, "get_backend_pool", lambda: backend_pool)
+    monkeypatch.setattr(server, "RESULT_CACHE_ENABLED", False)
+    monkeypatch.setattr(scheduler, "_schedulers", {})
+    return calls
+
+
+def _call_tool():
+    progress, messages = [], []
+
+    async def on_progress(value, total, message):
+        progress.append((value, total, message))
+
+    async def on_log(message):
+        messages.append(message.data)
+
+    async def run():
+        async with Client(server.mcp, log_handler=on_log) as client:
+            return await client.call_tool(
+                "generate_image_from_text",
+                {"prompt": "a red square", "translation_mode": "single_shot", "use_cache": False},
+                progress_handler=on_progress,
+            )
+
+    result = asyncio.run(run())
+    return result, progress, messages
+
+
+def test_streaming_reports_increasing_progress_and_text(stub_gemini):
+    result, progress, messages = _call_tool()
+
+    assert stub_gemini == ["generate_content_stream"]
+    assert result.content[0].type == "image"
+    values = [value for value, _, _ in progress]
+    assert all(a < b for a, b in zip(values, values[1:]))
+    assert {total for _, total, _ in progress} == {len(STAGES)}
+    received = [message for _, _, message in progress if message.startswith("Received")]
+    assert len(received) > 1
+    assert received[-1] == f"Received {len(_png())} bytes"
+    assert values[-1] == STAGES.index("post-processing")
+    assert "Here is a red square." in str(messages)
+
+
+def test_non_streaming_fallback(stub_gemini, monkeypatch):
+    monkeypatch.setattr(server, "GEMINI_STREAMING_ENABLED", False)
+    result, progress, _ = _call_tool()
+
+    assert stub_gemini == ["generate_content"]
+    assert result.content[0].type == "image"
+    values = [value for value, _, _ in progress]
+    assert values == [STAGES.index(name) for name in ("translating", "generating", "post-processing")]
+    assert not any(message.startswith("Received") for _, _, message in progress)
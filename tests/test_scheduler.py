@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from gemini_image_mcp import scheduler
+from gemini_image_mcp.scheduler import QueueFullError, QuotaScheduler, acquire_quota, estimate_tokens
+
+
+def test_estimate_tokens_str_is_one_text_part():
+    prompt = "x" * 647
+    assert estimate_tokens(prompt, text_only=True) == 162
+    assert estimate_tokens(prompt, text_only=True) == estimate_tokens([prompt], text_only=True)
+
+
+def test_estimate_tokens_images_and_outputs():
+    image = object()
+    assert estimate_tokens(["abcd", image], text_only=True) == 2 + scheduler._TOKENS_PER_IMAGE_INPUT
+    assert estimate_tokens(["abcd"], outputs=3) == 2 + 3 * scheduler._TOKENS_PER_IMAGE_OUTPUT
+
+
+def test_acquire_quota_charges_str_contents_as_one_part(monkeypatch):
+    monkeypatch.setattr(scheduler, "_schedulers", {})
+    monkeypatch.setattr(scheduler, "GEMINI_TEXT_TPM", 600)
+    monkeypatch.setattr(scheduler, "GEMINI_QUOTA_BURST_SECONDS", 60)
+
+    async def run():
+        await acquire_quota("text-model", "x" * 647, text_only=True)
+        return scheduler.get_scheduler("text-model", True).buckets[0][0].tokens
+
+    assert asyncio.run(run()) == pytest.approx(600 - 162, abs=1)
+
+
+def test_quota_scheduler_rejects_beyond_max_depth():
+    async def run():
+        quota = QuotaScheduler("m", rpm=1, tpm=0, max_depth=1)
+        await quota.acquire(1, "standard")
+        waiter = asyncio.ensure_future(quota.acquire(1, "standard"))
+        await asyncio.sleep(0)
+        with pytest.raises(QueueFullError):
+            await quota.acquire(1, "standard")
+        waiter.cancel()
+
+    asyncio.run(run())